@@ -3,7 +3,8 @@ from __future__ import annotations
 import json
 import gzip
 from typing import Dict, Tuple
-from infoset import unpack_infoset_key_dense, _LABELS_169
+from infoset import unpack_infoset_keys, _LABELS_169
+import numpy as np
 import os
 
 ACTIONS = ["FOLD", "CHECK", "CALL", "RAISE", "ALL-IN"]
@@ -80,77 +81,120 @@ def decode_entry_any_format(value) -> Tuple[Dict[str, float], int]:
             return _decode_compact_entry(plist), visits
     return {}, 0
 
-def main():
-    open_range = load_open_range()
-
-    # lecture policy gz (ancien ou nouveau format)
-    with gzip.open("policy/avg_policy.json.gz", "rt", encoding="utf-8") as f:
-        raw = json.load(f)
-
-    base_policy: Dict[str, Dict[str, float]] = {}
-    base_visits: Dict[str, int] = {}
-
-    for k_str, v in raw.items():
-        dist, visits = decode_entry_any_format(v)
-        if dist:
-            base_policy[k_str] = dist
-            base_visits[k_str] = max(1, visits)
-
+# ============================================================
+# --- Moteur de règles vectorisé (colonnes numpy)
+# ============================================================
+
+_FOLD, _CHECK, _CALL, _RAISE, _ALLIN = range(len(ACTIONS))
+RULES_CHUNK = 1_000_000
+
+def open_range_vector(open_range: Dict[str, float]) -> np.ndarray:
+    """{label 169: proba d'open} -> float64[256] indexé par HAND (0 hors range / hors 169)."""
+    vector = np.zeros(256, dtype=np.float64)
+    for hand_idx, label in enumerate(_LABELS_169):
+        vector[hand_idx] = float(open_range.get(label, 0.0))
+    return vector
+
+def legal_from_masks(masks: np.ndarray) -> np.ndarray:
+    """Bitmask compact -> bool[n, 5] (ordre ACTIONS)."""
+    masks = np.asarray(masks, dtype=np.uint8)
+    return ((masks[:, None] >> np.arange(len(ACTIONS), dtype=np.uint8)) & 1).astype(bool)
+
+def apply_rules(phases: np.ndarray, hands: np.ndarray, legal: np.ndarray, open_vector: np.ndarray) -> np.ndarray:
+    """Mêmes règles que l'ancienne boucle par infoset, sur des colonnes. Retourne float64[n, 5]."""
+    n_rows = len(phases)
+    artificial = np.zeros((n_rows, len(ACTIONS)), dtype=np.float64)
+    preflop = phases == 0
+    proba_open = open_vector[hands]
+
+    # Préflop : open = RAISE, sinon CHECK/FOLD selon légalité (ALL-IN / CALL à 0)
+    artificial[:, _RAISE] = np.where(preflop & legal[:, _RAISE], proba_open, 0.0)
+    artificial[:, _CHECK] = np.where(preflop & legal[:, _CHECK], 1.0 - proba_open, 0.0)
+    artificial[:, _FOLD] = np.where(preflop & legal[:, _FOLD] & ~legal[:, _CHECK], 1.0 - proba_open, 0.0)
+
+    # Postflop : uniforme sur les actions légales, FOLD divisé par 2 et redistribué
+    post = ~preflop
+    n_legal = np.maximum(1, legal.sum(axis=1)).astype(np.float64)
+    uniform = np.where(legal, 1.0 / n_legal[:, None], 0.0)
+    halve = post & legal[:, _FOLD] & (n_legal > 1)   # <- garde-fou
+    half_fold = uniform[:, _FOLD] / 2
+    bump = half_fold / np.maximum(n_legal - 1, 1)
+    uniform = np.where(halve[:, None] & legal, uniform + bump[:, None], uniform)
+    uniform[halve, _FOLD] = half_fold[halve]
+    artificial[post] = uniform[post]
+    return artificial
+
+def quantize_rows(probs: np.ndarray, keep_top_k: int = 3, bit_order: bool = False):
+    """
+    Équivalent vectorisé de _encode_compact : top-k (tri décroissant stable), quantif sur 255,
+    écart reporté sur la plus grande valeur. Retourne (masks uint8[n], q int64[n, k], n_kept int64[n]).
+    bit_order=True : q rangées dans l'ordre des bits du mask (convention des décodeurs) au lieu
+    de l'ordre décroissant de _encode_compact.
+    """
+    n_rows = len(probs)
+    rows = np.arange(n_rows)[:, None]
+    totals = probs.sum(axis=1)
+    norm = np.divide(probs, totals[:, None], out=np.zeros_like(probs), where=totals[:, None] > 0)
+
+    order = np.argsort(-norm, axis=1, kind="stable")[:, :keep_top_k]
+    top = norm[rows, order]
+    kept = top > 0.0
+    top = np.where(kept, top, 0.0)
+    top_total = top.sum(axis=1)
+    top = np.divide(top, top_total[:, None], out=np.zeros_like(top), where=top_total[:, None] > 0)
+
+    quantized = np.where(kept, np.rint(top * 255), 0).astype(np.int64)
+    diff = 255 - quantized.sum(axis=1)
+    has = kept.any(axis=1) & (diff != 0)
+    j = np.argmax(np.where(kept, quantized, -1), axis=1)
+    quantized[has, j[has]] = np.clip(quantized[has, j[has]] + diff[has], 0, 255)
+
+    masks = np.bitwise_or.reduce(np.where(kept, 1 << order, 0), axis=1).astype(np.uint8)
+    if bit_order:
+        by_action = np.argsort(np.where(kept, order, len(ACTIONS)), axis=1, kind="stable")
+        quantized = np.take_along_axis(quantized, by_action, axis=1)
+    return masks, quantized, kept.sum(axis=1)
+
+def generate_artificial_policy(src_path: str = "policy/avg_policy.json.gz",
+                               out_path: str = "policy/avg_policy_artificial.json.gz",
+                               open_range: Dict[str, float] | None = None,
+                               chunk_size: int = RULES_CHUNK, visits: int = 10) -> Tuple[int, int]:
+    """Lecture par blocs (.json.gz ou .gtop), règles + quantification numpy, écriture gzip en flux."""
+    from stats_policy import iter_policy_chunks
+
+    open_vector = open_range_vector(load_open_range() if open_range is None else open_range)
+    total_in = 0
     touched = 0
-    new_policy_compact = {}
-
-    for k_str, dist in base_policy.items():
-        k = int(k_str)
-        fields = unpack_infoset_key_dense(k)
-        phase = fields["PHASE"]
-        hand_idx = fields["HAND"]
-        label_169 = _169_LABEL.get(hand_idx, "??")
-
-        # proba d'open souhaitée (par main) - 0 si range absente
-        proba_open = float(open_range.get(label_169, 0.0))
-
-        legal_actions = list(dist.keys())
-        artificial = {a: 0.0 for a in legal_actions}
-
-        if phase == 0:
-            # simple règle: open = RAISE, sinon CHECK/FOLD selon légalité
-            if "RAISE" in legal_actions:
-                artificial["RAISE"] = proba_open
-            if "ALL-IN" in legal_actions:
-                artificial["ALL-IN"] = 0.0
-            if "CALL" in legal_actions:
-                artificial["CALL"] = 0.0
-            if "CHECK" in legal_actions:
-                artificial["CHECK"] = 1.0 - proba_open
-            if "FOLD" in legal_actions and "CHECK" not in legal_actions:
-                artificial["FOLD"] = 1.0 - proba_open
-        else:
-            n = max(1, len(legal_actions))
-            for a in legal_actions:
-                artificial[a] = 1.0 / n
-
-            if "FOLD" in legal_actions and n > 1:   # <- garde-fou
-                fold_prob = artificial["FOLD"]
-                artificial["FOLD"] = fold_prob / 2
-                bump = (fold_prob / 2) / (n - 1)
-                for a in legal_actions:
-                    if a != "FOLD":
-                        artificial[a] += bump
-
-
-        compact = _encode_compact(artificial, keep_top_k=3)
-        if compact[0] != 0:
-            new_policy_compact[k_str] = {
-                "policy": compact,
-                "visits": 10
-            }
-            touched += 1
+    tmp_path = out_path + ".tmp"
+    with gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6) as f:
+        f.write("{")
+        for columns in iter_policy_chunks(src_path, chunk_size):
+            # infosets décodables (mask non nul, somme des q > 0)
+            valid = (np.asarray(columns.masks) != 0) & (np.asarray(columns.q, dtype=np.int64).sum(axis=1) > 0)
+            keys = np.asarray(columns.keys)[valid]
+            fields = unpack_infoset_keys(keys)
+            legal = legal_from_masks(np.asarray(columns.masks)[valid])
+
+            artificial = apply_rules(fields["PHASE"], fields["HAND"], legal, open_vector)
+            masks, quantized, n_kept = quantize_rows(artificial)
+            written = masks != 0
+
+            parts = [
+                f'"{key}":{{"policy":[{",".join(map(str, [mask] + q[:k]))}],"visits":{visits}}}'
+                for key, mask, q, k in zip(keys[written].tolist(), masks[written].tolist(),
+                                           quantized[written].tolist(), n_kept[written].tolist())
+            ]
+            if parts:
+                f.write(("," if touched else "") + ",".join(parts))
+            total_in += len(keys)
+            touched += len(parts)
+        f.write("}")
+    os.replace(tmp_path, out_path)
+    return touched, total_in
 
+def main():
     out_path = "policy/avg_policy_artificial.json.gz"
-    with gzip.open(out_path, "wt", encoding="utf-8") as f:
-        json.dump(new_policy_compact, f, separators=(",",":"), ensure_ascii=False)
-
-    total_in = len(base_policy)
+    touched, total_in = generate_artificial_policy("policy/avg_policy.json.gz", out_path)
     print(f"[OK] Infosets modifiés: {touched} / {total_in}")
     print(f"[SAVE] {out_path}")
 
@@ -0,0 +1,299 @@
+# benchmarks/hot_paths.py
+# ============================================================
+# Suite de micro-benchmarks des chemins chauds du solveur, graines fixes, résultats en JSON
+# pour comparer les commits entre eux :
+#   playout        mains aléatoires complètes de PokerGameExpresso (mains/s)
+#   process_action appels à process_action pendant ces mains (ops/s)
+#   snapshot       snapshot() + restore() sur des états de milieu de main (ops/s)
+#   infoset_key    build_infoset_key_fast (appels/s)
+#   rank7          évaluations 7 cartes (éval/s)
+#   cfr            CFRPlusSolver.run_iteration (it/s), une entrée par traversée, avec les taux
+#                  de hits des caches d'isomorphie (card_isomorphism)
+#   push_fold      SpinGoPushFoldSolver.iterate(1) (s/itération)
+#   policy_io      sauvegarde / chargement de la policy (.json.gz et .gtop)
+#
+# Usage (depuis la racine du repo) :
+#   python -m benchmarks.hot_paths [--only rank7 cfr] [--scale 0.5] [--profile]
+#   python -m benchmarks.hot_paths --compare profiling/bench_hot_paths_<ancien>.json
+# ============================================================
+
+from __future__ import annotations
+import argparse
+import contextlib
+import cProfile
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import tempfile
+import time
+from typing import Callable, Dict, List
+
+from card_isomorphism import CACHES, cache_stats
+from cfr_solver import CFRPlusSolver, TRAVERSALS, DEFAULT_TRAVERSAL
+from infoset import build_infoset_key_fast
+from policy import AveragePolicy
+from utils import rank7
+
+STACKS = (100, 100, 100)
+
+
+def _rate(count: int, seconds: float, unit: str) -> Dict:
+    return {"count": count, "seconds": round(seconds, 6), "per_second": count / max(seconds, 1e-12), "unit": unit}
+
+
+def _random_hand(solver: CFRPlusSolver, rng: random.Random):
+    """Joue une main complète avec des actions légales tirées uniformément."""
+    game = solver.new_game()
+    while game.current_phase != "SHOWDOWN":
+        game.process_action(game.players[game.current_role], rng.choice(solver.legal_actions(game)))
+    return game
+
+
+def _midgame_states(solver: CFRPlusSolver, rng: random.Random, n: int) -> List:
+    """n parties arrêtées à une décision aléatoire (préflop à river), pour snapshot / clés."""
+    states = []
+    while len(states) < n:
+        game = solver.new_game()
+        stop = rng.randrange(8)
+        for _ in range(stop):
+            if game.current_phase == "SHOWDOWN":
+                break
+            game.process_action(game.players[game.current_role], rng.choice(solver.legal_actions(game)))
+        if game.current_phase != "SHOWDOWN":
+            states.append(game)
+    return states
+
+
+# -------------------------
+# Benchmarks (chacun : (seed, scale) -> dict de mesures)
+# -------------------------
+def bench_playout(seed: int, scale: float) -> Dict:
+    random.seed(seed)
+    rng = random.Random(seed)
+    solver = CFRPlusSolver(seed=seed, stacks=STACKS)
+    hands = max(1, int(5000 * scale))
+    start = time.perf_counter()
+    for _ in range(hands):
+        _random_hand(solver, rng)
+    return _rate(hands, time.perf_counter() - start, "hands")
+
+
+def bench_process_action(seed: int, scale: float) -> Dict:
+    """Temps cumulé dans process_action seul (légalité, tirage et création de la main exclus)."""
+    random.seed(seed)
+    rng = random.Random(seed)
+    solver = CFRPlusSolver(seed=seed, stacks=STACKS)
+    calls = 0
+    elapsed = 0.0
+    for _ in range(max(1, int(2000 * scale))):
+        game = solver.new_game()
+        while game.current_phase != "SHOWDOWN":
+            player = game.players[game.current_role]
+            action = rng.choice(solver.legal_actions(game))
+            start = time.perf_counter()
+            game.process_action(player, action)
+            elapsed += time.perf_counter() - start
+            calls += 1
+    return _rate(calls, elapsed, "ops")
+
+
+def bench_snapshot(seed: int, scale: float) -> Dict:
+    random.seed(seed)
+    states = _midgame_states(CFRPlusSolver(seed=seed, stacks=STACKS), random.Random(seed), 64)
+    rounds = max(1, int(1000 * scale))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for game in states:
+            game.restore(game.snapshot())
+    return _rate(rounds * len(states), time.perf_counter() - start, "snapshot+restore")
+
+
+def bench_infoset_key(seed: int, scale: float) -> Dict:
+    random.seed(seed)
+    states = _midgame_states(CFRPlusSolver(seed=seed, stacks=STACKS), random.Random(seed), 64)
+    pairs = [(game, game.players[game.current_role]) for game in states]
+    rounds = max(1, int(2000 * scale))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for game, player in pairs:
+            build_infoset_key_fast(game, player)
+    return _rate(rounds * len(pairs), time.perf_counter() - start, "keys")
+
+
+def bench_rank7(seed: int, scale: float) -> Dict:
+    rng = random.Random(seed)
+    hands = [tuple(rng.sample(range(52), 7)) for _ in range(1000)]
+    rank7(hands[0])                                   # construit l'évaluateur Treys hors mesure
+    rounds = max(1, int(100 * scale))
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for cards7 in hands:
+            rank7(cards7)
+    return _rate(rounds * len(hands), time.perf_counter() - start, "evals")
+
+
+def bench_cfr(seed: int, scale: float, traversals: List[str] = None) -> Dict:
+    """it/s par traversée, après 10 itérations de chauffe (tables non vides)."""
+    results = {}
+    for traversal in traversals or [DEFAULT_TRAVERSAL]:
+        random.seed(seed)
+        for cache in CACHES.values():
+            cache.reset()
+        solver = CFRPlusSolver(seed=seed, stacks=STACKS, traversal=traversal)
+        for _ in range(10):
+            solver.run_iteration()
+        iterations = max(1, int(1000 * scale))
+        start = time.perf_counter()
+        for _ in range(iterations):
+            solver.run_iteration()
+        results[traversal] = dict(_rate(iterations, time.perf_counter() - start, "iterations"),
+                                  infosets=len(solver.strategy_sum),
+                                  iso_caches={name: stats["hit_rate"] for name, stats in cache_stats().items()})
+    return results
+
+
+def bench_push_fold(seed: int, scale: float) -> Dict:
+    from push_fold.expresso_pushfold_solver import ExpressoConfig, SpinGoPushFoldSolver
+    random.seed(seed)
+    config = ExpressoConfig(stacks_bb=(25.0, 25.0, 25.0), mc_samples=max(80, int(400 * scale)), seed=seed)
+    solver = SpinGoPushFoldSolver(config, {})
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        solver.iterate(n_iters=1)
+    return {"seconds_per_iteration": time.perf_counter() - start, "mc_samples": config.mc_samples}
+
+
+def bench_policy_io(seed: int, scale: float) -> Dict:
+    """Sauvegarde / chargement d'une policy produite par un court entraînement (graine fixe)."""
+    random.seed(seed)
+    solver = CFRPlusSolver(seed=seed, stacks=STACKS)
+    for _ in range(max(1, int(2000 * scale))):
+        solver.run_iteration()
+    timings = {"infosets": len(solver.strategy_sum)}
+    with tempfile.TemporaryDirectory() as tmp, contextlib.redirect_stdout(io.StringIO()):
+        json_path, binary_path = os.path.join(tmp, "policy.json.gz"), os.path.join(tmp, "policy.gtop")
+        for name, action in (("save_json_s", lambda: solver.save_policy_json(json_path)),
+                             ("save_gtop_s", lambda: solver.save_policy_binary(binary_path)),
+                             ("load_json_s", lambda: AveragePolicy.load(json_path)),
+                             ("load_gtop_s", lambda: AveragePolicy.load(binary_path)),
+                             ("open_gtop_mmap_s", lambda: AveragePolicy.open_mapped(binary_path))):
+            start = time.perf_counter()
+            action()
+            timings[name] = time.perf_counter() - start
+        timings["json_bytes"] = os.path.getsize(json_path)
+        timings["gtop_bytes"] = os.path.getsize(binary_path)
+    return timings
+
+
+BENCHMARKS: Dict[str, Callable] = {
+    "playout": bench_playout,
+    "process_action": bench_process_action,
+    "snapshot": bench_snapshot,
+    "infoset_key": bench_infoset_key,
+    "rank7": bench_rank7,
+    "cfr": bench_cfr,
+    "push_fold": bench_push_fold,
+    "policy_io": bench_policy_io,
+}
+
+
+# -------------------------
+# Exécution / comparaison
+# -------------------------
+def _git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        return ""
+
+
+def run_suite(names: List[str], seed: int = 42, scale: float = 1.0, traversals: List[str] = None,
+              profile_dir: str = None) -> Dict:
+    """Exécute les benchmarks demandés ; un benchmark qui échoue est consigné sous "error"."""
+    results = {}
+    for name in names:
+        kwargs = {"traversals": traversals} if name == "cfr" else {}
+        profiler = cProfile.Profile() if profile_dir else None
+        start = time.perf_counter()
+        try:
+            if profiler:
+                profiler.enable()
+            results[name] = BENCHMARKS[name](seed, scale, **kwargs)
+        except Exception as exc:   # ex. module push_fold non importable : les autres mesures restent valides
+            results[name] = {"error": f"{type(exc).__name__}: {exc}"}
+        finally:
+            if profiler:
+                profiler.disable()
+                profiler.dump_stats(os.path.join(profile_dir, f"bench_{name}.prof"))
+        print(f"[BENCH] {name:<15} {time.perf_counter() - start:6.1f}s  {_summary(results[name])}")
+    return {
+        "commit": _git_commit(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "seed": seed,
+        "scale": scale,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "results": results,
+    }
+
+
+def _summary(result: Dict) -> str:
+    if "error" in result:
+        return f"[ERREUR] {result['error']}"
+    if "per_second" in result:
+        return f"{result['per_second']:,.0f} {result['unit']}/s"
+    if all(isinstance(value, dict) for value in result.values()):
+        return "  ".join(f"{key}={_summary(value)}" for key, value in result.items())
+    return "  ".join(f"{key}={value:.4g}" if isinstance(value, float) else f"{key}={value}"
+                     for key, value in result.items())
+
+
+def _flatten(results: Dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, float) and (key == "per_second" or key.endswith("_s")
+                                           or key == "seconds_per_iteration"):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(previous: Dict, current: Dict) -> None:
+    """Ratio courant / précédent par mesure (débits : >1 = plus rapide ; durées : <1 = plus rapide)."""
+    old, new = _flatten(previous["results"]), _flatten(current["results"])
+    print(f"\nComparaison {previous.get('commit') or '?'} -> {current.get('commit') or '?'}")
+    for key in sorted(old.keys() & new.keys()):
+        print(f"  {key:<40} {old[key]:>14.6g} -> {new[key]:>14.6g}  x{new[key] / max(old[key], 1e-12):.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks des chemins chauds du solveur (JSON)")
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiplie le nombre d'opérations de chaque mesure")
+    parser.add_argument("--traversals", nargs="+", choices=list(TRAVERSALS), default=[DEFAULT_TRAVERSAL],
+                        help="Traversées mesurées par le benchmark cfr")
+    parser.add_argument("--profile", action="store_true", help="cProfile par benchmark -> profiling/bench_<nom>.prof (mesures ralenties, ne pas comparer)")
+    parser.add_argument("--out", default=None, help="Défaut: profiling/bench_hot_paths_<commit>.json")
+    parser.add_argument("--compare", default=None, help="Rapport JSON précédent à comparer")
+    args = parser.parse_args()
+
+    os.makedirs("profiling", exist_ok=True)
+    report = run_suite(args.only, args.seed, args.scale, args.traversals, "profiling" if args.profile else None)
+    out = args.out or f"profiling/bench_hot_paths_{report['commit'] or 'local'}.json"
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"[SAVE] {out}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), report)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+# benchmarks/import_time.py
+# ============================================================
+# Temps d'import des points d'entrée (interpréteur neuf à chaque mesure) :
+# temps mural médian + modules les plus coûteux d'après `python -X importtime`.
+#
+# Usage (depuis la racine du repo) :
+#   python -m benchmarks.import_time --repeats 5 --top 8 [--json import_time.json]
+# ============================================================
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# nom -> (répertoire ajouté au sys.path, module importé) ; les scripts de ml/ s'importent depuis ml/
+ENTRY_POINTS: Dict[str, Tuple[str, str]] = {
+    "cfr_solver": (ROOT, "cfr_solver"),
+    "policy": (ROOT, "policy"),
+    "push_fold": (ROOT, "push_fold.expresso_pushfold_solver"),
+    "ml.train": (os.path.join(ROOT, "ml"), "train"),
+    "ml.inference": (os.path.join(ROOT, "ml"), "inference"),
+    "ml.numpy_model": (os.path.join(ROOT, "ml"), "numpy_model"),
+}
+
+
+def _command(path: str, module: str, importtime: bool = False) -> List[str]:
+    flags = ["-X", "importtime"] if importtime else []
+    return [sys.executable, *flags, "-c", f"import sys; sys.path.insert(0, {path!r}); import {module}"]
+
+
+def wall_times(path: str, module: str, repeats: int) -> Tuple[List[float], str]:
+    """Durées (s) de `repeats` interpréteurs qui importent `module` ; message d'erreur si l'import échoue."""
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = subprocess.run(_command(path, module), cwd=ROOT, capture_output=True, text=True)
+        timings.append(time.perf_counter() - start)
+        if result.returncode != 0:
+            return timings, result.stderr.strip().splitlines()[-1]
+    return timings, ""
+
+
+def top_imports(path: str, module: str, top: int) -> List[Tuple[str, float]]:
+    """Imports directs de `module` les plus coûteux (temps cumulé, ms) d'après -X importtime."""
+    result = subprocess.run(_command(path, module, importtime=True), cwd=ROOT, capture_output=True, text=True)
+    # -X importtime liste les enfants avant leur parent, indentés de 2 espaces par niveau
+    children: List[Tuple[str, float]] = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        if not cumulative_us.strip().isdigit():
+            continue                                   # ligne d'en-tête
+        depth = (len(name) - len(name.lstrip())) // 2
+        if depth == 1:
+            children.append((name.strip(), int(cumulative_us) / 1e3))
+        elif depth == 0:
+            if name.strip() == module:
+                return sorted(children, key=lambda item: -item[1])[:top]
+            children = []
+    return []
+
+
+def run(repeats: int = 5, top: int = 8, entries: List[str] = None) -> Dict[str, Dict]:
+    baseline, _ = wall_times(ROOT, "sys", repeats)
+    report = {"python_startup_ms": 1e3 * statistics.median(baseline)}
+    for name in entries or ENTRY_POINTS:
+        path, module = ENTRY_POINTS[name]
+        timings, error = wall_times(path, module, repeats)
+        entry = {"median_ms": 1e3 * statistics.median(timings),
+                 "import_ms": 1e3 * (statistics.median(timings) - statistics.median(baseline))}
+        if error:
+            entry["error"] = error
+        else:
+            entry["top"] = [{"module": module_name, "cumulative_ms": ms}
+                            for module_name, ms in top_imports(path, module, top)]
+        report[name] = entry
+    return report
+
+
+def print_report(report: Dict[str, Dict]) -> None:
+    print(f"Démarrage de l'interpréteur seul : {report['python_startup_ms']:.0f} ms")
+    for name, entry in report.items():
+        if name == "python_startup_ms":
+            continue
+        print(f"\n{name:<16} {entry['median_ms']:>7.0f} ms  (import {entry['import_ms']:.0f} ms)")
+        if "error" in entry:
+            print(f"  [ERREUR] {entry['error']}")
+            continue
+        for item in entry["top"]:
+            print(f"  {item['module']:<40} {item['cumulative_ms']:>8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Temps d'import des points d'entrée (cfr_solver, policy, push_fold, ml)")
+    parser.add_argument("--repeats", type=int, default=5, help="Interpréteurs lancés par point d'entrée (médiane)")
+    parser.add_argument("--top", type=int, default=8, help="Imports directs les plus coûteux affichés")
+    parser.add_argument("--only", nargs="+", choices=list(ENTRY_POINTS), default=None)
+    parser.add_argument("--json", default=None, help="Écrit aussi le rapport dans ce fichier JSON")
+    args = parser.parse_args()
+
+    report = run(args.repeats, args.top, args.only)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"\n[SAVE] {args.json}")
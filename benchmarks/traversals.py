@@ -0,0 +1,172 @@
+# benchmarks/traversals.py
+# ============================================================
+# Compare les traversées MCCFR de CFRPlusSolver : convergence d'un proxy
+# d'exploitabilité en fonction du temps mural d'entraînement.
+#
+# Usage (depuis la racine du repo) :
+#   python -m benchmarks.traversals --seconds 60 --checkpoints 6
+# ============================================================
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import random
+import time
+from typing import Dict, List
+
+from cfr_solver import CFRPlusSolver, TRAVERSALS, AVERAGING_MODES, DEFAULT_AVERAGING, ACTIONS, ACTION_INDEX, N_ACTIONS
+from infoset import build_infoset_key_fast
+
+def average_strategy(solver: CFRPlusSolver, infoset_key: int, legal_actions) -> List[float]:
+    probabilities = [0.0] * N_ACTIONS
+    strategy_vector = solver.strategy_sum.get(infoset_key)
+    total = sum(strategy_vector[ACTION_INDEX[a]] for a in legal_actions) if strategy_vector else 0.0
+    for action_name in legal_actions:
+        index = ACTION_INDEX[action_name]
+        probabilities[index] = strategy_vector[index] / total if total > 0 else 1.0 / len(legal_actions)
+    return probabilities
+
+def rollout_average(solver: CFRPlusSolver, game, hero_role: int, rng: random.Random) -> float:
+    while game.current_phase != "SHOWDOWN":
+        player = game.players[game.current_role]
+        legal_actions = solver.legal_actions(game)
+        probabilities = average_strategy(solver, build_infoset_key_fast(game, player), legal_actions)
+        game.process_action(player, sample(probabilities, rng))
+    return solver.terminal_expected_value(game, hero_role)
+
+def sample(probabilities: List[float], rng: random.Random) -> str:
+    random_value = rng.random()
+    cumulative = 0.0
+    for index, probability in enumerate(probabilities):
+        cumulative += probability
+        if random_value <= cumulative:
+            return ACTIONS[index]
+    return ACTIONS[max(range(N_ACTIONS), key=lambda k: probabilities[k])]
+
+def resample_hidden_cards(game, hero_role: int, rng: random.Random) -> None:
+    # Redonne les cartes privées adverses et le deck restant parmi les cartes inconnues du hero
+    known = {c.id for c in game.players[hero_role].cards} | {c.id for c in game.community_cards}
+    unknown = [c for p in game.players if p.role != hero_role for c in p.cards] + list(game.remaining_deck)
+    unknown = [c for c in unknown if c.id not in known]
+    rng.shuffle(unknown)
+    for player in game.players:
+        if player.role != hero_role and player.cards:
+            player.cards = [unknown.pop(), unknown.pop()]
+    game.remaining_deck = unknown
+
+def local_best_response_gain(solver: CFRPlusSolver, deals: int, rollouts: int, seed: int) -> float:
+    """
+    Proxy d'exploitabilité (bb/main) : gain moyen d'une déviation locale à un pas.
+    Sur des donnes fixes (seed), on joue la stratégie moyenne ; à chaque décision,
+    Q(a) est estimé par `rollouts` rollouts sous la stratégie moyenne (cartes cachées
+    re-tirées à chaque rollout, sinon le hero serait clairvoyant) et on mesure
+    max_a Q(a) - sum_a sigma_bar(a) Q(a). Nul à l'équilibre, comparable entre variantes.
+    """
+    rng = random.Random(seed)
+    random.seed(seed)  # le deck de PokerGameExpresso utilise le module random global
+    total_gain = 0.0
+    decisions = 0
+
+    for _ in range(deals):
+        game = solver.new_game()
+        while game.current_phase != "SHOWDOWN":
+            role = game.current_role
+            player = game.players[role]
+            legal_actions = solver.legal_actions(game)
+            probabilities = average_strategy(solver, build_infoset_key_fast(game, player), legal_actions)
+
+            snapshot = game.snapshot()
+            dealt_cards = [list(p.cards) for p in game.players]
+            q_values = {}
+            for action_name in legal_actions:
+                value = 0.0
+                for _ in range(rollouts):
+                    for p, cards in zip(game.players, dealt_cards):
+                        p.cards = cards
+                    resample_hidden_cards(game, role, rng)
+                    game.process_action(player, action_name)
+                    value += rollout_average(solver, game, role, rng)
+                    game.restore(snapshot)
+                q_values[action_name] = value / rollouts
+            for p, cards in zip(game.players, dealt_cards):
+                p.cards = cards
+
+            expected = sum(probabilities[ACTION_INDEX[a]] * q_values[a] for a in legal_actions)
+            total_gain += max(q_values.values()) - expected
+            decisions += 1
+
+            game.process_action(player, sample(probabilities, rng))
+
+    return total_gain / max(1, decisions)
+
+def run_variant(traversal: str, seconds: float, checkpoints: int, seed: int,
+                eval_deals: int, eval_rollouts: int, stacks, averaging: str, prune: bool) -> Dict:
+    random.seed(seed)
+    solver = CFRPlusSolver(seed=seed, stacks=stacks, traversal=traversal, averaging=averaging, prune=prune)
+    budget_per_checkpoint = seconds / checkpoints
+
+    curve = []
+    train_time = 0.0
+    iterations = 0
+    for _ in range(checkpoints):
+        start = time.perf_counter()
+        while time.perf_counter() - start < budget_per_checkpoint:
+            solver.run_iteration()
+            iterations += 1
+        train_time += time.perf_counter() - start
+
+        # L'évaluation est exclue du temps d'entraînement
+        proxy = local_best_response_gain(solver, eval_deals, eval_rollouts, seed + 1)
+        curve.append({
+            "train_seconds": round(train_time, 3),
+            "iterations": iterations,
+            "infosets": len(solver.strategy_sum),
+            "proxy_bb": proxy,
+        })
+        print(f"[{traversal:>10}] t={train_time:7.1f}s it={iterations:7d} "
+              f"infosets={len(solver.strategy_sum):7d} proxy={proxy:.4f} bb")
+
+    return {
+        "traversal": traversal,
+        "averaging": averaging,
+        "prune": prune,
+        "iterations_per_second": iterations / max(train_time, 1e-9),
+        "curve": curve,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark des traversées MCCFR (proxy d'exploitabilité / seconde)")
+    parser.add_argument("--traversals", nargs="+", choices=list(TRAVERSALS), default=list(TRAVERSALS))
+    parser.add_argument("--seconds", type=float, default=60.0, help="Budget d'entraînement par variante")
+    parser.add_argument("--checkpoints", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--eval-deals", type=int, default=100)
+    parser.add_argument("--eval-rollouts", type=int, default=16)
+    parser.add_argument("--stacks", type=int, nargs=3, default=(100, 100, 100))
+    parser.add_argument("--averaging", choices=list(AVERAGING_MODES), default=DEFAULT_AVERAGING)
+    parser.add_argument("--prune", action="store_true")
+    parser.add_argument("--out", default="profiling/bench_traversals.json")
+    args = parser.parse_args()
+
+    results = [
+        run_variant(traversal, args.seconds, args.checkpoints, args.seed,
+                    args.eval_deals, args.eval_rollouts, tuple(args.stacks),
+                    args.averaging, args.prune)
+        for traversal in args.traversals
+    ]
+
+    print(f"\n{'='*80}")
+    print(f"{'Traversée':>12} | {'it/s':>10} | {'proxy final (bb)':>16}")
+    print(f"{'='*80}")
+    for result in results:
+        print(f"{result['traversal']:>12} | {result['iterations_per_second']:10.1f} | "
+              f"{result['curve'][-1]['proxy_bb']:16.4f}")
+
+    os.makedirs(os.path.dirname(args.out) or ".", exist_ok=True)
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump({"seconds": args.seconds, "seed": args.seed, "results": results}, f, indent=2)
+    print(f"[SAVE] {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# card_isomorphism.py
+# ============================================================
+# Isomorphie de couleurs : deux situations qui ne diffèrent que par une permutation des
+# 4 couleurs (A♠K♠ sur Q♠7♥2♦ et A♥K♥ sur Q♥7♣2♠) ont les mêmes buckets, la même
+# valeur et le même gagnant au showdown. Les cartes sont manipulées par id
+# (id = (rang-2)*4 + couleur, comme classes.Card).
+#
+#   - suit_signatures / canonical_suit_permutation : forme canonique exacte de groupes de
+#     cartes ordonnés (mains par rôle, board...) : chaque couleur est décrite par ses masques
+#     de rangs dans chaque groupe, puis renumérotée par signature décroissante. Deux
+#     situations isomorphes ont les mêmes signatures triées (canonical_form) ; les couleurs
+#     à signature égale sont interchangeables, la forme est donc unique.
+#   - orbit_size : situations brutes représentées par une forme canonique (poids).
+#     Tirer une donne uniforme puis la canoniser (PokerGameExpresso(canonical_suits=True))
+#     tire chaque forme avec une probabilité proportionnelle à son orbite : pas de
+#     repondération à faire.
+#   - rank7_key / hero_board_key : projections plus grossières de la forme canonique,
+#     limitées à l'information de couleur que lisent rank7 (la couleur d'une éventuelle
+#     flush) et hero_vs_board_bucket ; clés des caches IsoCache (cached_rank7,
+#     infoset.hero_vs_board_bucket_cached).
+# ============================================================
+
+from __future__ import annotations
+from collections import Counter
+from math import factorial
+from typing import Dict, Iterable, List, Sequence
+
+from utils import rank7
+
+_RANK_COUNT_BITS = 3   # compte d'un rang (0..4) dans les clés "multiset de rangs"
+_RANK_FIELD = 13 * _RANK_COUNT_BITS
+
+
+# -------------------------
+# Forme canonique exacte
+# -------------------------
+def suit_signatures(*groups: Iterable[int]) -> List[int]:
+    """Signature de chaque couleur : masques de rangs (13 bits) par groupe, le premier groupe en poids fort."""
+    signatures = [0, 0, 0, 0]
+    shift = 0
+    for group in reversed(groups):
+        for card in group:
+            signatures[card & 3] |= 1 << (shift + (card >> 2))
+        shift += 13
+    return signatures
+
+
+def canonical_suit_permutation(*groups: Iterable[int]) -> List[int]:
+    """perm[couleur d'origine] -> couleur canonique (0 = signature la plus forte)."""
+    signatures = suit_signatures(*groups)
+    perm = [0, 0, 0, 0]
+    for new_suit, suit in enumerate(sorted(range(4), key=signatures.__getitem__, reverse=True)):
+        perm[suit] = new_suit
+    return perm
+
+
+def canonical_form(*groups: Iterable[int]) -> int:
+    """Identifiant de l'orbite (signatures triées concaténées) : égal ssi les situations sont isomorphes."""
+    width = 13 * len(groups)
+    form = 0
+    for signature in sorted(suit_signatures(*groups), reverse=True):
+        form = (form << width) | signature
+    return form
+
+
+def canonicalize_ids(cards: Sequence[int], perm: Sequence[int]) -> List[int]:
+    return [(card & ~3) | perm[card & 3] for card in cards]
+
+
+def orbit_size(*groups: Iterable[int]) -> int:
+    """Nombre de situations brutes distinctes de l'orbite : 24 / |permutations qui la fixent|."""
+    size = 24
+    for count in Counter(suit_signatures(*groups)).values():
+        size //= factorial(count)
+    return size
+
+
+# -------------------------
+# Projections pour les caches
+# -------------------------
+def rank7_key(cards7: Sequence[int]) -> int:
+    """
+    Classe de force de 7 cartes : multiset des rangs (3 bits par rang) + masque de rangs de la
+    couleur qui a au moins 5 cartes (au plus une). Sans flush possible, les couleurs n'ont
+    aucune influence : ~50k classes au lieu de 133M combinaisons.
+    """
+    key = 0
+    masks = [0, 0, 0, 0]
+    for card in cards7:
+        rank = card >> 2
+        key += 1 << (_RANK_COUNT_BITS * rank)
+        masks[card & 3] |= 1 << rank
+    for mask in masks:
+        if mask.bit_count() >= 5:
+            return key | (mask << _RANK_FIELD)
+    return key
+
+
+def hero_board_key(hole: Sequence[int], board: Sequence[int]) -> int:
+    """
+    Tout ce que lit hero_vs_board_bucket : multisets de rangs du board et de la main, et le
+    plus grand nombre de cartes du board dans une couleur du hero (tirage/couleur faite).
+    """
+    board_ranks = 0
+    board_suits = [0, 0, 0, 0]
+    for card in board:
+        board_ranks += 1 << (_RANK_COUNT_BITS * (card >> 2))
+        board_suits[card & 3] += 1
+    hole_ranks = 0
+    suited = 0
+    for card in hole:
+        hole_ranks += 1 << (_RANK_COUNT_BITS * (card >> 2))
+        suited = max(suited, board_suits[card & 3])
+    return (suited << (2 * _RANK_FIELD)) | (hole_ranks << _RANK_FIELD) | board_ranks
+
+
+# -------------------------
+# Caches bornés
+# -------------------------
+class IsoCache:
+    """Dict clé canonique -> valeur, vidé entièrement quand il dépasse `max_entries`."""
+
+    def __init__(self, name: str, max_entries: int = 1 << 20):
+        self.name = name
+        self.max_entries = max_entries
+        self.table: Dict[int, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.clears = 0
+
+    def store(self, key: int, value: int) -> int:
+        self.misses += 1
+        if len(self.table) >= self.max_entries:
+            self.table.clear()
+            self.clears += 1
+        self.table[key] = value
+        return value
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.table),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "clears": self.clears,
+        }
+
+    def reset(self) -> None:
+        self.table.clear()
+        self.hits = self.misses = self.clears = 0
+
+
+RANK7_CACHE = IsoCache("rank7")
+CACHES: Dict[str, IsoCache] = {RANK7_CACHE.name: RANK7_CACHE}
+
+
+def register_cache(cache: IsoCache) -> IsoCache:
+    CACHES[cache.name] = cache
+    return cache
+
+
+def cached_rank7(cards7: Sequence[int]) -> int:
+    """rank7 mémoïsé sur rank7_key (même résultat que rank7 pour toute permutation des couleurs)."""
+    key = rank7_key(cards7)
+    value = RANK7_CACHE.table.get(key)
+    if value is None:
+        return RANK7_CACHE.store(key, rank7(tuple(cards7)))
+    RANK7_CACHE.hits += 1
+    return value
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    return {name: cache.stats() for name, cache in CACHES.items()}
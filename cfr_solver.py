@@ -2,6 +2,11 @@
 # ============================================================
 # CFR+ externe (external-sampling) 3-handed, full-street, min-raise only.
 # S'appuie sur PokerGameExpresso + infoset.build_infoset_key_fast.
+# Traversées disponibles (voir TRAVERSALS) :
+#   - "es-rollout" : external sampling + rollout heuristique (historique)
+#   - "es"         : external sampling pur (récursion dans les sous-arbres hero)
+#   - "outcome"    : outcome sampling avec poids d'importance
+#   - "chance"     : chance-sampled CFR (largeur complète jusqu'à un horizon)
 # ============================================================
 
 from __future__ import annotations
@@ -10,24 +15,55 @@ import json
 import os
 import time
 import gzip
+import hashlib
+import shutil
 from collections import defaultdict
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 import cProfile
+import argparse
+import platform
+import subprocess
+import sys
 
-from tqdm import trange
 from poker_game_expresso import PokerGameExpresso, GameInit
 from infoset import build_infoset_key_fast
 from stats_policy import extraction_policy_data
-
+from policy import AveragePolicy
+from exploitability import estimate_exploitability, print_report
+from policy_binary import columns_from_compact, columns_to_compact, is_policy_binary, read_policy_binary, write_policy_binary
+from solver_metrics import SolverCounters, StackSampler, MetricsLogger
+from infoset_table import InfosetTable
+from card_isomorphism import cache_stats
+
+# Valeurs par défaut de la CLI (voir build_arg_parser / --config)
 DEBUG_CFR = True
 PROFILE = False
 SAVE_EVERY = 0  # sauvegarde tous les N itérations
+ITERATIONS = 1_000_000
+STACKS = (100, 100, 100)
+STORAGE_BACKENDS = ("json", "gtop")   # .json.gz compact / binaire columnaire (policy_binary)
 
 # Actions fixes
 ACTIONS = ["FOLD", "CHECK", "CALL", "RAISE", "ALL-IN"]
 ACTION_INDEX = {action_name: index for index, action_name in enumerate(ACTIONS)}
 N_ACTIONS = len(ACTIONS)
 
+# Traversées MCCFR sélectionnables (nom -> méthode de CFRPlusSolver)
+TRAVERSALS = {
+    "es-rollout": "traverse_es_rollout",
+    "es":         "traverse_external",
+    "outcome":    "traverse_outcome",
+    "chance":     "traverse_chance",
+}
+DEFAULT_TRAVERSAL = "es-rollout"
+
+# Pondération de strategy_sum / actualisation des regrets
+#   - "uniform" : CFR+ classique (toutes les itérations ont le même poids)
+#   - "linear"  : contribution à strategy_sum pondérée par t (moyenne linéaire)
+#   - "dcfr"    : Discounted CFR (Brown & Sandholm 2019), regrets non clampés
+AVERAGING_MODES = ("uniform", "linear", "dcfr")
+DEFAULT_AVERAGING = "uniform"
+
 
 def quantize_distribution(probabilities: list[float], keep_top_k: int = 3, eps: float = 1e-6):
     """
@@ -81,15 +117,61 @@ def format_game_state_for_debug(game: PokerGameExpresso) -> str:
     )
 
 class CFRPlusSolver:
-    def __init__(self, seed, stacks):
+    def __init__(self, seed, stacks, traversal: str = DEFAULT_TRAVERSAL,
+                 outcome_epsilon: float = 0.6, chance_full_width_depth: int = 4,
+                 averaging: str = DEFAULT_AVERAGING, dcfr_alpha: float = 1.5, dcfr_beta: float = 0.0,
+                 dcfr_gamma: float = 2.0, discount_every: int = 1000,
+                 prune: bool = False, prune_warmup: int = 10_000, prune_min_visits: int = 20,
+                 prune_threshold: float = 0.0, prune_recheck_every: int = 20,
+                 table_capacity: Optional[int] = None, admit_after: int = 2, canonical_deals: bool = False):
         self.seed = seed
         self.stacks = stacks
-
-        self.regret_sum = defaultdict(lambda: [0.0] * N_ACTIONS)
-        self.strategy_sum = defaultdict(lambda: [0.0] * N_ACTIONS)
-        self.visit_count = defaultdict(int)
+        # Donnes renommées en forme canonique de couleurs (PokerGameExpresso.canonicalize_suits)
+        self.canonical_deals = canonical_deals
+
+        if traversal not in TRAVERSALS:
+            raise ValueError(f"[CFR+] Traversée inconnue: {traversal}. Choix: {list(TRAVERSALS)}")
+        self.traversal = traversal
+        self.run_traversal = getattr(self, TRAVERSALS[traversal])
+        self.outcome_epsilon = outcome_epsilon                  # exploration hero (outcome sampling)
+        self.chance_full_width_depth = chance_full_width_depth  # horizon largeur complète (chance)
+
+        if averaging not in AVERAGING_MODES:
+            raise ValueError(f"[CFR+] Pondération inconnue: {averaging}. Choix: {list(AVERAGING_MODES)}")
+        self.averaging = averaging
+        self.dcfr_alpha = dcfr_alpha          # actualisation des regrets positifs
+        self.dcfr_beta = dcfr_beta            # actualisation des regrets négatifs
+        self.dcfr_gamma = dcfr_gamma          # poids t^gamma des contributions à strategy_sum
+        self.discount_every = discount_every  # période (itérations) de l'actualisation des regrets DCFR
+
+        # Regret-based pruning : une action dont le regret est resté <= prune_threshold
+        # sur un infoset visité au moins prune_min_visits fois n'est plus explorée,
+        # sauf une itération sur prune_recheck_every (re-vérification complète).
+        self.prune = prune
+        self.prune_warmup = prune_warmup
+        self.prune_min_visits = prune_min_visits
+        self.prune_threshold = prune_threshold
+        self.prune_recheck_every = prune_recheck_every
+
+        self.iteration = 0
+        self.exploitability_history = []  # [(itération, mbb/main, IC95)]
+        self.strategy_iteration_weight = 1.0
+        self.prune_active = False
+
+        # Tables d'infosets : defaultdict non bornés, ou InfosetTable (capacité fixe, admission
+        # après `admit_after` mises à jour, éviction des lignes froides) derrière des vues dict.
+        # Lecture seule (stratégie courante) : .get, qui ne crée pas d'entrée.
+        self.table = None
+        if table_capacity:
+            self.table = InfosetTable(table_capacity, N_ACTIONS, admit_after=admit_after, seed=seed)
+            self.regret_sum, self.strategy_sum, self.visit_count = self.table.views()
+        else:
+            self.regret_sum = defaultdict(lambda: [0.0] * N_ACTIONS)
+            self.strategy_sum = defaultdict(lambda: [0.0] * N_ACTIONS)
+            self.visit_count = defaultdict(int)
 
         self.rng = random.Random(seed)
+        self.counters = SolverCounters()
 
     # -------------------------
     # Environnement de jeu
@@ -105,7 +187,7 @@ class CFRPlusSolver:
         init.phase = "PREFLOP"
         init.community_cards = []
 
-        game = PokerGameExpresso(init)
+        game = PokerGameExpresso(init, canonical_suits=self.canonical_deals)
         game.deal_small_and_big_blind()
         return game
 
@@ -129,17 +211,18 @@ class CFRPlusSolver:
     # Regret Matching+
     # -------------------------
     def strategy_from_regret(self, infoset_key: int, legal_actions: List[str]) -> List[float]:
-        regret_vector = self.regret_sum[infoset_key]
+        regret_vector = self.regret_sum.get(infoset_key)
 
         probabilities = [0.0] * N_ACTIONS
         total_positive_regret = 0.0
 
-        for action_name in legal_actions:
-            index = ACTION_INDEX[action_name]
-            regret_value = regret_vector[index]
-            if regret_value > 0:
-                probabilities[index] = regret_value
-                total_positive_regret += regret_value
+        if regret_vector is not None:
+            for action_name in legal_actions:
+                index = ACTION_INDEX[action_name]
+                regret_value = regret_vector[index]
+                if regret_value > 0:
+                    probabilities[index] = regret_value
+                    total_positive_regret += regret_value
 
         if total_positive_regret <= 0.0:
             uniform_probability = 1.0 / len(legal_actions)
@@ -167,7 +250,10 @@ class CFRPlusSolver:
     # Rollout
     # -------------------------
     def rollout_until_terminal(self, game: PokerGameExpresso, hero_role: int, reach_probability: float) -> Tuple[float, float]:
+        counters = self.counters
+        counters.rollouts += 1
         while game.current_phase != "SHOWDOWN":
+            counters.nodes += 1
             current_role = game.current_role
             current_player = game.players[current_role]
 
@@ -185,13 +271,16 @@ class CFRPlusSolver:
 
             game.process_action(current_player, chosen_action)
 
+        counters.showdowns += 1
         return self.terminal_expected_value(game, hero_role), reach_probability
 
     # -------------------------
     # Traverse CFR+
     # -------------------------
     def traverse(self, game: PokerGameExpresso, hero_role: int, reach_probability: float) -> float:
+        counters = self.counters
         while game.current_phase != "SHOWDOWN":
+            counters.nodes += 1
             current_role = game.current_role
             current_player = game.players[current_role]
 
@@ -208,8 +297,10 @@ class CFRPlusSolver:
                 node_expected_utility = 0.0
             
 
+                explored_actions = self.explored_actions(infoset_key, legal_actions)
+
                 snapshot = game.snapshot()
-                for action_name in legal_actions:
+                for action_name in explored_actions:
                     index = ACTION_INDEX[action_name]
                     game.process_action(current_player, action_name)
                     utility, _ = self.rollout_until_terminal(game, hero_role, reach_probability)
@@ -218,19 +309,12 @@ class CFRPlusSolver:
                     action_utilities[index] = utility
                     node_expected_utility += probabilities[index] * utility
 
-                regret_vector = self.regret_sum[infoset_key]
-                strategy_vector = self.strategy_sum[infoset_key]
-
-                for action_name in legal_actions:
+                action_regrets = [0.0] * N_ACTIONS
+                for action_name in explored_actions:
                     index = ACTION_INDEX[action_name]
+                    action_regrets[index] = reach_probability * (action_utilities[index] - node_expected_utility)
 
-                    advantage = action_utilities[index] - node_expected_utility
-                    updated_value = regret_vector[index] + reach_probability * advantage
-                    regret_vector[index] = updated_value if updated_value > 0.0 else 0.0
-
-                    strategy_vector[index] += reach_probability * probabilities[index]
-
-                self.visit_count[infoset_key] += 1
+                self.update_hero_node(infoset_key, legal_actions, probabilities, action_regrets, reach_probability)
 
                 chosen_action = self.sample_from(probabilities)
                 game.process_action(current_player, chosen_action)
@@ -243,38 +327,329 @@ class CFRPlusSolver:
             reach_probability *= probabilities[ACTION_INDEX[chosen_action]]
             game.process_action(current_player, chosen_action)
 
+        counters.showdowns += 1
         return self.terminal_expected_value(game, hero_role)
 
+    # -------------------------
+    # Traversées (interface commune : (game, hero_role) -> utilité hero)
+    # -------------------------
+    def traverse_es_rollout(self, game: PokerGameExpresso, hero_role: int) -> float:
+        return self.traverse(game, hero_role=hero_role, reach_probability=1.0)
+
+    def traverse_external(self, game: PokerGameExpresso, hero_role: int) -> float:
+        return self.traverse_recursive(game, hero_role, 1.0, 1.0, full_width_depth=0)
+
+    def traverse_chance(self, game: PokerGameExpresso, hero_role: int) -> float:
+        # Le deck est tiré une fois à la création de la partie (et restauré par snapshot),
+        # donc la chance est échantillonnée une seule fois par traversée.
+        return self.traverse_recursive(game, hero_role, 1.0, 1.0, full_width_depth=self.chance_full_width_depth)
+
+    def traverse_outcome(self, game: PokerGameExpresso, hero_role: int) -> float:
+        weighted_utility, _ = self.traverse_outcome_sampled(game, hero_role, 1.0, 1.0, 1.0)
+        return weighted_utility
+
+    def explored_actions(self, infoset_key: int, legal_actions: List[str]) -> List[str]:
+        """Actions hero à explorer (regret-based pruning). Une action élaguée a une proba nulle."""
+        if not self.prune_active or self.visit_count.get(infoset_key, 0) < self.prune_min_visits:
+            return legal_actions
+
+        regret_vector = self.regret_sum.get(infoset_key)
+        # Sans regret positif la stratégie est uniforme : rien ne peut être élagué
+        if regret_vector is None or not any(regret_vector[ACTION_INDEX[a]] > 0.0 for a in legal_actions):
+            return legal_actions
+
+        return [a for a in legal_actions if regret_vector[ACTION_INDEX[a]] > self.prune_threshold]
+
+    def update_hero_node(self, infoset_key: int, legal_actions: List[str], probabilities: List[float],
+                         action_regrets: List[float], strategy_weight: float) -> None:
+        self.counters.hero_nodes += 1
+        regret_vector = self.regret_sum[infoset_key]
+        if self.averaging == "dcfr":
+            # DCFR : regrets négatifs conservés (actualisés par beta dans discount_regrets)
+            for action_name in legal_actions:
+                index = ACTION_INDEX[action_name]
+                regret_vector[index] += action_regrets[index]
+        else:
+            for action_name in legal_actions:
+                index = ACTION_INDEX[action_name]
+                updated_value = regret_vector[index] + action_regrets[index]
+                regret_vector[index] = updated_value if updated_value > 0.0 else 0.0
+
+        # Un poids nul créerait une entrée vide (total <= 0 à l'extraction)
+        if strategy_weight > 0.0:
+            strategy_weight *= self.strategy_iteration_weight
+            strategy_vector = self.strategy_sum[infoset_key]
+            for action_name in legal_actions:
+                index = ACTION_INDEX[action_name]
+                strategy_vector[index] += strategy_weight * probabilities[index]
+            self.visit_count[infoset_key] += 1
+
+    def traverse_recursive(self, game: PokerGameExpresso, hero_role: int, hero_reach: float,
+                           opponent_reach: float, full_width_depth: int) -> float:
+        """
+        Traversée récursive partagée par "es" et "chance".
+        - Noeud hero : toutes les actions sont explorées (snapshot/restore), regrets pondérés
+          par la reach des adversaires, strategy_sum par la reach du hero.
+        - Noeud adversaire à moins de `full_width_depth` décisions de la racine : largeur complète.
+        - Au-delà : une action adversaire est échantillonnée (external sampling).
+        """
+        counters = self.counters
+        if game.current_phase == "SHOWDOWN":
+            counters.showdowns += 1
+            return self.terminal_expected_value(game, hero_role)
+
+        counters.nodes += 1
+        current_role = game.current_role
+        current_player = game.players[current_role]
+
+        infoset_key = build_infoset_key_fast(game, current_player)
+        legal_actions = self.legal_actions(game)
+
+        if not legal_actions or len(legal_actions) < 2:
+            raise RuntimeError(f"[CFR+] Aucune action légale.\n{format_game_state_for_debug(game)}")
+
+        probabilities = self.strategy_from_regret(infoset_key, legal_actions)
+        next_depth = full_width_depth - 1 if full_width_depth > 0 else 0
+
+        if current_role == hero_role:
+            action_utilities = [0.0] * N_ACTIONS
+            node_expected_utility = 0.0
+            explored_actions = self.explored_actions(infoset_key, legal_actions)
+
+            snapshot = game.snapshot()
+            for action_name in explored_actions:
+                index = ACTION_INDEX[action_name]
+                game.process_action(current_player, action_name)
+                utility = self.traverse_recursive(game, hero_role, hero_reach * probabilities[index],
+                                                  opponent_reach, next_depth)
+                game.restore(snapshot)
+
+                action_utilities[index] = utility
+                node_expected_utility += probabilities[index] * utility
+
+            action_regrets = [0.0] * N_ACTIONS
+            for action_name in explored_actions:
+                index = ACTION_INDEX[action_name]
+                action_regrets[index] = opponent_reach * (action_utilities[index] - node_expected_utility)
+
+            self.update_hero_node(infoset_key, legal_actions, probabilities, action_regrets, hero_reach)
+            return node_expected_utility
+
+        if full_width_depth > 0:
+            node_expected_utility = 0.0
+            snapshot = game.snapshot()
+            for action_name in legal_actions:
+                probability = probabilities[ACTION_INDEX[action_name]]
+                if probability <= 0.0:
+                    continue
+                game.process_action(current_player, action_name)
+                node_expected_utility += probability * self.traverse_recursive(
+                    game, hero_role, hero_reach, opponent_reach * probability, next_depth)
+                game.restore(snapshot)
+            return node_expected_utility
+
+        chosen_action = self.sample_from(probabilities)
+        game.process_action(current_player, chosen_action)
+        return self.traverse_recursive(game, hero_role, hero_reach, opponent_reach, 0)
+
+    def traverse_outcome_sampled(self, game: PokerGameExpresso, hero_role: int, hero_reach: float,
+                                 opponent_reach: float, sample_probability: float) -> Tuple[float, float]:
+        """
+        Outcome sampling (Lanctot et al.) : une seule trajectoire par traversée.
+        Le hero échantillonne selon epsilon-uniforme + (1-epsilon)*stratégie, les adversaires selon
+        leur stratégie courante. Retourne (utilité / q(z), probabilité de la queue sous sigma).
+        """
+        counters = self.counters
+        if game.current_phase == "SHOWDOWN":
+            counters.showdowns += 1
+            return self.terminal_expected_value(game, hero_role) / sample_probability, 1.0
+
+        counters.nodes += 1
+        current_role = game.current_role
+        current_player = game.players[current_role]
+
+        infoset_key = build_infoset_key_fast(game, current_player)
+        legal_actions = self.legal_actions(game)
+
+        if not legal_actions or len(legal_actions) < 2:
+            raise RuntimeError(f"[CFR+] Aucune action légale.\n{format_game_state_for_debug(game)}")
+
+        probabilities = self.strategy_from_regret(infoset_key, legal_actions)
+
+        if current_role != hero_role:
+            chosen_action = self.sample_from(probabilities)
+            probability = probabilities[ACTION_INDEX[chosen_action]]
+            game.process_action(current_player, chosen_action)
+            weighted_utility, tail_probability = self.traverse_outcome_sampled(
+                game, hero_role, hero_reach, opponent_reach * probability, sample_probability * probability)
+            return weighted_utility, tail_probability * probability
+
+        epsilon = self.outcome_epsilon
+        uniform_probability = 1.0 / len(legal_actions)
+        sampling_probabilities = [0.0] * N_ACTIONS
+        for action_name in legal_actions:
+            index = ACTION_INDEX[action_name]
+            sampling_probabilities[index] = epsilon * uniform_probability + (1.0 - epsilon) * probabilities[index]
+
+        chosen_action = self.sample_from(sampling_probabilities)
+        chosen_index = ACTION_INDEX[chosen_action]
+        game.process_action(current_player, chosen_action)
+        weighted_utility, tail_probability = self.traverse_outcome_sampled(
+            game, hero_role, hero_reach * probabilities[chosen_index], opponent_reach,
+            sample_probability * sampling_probabilities[chosen_index])
+
+        # w = u(z) * pi_-i(z) / q(z) ; regrets échantillonnés (Lanctot 2009, eq. 4.2)
+        importance_weight = weighted_utility * opponent_reach
+        action_regrets = [0.0] * N_ACTIONS
+        for action_name in legal_actions:
+            index = ACTION_INDEX[action_name]
+            if index == chosen_index:
+                action_regrets[index] = importance_weight * tail_probability * (1.0 - probabilities[chosen_index])
+            else:
+                action_regrets[index] = -importance_weight * tail_probability * probabilities[chosen_index]
+
+        # Moyenne stochastiquement pondérée : reach hero / probabilité d'échantillonnage
+        self.update_hero_node(infoset_key, legal_actions, probabilities, action_regrets,
+                              hero_reach / sample_probability)
+        return weighted_utility, tail_probability * probabilities[chosen_index]
+
+    # -------------------------
+    # Itération / pondérations
+    # -------------------------
+    def run_iteration(self) -> None:
+        self.iteration += 1
+        t = self.iteration
+
+        if self.averaging == "linear":
+            self.strategy_iteration_weight = float(t)
+        elif self.averaging == "dcfr":
+            self.strategy_iteration_weight = float(t) ** self.dcfr_gamma
+        else:
+            self.strategy_iteration_weight = 1.0
+
+        self.prune_active = (
+            self.prune
+            and t > self.prune_warmup
+            and (self.prune_recheck_every <= 0 or t % self.prune_recheck_every != 0)
+        )
+
+        for hero_role in (0, 1, 2):
+            game = self.new_game()
+            self.run_traversal(game, hero_role)
+
+        if self.averaging == "dcfr" and self.discount_every > 0 and t % self.discount_every == 0:
+            self.discount_regrets(t // self.discount_every)
+
+    def discount_regrets(self, period: int) -> None:
+        """
+        Actualisation DCFR appliquée par blocs de discount_every itérations (une passe sur la table
+        au lieu d'une par itération) : regrets positifs * n^a/(n^a+1), négatifs * n^b/(n^b+1).
+        L'actualisation de strategy_sum est portée par le poids t^gamma des contributions.
+        """
+        positive_scale = period ** self.dcfr_alpha / (period ** self.dcfr_alpha + 1.0)
+        negative_scale = period ** self.dcfr_beta / (period ** self.dcfr_beta + 1.0)
+        if self.table is not None:
+            self.table.discount_regrets(positive_scale, negative_scale)
+            return
+        for regret_vector in self.regret_sum.values():
+            for index in range(N_ACTIONS):
+                value = regret_vector[index]
+                if value > 0.0:
+                    regret_vector[index] = value * positive_scale
+                elif value < 0.0:
+                    regret_vector[index] = value * negative_scale
+
     # -------------------------
     # Entraînement
     # -------------------------
-    def train(self, iterations: int = 1000) -> None:
+    def evaluate_exploitability(self, deals: int = 2000, workers=None) -> dict:
+        policy = AveragePolicy.from_compact(self.extract_average_policy())
+        report = estimate_exploitability(policy, self.stacks, fit_deals=deals, eval_deals=deals,
+                                         workers=workers, seed=self.seed)
+        self.exploitability_history.append(
+            (self.iteration, report["exploitability_mbb"], report["exploitability_ci95"]))
+        return report
+
+    def train(self, iterations: int = 1000, eval_at=(), eval_deals: int = 2000,
+              metrics_path: Optional[str] = None, metrics_every: float = 10.0,
+              sample_interval: float = 0.01, sample_profile: Optional[str] = None,
+              out_path: str = "policy/avg_policy.json.gz", ui_copy: Optional[str] = "ui/public/avg_policy.json.gz",
+              storage: str = "json", save_every: int = SAVE_EVERY, workers: Optional[int] = None) -> dict:
+        """
+        Instrumentation (solver_metrics) : compteurs + échantillonnage de pile toutes les
+        `sample_interval` s (0 = désactivé) ; toutes les `metrics_every` s, postfix tqdm et une ligne
+        JSON dans `metrics_path`. `sample_profile` : piles complètes au format collapsed (flamegraph).
+        Policy finale dans `out_path` (format `storage`), checkpoints tous les `save_every` itérations,
+        copie .json.gz pour l'UI dans `ui_copy`. Retourne le débit de la boucle d'entraînement.
+        """
+        if storage not in STORAGE_BACKENDS:
+            raise ValueError(f"[CFR+] Stockage inconnu: {storage}. Choix: {list(STORAGE_BACKENDS)}")
         print(f"\n{'='*80}")
         print(f"DÉMARRAGE ENTRAÎNEMENT CFR+")
         print(f"{'='*80}")
         print(f"Stacks: {self.stacks}")
         print(f"Itérations: {iterations}")
         print(f"Seed: {self.seed}")
+        print(f"Traversée: {self.traversal}")
+        print(f"Pondération: {self.averaging}")
+        print(f"Pruning: {'ON' if self.prune else 'OFF'}")
         print(f"{'='*80}\n")
 
         start_time = time.time()
-        os.makedirs('policy', exist_ok=True)
-
-        with trange(1, iterations + 1, desc="CFR+ Training", unit="iter") as progress_bar:
-            for iteration_index in progress_bar:
-                for hero_role in (0, 1, 2):
-                    game = self.new_game()
-                    self.traverse(game, hero_role=hero_role, reach_probability=1.0)
-
-                if SAVE_EVERY > 0 and (iteration_index % SAVE_EVERY == 0):
-                    self.save_policy_json(f"policy/avg_policy_iter_{iteration_index}.json.gz")
-
-        self.save_policy_json("policy/avg_policy.json.gz")
-        self.save_policy_json("ui/public/avg_policy.json.gz")
-        self.print_training_summary(iterations, "policy/avg_policy.json.gz")
+        os.makedirs(os.path.dirname(out_path) or ".", exist_ok=True)
+        start_iteration = self.iteration
+        start_nodes = self.counters.nodes
+
+        sampler = None
+        if sample_interval > 0 or sample_profile:
+            sampler = StackSampler(sample_interval if sample_interval > 0 else 0.01,
+                                   collect_stacks=bool(sample_profile)).start()
+        metrics = MetricsLogger(self, sampler, metrics_path, metrics_every)
+
+        from tqdm import trange  # ~50 ms d'import : seulement quand on entraîne
+        try:
+            with trange(1, iterations + 1, desc="CFR+ Training", unit="iter") as progress_bar:
+                for iteration_index in progress_bar:
+                    self.run_iteration()
+
+                    postfix = metrics.update(self.iteration)
+                    if postfix is not None:
+                        progress_bar.set_postfix(postfix, refresh=False)
+
+                    if iteration_index in eval_at:
+                        print_report(self.evaluate_exploitability(eval_deals, workers))
+
+                    if save_every > 0 and (iteration_index % save_every == 0):
+                        self.save_policy(checkpoint_path(out_path, iteration_index), storage)
+            train_seconds = time.time() - start_time
+            metrics.flush(self.iteration)
+        finally:
+            metrics.close()
+            if sampler:
+                sampler.stop()
+                if sample_profile:
+                    sampler.write_collapsed(sample_profile)
+                    print(f"[PROFILE] Piles échantillonnées: {sample_profile} ({sum(sampler.stacks.values())} échantillons)")
+
+        self.save_policy(out_path, storage)
+        if ui_copy:
+            os.makedirs(os.path.dirname(ui_copy) or ".", exist_ok=True)
+            self.save_policy_json(ui_copy)
+        self.print_training_summary(iterations, out_path)
 
         end_time = time.time()
         print(f"Temps total: {end_time - start_time:.2f}s")
+        return {
+            "iterations": self.iteration - start_iteration,
+            "train_seconds": round(train_seconds, 3),
+            "total_seconds": round(end_time - start_time, 3),
+            "it_per_s": (self.iteration - start_iteration) / max(train_seconds, 1e-9),
+            "nodes_per_s": (self.counters.nodes - start_nodes) / max(train_seconds, 1e-9),
+            "infosets": len(self.regret_sum),
+            "counters": self.counters.as_dict(),
+            "table": self.table.stats() if self.table is not None else None,
+            "iso_caches": cache_stats(),
+        }
 
     def print_training_summary(self, iterations: int, final_path: str):
         print(f"\n{'='*80}")
@@ -282,6 +657,11 @@ class CFRPlusSolver:
         print(f"{'='*80}")
         print(f"Itérations complétées: {iterations}")
         print(f"Policy finale: {final_path}")
+        print(f"Compteurs: {self.counters.as_dict()} | infosets: {len(self.regret_sum)}")
+        if self.table is not None:
+            print(f"Table: {self.table.stats()}")
+        for name, stats in cache_stats().items():
+            print(f"Cache {name}: {stats['hit_rate']:.1%} de hits ({stats['entries']} entrées)")
         print(f"{'='*80}")
 
     # -------------------------
@@ -319,14 +699,34 @@ class CFRPlusSolver:
         if DEBUG_CFR:
             print(f"[SAVE] Policy gzip: {path} ({len(serialized)} infosets)")
 
+    def save_policy(self, path: str, storage: str = "json") -> None:
+        if storage == "gtop":
+            self.save_policy_binary(path)
+        else:
+            self.save_policy_json(path)
+
+    def save_policy_binary(self, path: str, compression=None) -> None:
+        compact_policy = self.extract_average_policy()
+        serialized = {
+            infoset_key: {"policy": encoded_policy, "visits": min(self.visit_count[infoset_key], 120)}
+            for infoset_key, encoded_policy in compact_policy.items()
+        }
+        write_policy_binary(path, columns_from_compact(serialized), compression)
+
+        if DEBUG_CFR:
+            print(f"[SAVE] Policy binaire: {path} ({len(serialized)} infosets)")
+
     def warm_start_from_policy(self, path: str):
         if not os.path.exists(path):
             print(f"[WARN] Policy not found: {path}")
             return
 
         print(f"[LOAD] Policy found: {path}")
-        with gzip.open(path, "rt", encoding="utf-8") as f:
-            raw = json.load(f)
+        if is_policy_binary(path):
+            raw = columns_to_compact(read_policy_binary(path, mmap=False))
+        else:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                raw = json.load(f)
 
         for key_str, entry in raw.items():
             infoset_key = int(key_str)
@@ -372,6 +772,193 @@ class CFRPlusSolver:
         return {int(k): v for k, v in raw.items()}
 
 
+# =========================
+# Configuration (CLI / fichier JSON) et manifeste de run
+# =========================
+def _policy_stem(path: str) -> str:
+    for extension in (".json.gz", ".gtop", ".json"):
+        if path.endswith(extension):
+            return path[:-len(extension)]
+    return os.path.splitext(path)[0]
+
+def checkpoint_path(out_path: str, iteration: int) -> str:
+    """policy/avg_policy.json.gz -> policy/avg_policy_iter_<n>.json.gz (même extension)."""
+    stem = _policy_stem(out_path)
+    return f"{stem}_iter_{iteration}{out_path[len(stem):]}"
+
+def manifest_path(out_path: str) -> str:
+    """Manifeste écrit à côté de la policy : policy/avg_policy.manifest.json."""
+    return _policy_stem(out_path) + ".manifest.json"
+
+def warm_start_copy_path(out_path: str, warm_start: str) -> str:
+    """Copie du warm start quand il serait écrasé par --out : policy/avg_policy.warm_start.json.gz."""
+    return f"{_policy_stem(out_path)}.warm_start{warm_start[len(_policy_stem(warm_start)):]}"
+
+def preserve_warm_start(warm_start: str, out_path: str) -> str:
+    """
+    --warm-start == --out : la policy chargée serait écrasée en fin de run, et le manifeste ne
+    permettrait plus de rejouer le run. On la copie à côté et on charge la copie.
+    """
+    if not os.path.exists(warm_start) or os.path.realpath(warm_start) != os.path.realpath(out_path):
+        return warm_start
+    copy_path = warm_start_copy_path(out_path, warm_start)
+    shutil.copy2(warm_start, copy_path)
+    print(f"[WARN] --warm-start et --out sont le même fichier : warm start copié dans {copy_path}")
+    return copy_path
+
+def file_identity(path: Optional[str]) -> Optional[dict]:
+    """Taille, date de modification et sha256 d'un fichier (None s'il n'existe pas)."""
+    if not path or not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    stat = os.stat(path)
+    return {
+        "path": path,
+        "size": stat.st_size,
+        "mtime": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(stat.st_mtime)),
+        "sha256": digest.hexdigest(),
+    }
+
+def check_warm_start(config_path: Optional[str], identity: Optional[dict]) -> None:
+    """Rejeu d'un manifeste : avertit si le warm start n'est plus le fichier chargé à l'origine."""
+    if not config_path:
+        return
+    with open(config_path, "r", encoding="utf-8") as f:
+        expected = json.load(f).get("warm_start")
+    if expected and (identity is None or identity["sha256"] != expected["sha256"]):
+        print(f"[WARN] Warm start différent de celui du manifeste {config_path} "
+              f"(sha256 attendu {expected['sha256'][:12]}) : le run ne sera pas reproduit à l'identique")
+
+def metrics_log_path(out_path: str) -> str:
+    """Métriques JSON-lines du run, à côté du manifeste : policy/avg_policy.metrics.jsonl."""
+    return _policy_stem(out_path) + ".metrics.jsonl"
+
+def git_revision() -> dict:
+    """Commit courant du repo (et si l'arbre a des modifications), vide hors git."""
+    repo = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=repo, capture_output=True, text=True).stdout.strip()
+        status = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=repo,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return {}
+    return {"commit": commit, "dirty": bool(status)} if commit else {}
+
+def peak_memory_mb() -> Optional[float]:
+    """Pic de RSS du process (getrusage ; None si indisponible, ex. Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024   # octets sur macOS, KB sur Linux
+
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="CFR+ Solver - 3-handed NLHE")
+    parser.add_argument("--config", default=None,
+                        help="Fichier JSON de configuration (clés = options ci-dessous, ou manifeste d'un run précédent) ; "
+                             "la ligne de commande reste prioritaire")
+    parser.add_argument("--iterations", type=int, default=ITERATIONS)
+    parser.add_argument("--stacks", type=int, nargs=3, default=list(STACKS), metavar=("SB", "BB", "BTN"))
+    parser.add_argument("--seed", type=int, default=None, help="Graine (défaut: horloge, enregistrée dans le manifeste)")
+    parser.add_argument("--traversal", choices=list(TRAVERSALS), default=DEFAULT_TRAVERSAL,
+                        help="Variante MCCFR utilisée pour chaque traversée")
+    parser.add_argument("--averaging", choices=list(AVERAGING_MODES), default=DEFAULT_AVERAGING,
+                        help="Pondération de strategy_sum (uniform, linear, dcfr)")
+    parser.add_argument("--prune", action="store_true",
+                        help="Active le regret-based pruning aux noeuds hero")
+    parser.add_argument("--table-capacity", type=int, default=0,
+                        help="Infosets gardés au plus (InfosetTable, éviction des froids) ; 0 = dict non bornés")
+    parser.add_argument("--admit-after", type=int, default=2,
+                        help="Mises à jour (count-min sketch) avant qu'un infoset obtienne une ligne de la table")
+    parser.add_argument("--canonical-deals", action="store_true",
+                        help="Renomme les couleurs de chaque donne en forme canonique (isomorphie de couleurs)")
+    parser.add_argument("--warm-start", default="policy/avg_policy.json.gz",
+                        help="Policy (.json.gz ou .gtop) chargée avant l'entraînement ('' = départ à froid)")
+    parser.add_argument("--storage", choices=list(STORAGE_BACKENDS), default="json",
+                        help="Format de la policy sauvegardée (json = .json.gz compact, gtop = binaire)")
+    parser.add_argument("--out", default=None,
+                        help="Policy finale (défaut: policy/avg_policy.json.gz ou .gtop selon --storage)")
+    parser.add_argument("--ui-copy", default="ui/public/avg_policy.json.gz",
+                        help="Copie .json.gz pour l'UI ('' = aucune)")
+    parser.add_argument("--csv", default="policy/avg_policy.csv",
+                        help="Export tabulaire après l'entraînement ('' = aucun)")
+    parser.add_argument("--save-every", type=int, default=SAVE_EVERY,
+                        help="Checkpoint de la policy toutes les N itérations (0 = aucun)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Process de l'évaluation d'exploitabilité (défaut: nombre de CPU)")
+    parser.add_argument("--eval-at", type=int, nargs="*", default=[],
+                        help="Itérations auxquelles estimer l'exploitabilité (best response MC)")
+    parser.add_argument("--eval-deals", type=int, default=2000,
+                        help="Donnes par siège pour chaque estimation d'exploitabilité")
+    parser.add_argument("--metrics", default=None,
+                        help="Fichier JSON-lines des métriques périodiques, réécrit à chaque run "
+                             "(défaut: <out>.metrics.jsonl à côté du manifeste, '' = désactivé)")
+    parser.add_argument("--metrics-every", type=float, default=10.0,
+                        help="Période (s) des métriques (postfix de la barre et fichier)")
+    parser.add_argument("--sample-interval", type=float, default=0.01,
+                        help="Période (s) de l'échantillonnage de pile (0 = pas de répartition du temps)")
+    parser.add_argument("--sample-profile", default=None,
+                        help="Écrit les piles échantillonnées (format collapsed, flamegraph/speedscope)")
+    parser.add_argument("--profile", default="profiling/cfr_solver_profile.prof" if PROFILE else None,
+                        help="Entraînement sous cProfile, statistiques écrites dans ce fichier")
+    parser.add_argument("--quiet", action="store_true", default=not DEBUG_CFR,
+                        help="Désactive les logs [SAVE]/[LOAD] (DEBUG_CFR)")
+    return parser
+
+def load_config(path: str, parser: argparse.ArgumentParser) -> dict:
+    """JSON plat {option: valeur} ou manifeste ({"config": {...}}) -> défauts du parser (tirets ou underscores)."""
+    with open(path, "r", encoding="utf-8") as f:
+        raw = json.load(f)
+    raw = raw.get("config", raw)
+    known = {action.dest for action in parser._actions} - {"help", "config"}
+    config = {}
+    for key, value in raw.items():
+        dest = key.replace("-", "_")
+        if dest not in known:
+            raise ValueError(f"[CONFIG] Clé inconnue dans {path}: {key}. Choix: {sorted(known)}")
+        config[dest] = value
+    return config
+
+def parse_run_config(argv=None) -> argparse.Namespace:
+    """Défauts du module < fichier --config < ligne de commande ; seed et --out résolus."""
+    parser = build_arg_parser()
+    known, _ = parser.parse_known_args(argv)
+    if known.config:
+        parser.set_defaults(**load_config(known.config, parser))
+    args = parser.parse_args(argv)
+    if args.seed is None:
+        args.seed = int(time.time())
+    if args.out is None:
+        args.out = "policy/avg_policy.gtop" if args.storage == "gtop" else "policy/avg_policy.json.gz"
+    if args.metrics is None:
+        args.metrics = metrics_log_path(args.out)
+    return args
+
+def write_run_manifest(path: str, config: dict, stats: dict, started: float,
+                       warm_start: Optional[dict] = None) -> dict:
+    """Config effective, identité du warm start, révision git, débit et pic mémoire du run, à côté de la policy."""
+    manifest = {
+        "config": config,
+        "warm_start": warm_start,
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(started)),
+        "finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "throughput": stats,
+        "peak_memory_mb": peak_memory_mb(),
+    }
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
 # =========================
 # Exécution principale
 # =========================
@@ -379,33 +966,58 @@ if __name__ == "__main__":
     import gc
     gc.collect()
 
+    args = parse_run_config()
+    DEBUG_CFR = not args.quiet
+    if args.warm_start:
+        args.warm_start = preserve_warm_start(args.warm_start, args.out)
+    warm_start_identity = file_identity(args.warm_start)
+    check_warm_start(args.config, warm_start_identity)
+    run_config = {key: value for key, value in vars(args).items() if key != "config"}
+    stacks = tuple(args.stacks)
+    started = time.time()
+
     print("CFR+ Solver - 3-handed NLHE")
     print("=" * 50)
-
-    seed = int(time.time())
-    stacks = (100, 100, 100)
-    iterations = 1_000_000
-
     print("Configuration:")
-    print(f"  Seed: {seed}")
+    print(f"  Seed: {args.seed}")
     print(f"  Stacks: {stacks}")
-    print(f"  Itérations: {iterations}")
+    print(f"  Itérations: {args.iterations}")
+    print(f"  Traversée: {args.traversal}")
+    print(f"  Pondération: {args.averaging}")
+    print(f"  Pruning: {'ON' if args.prune else 'OFF'}")
+    print(f"  Donnes canoniques: {'ON' if args.canonical_deals else 'OFF'}")
+    print(f"  Stockage: {args.storage} -> {args.out}")
     print()
 
-    solver = CFRPlusSolver(seed=seed, stacks=stacks)
-    solver.warm_start_from_policy("policy/avg_policy.json.gz")
+    random.seed(args.seed)  # le deck de PokerGameExpresso utilise le module random global
+    solver = CFRPlusSolver(seed=args.seed, stacks=stacks, traversal=args.traversal,
+                           averaging=args.averaging, prune=args.prune,
+                           table_capacity=args.table_capacity or None, admit_after=args.admit_after,
+                           canonical_deals=args.canonical_deals)
+    if args.warm_start:
+        solver.warm_start_from_policy(args.warm_start)
 
-    if PROFILE:
+    if args.profile:
         profiler = cProfile.Profile()
         profiler.enable()
 
-    solver.train(iterations=iterations)
+    stats = solver.train(iterations=args.iterations, eval_at=set(args.eval_at), eval_deals=args.eval_deals,
+                         metrics_path=args.metrics or None, metrics_every=args.metrics_every,
+                         sample_interval=args.sample_interval, sample_profile=args.sample_profile,
+                         out_path=args.out, ui_copy=args.ui_copy or None, storage=args.storage,
+                         save_every=args.save_every, workers=args.workers)
 
-    if PROFILE:
+    if args.profile:
         profiler.disable()
-        profiler.dump_stats("profiling/cfr_solver_profile.prof")
+        os.makedirs(os.path.dirname(args.profile) or ".", exist_ok=True)
+        profiler.dump_stats(args.profile)
+
+    manifest_file = manifest_path(args.out)
+    write_run_manifest(manifest_file, run_config, stats, started, warm_start_identity)
+    print(f"[SAVE] Manifeste: {manifest_file}")
 
-    extraction_policy_data()
+    if args.csv:
+        extraction_policy_data(args.out, args.csv)
 
     print(f"\nEntraînement terminé avec succès!")
-    print(f"Policy sauvegardée dans: policy/avg_policy.json.gz")
+    print(f"Policy sauvegardée dans: {args.out}")
@@ -0,0 +1,290 @@
+# exploitability.py
+# ============================================================
+# Évaluateur best-response (Monte-Carlo) sur l'abstraction d'infosets de infoset.py.
+#
+# Pour chaque siège (SB, BB, BTN) :
+#   1. Fit : sur `fit_deals` donnes, le hero explore toutes ses actions (external sampling),
+#      les adversaires jouent la policy moyenne. Q[infoset][action] est accumulé et la
+#      continuation hero suit l'argmax courant de Q (jamais la vraie donne -> pas clairvoyant).
+#   2. Eval : sur `eval_deals` donnes neuves, le hero joue argmax Q (policy si infoset inconnu)
+#      puis la policy elle-même, sur la même donne (common random numbers).
+# Gain BR = valeur BR - valeur policy, en mbb/main avec intervalle de confiance à 95%.
+# ============================================================
+
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+import random
+from collections import defaultdict
+from multiprocessing import Pool
+from typing import Dict, List, Optional, Tuple
+
+from infoset import build_infoset_key_fast, ROLE_LABELS
+from poker_game_expresso import PokerGameExpresso, GameInit
+from policy import AveragePolicy, ACTIONS
+
+ACTION_INDEX = {action_name: index for index, action_name in enumerate(ACTIONS)}
+N_ACTIONS = len(ACTIONS)
+Z_95 = 1.96
+
+# État des workers (initialisé une fois par process)
+_WORKER_POLICY: Optional[AveragePolicy] = None
+_WORKER_STACKS: Tuple[int, int, int] = (100, 100, 100)
+_WORKER_BR_TABLE: Dict[int, List[Optional[float]]] = {}
+
+
+def new_game(stacks) -> PokerGameExpresso:
+    init = GameInit()
+    init.stacks_init = list(stacks)
+    init.total_bets_init = [0, 0, 0]
+    init.current_bets_init = [0, 0, 0]
+    init.active_init = [True, True, True]
+    init.has_acted_init = [False, False, False]
+    init.main_pot = 0
+    init.phase = "PREFLOP"
+    init.community_cards = []
+
+    game = PokerGameExpresso(init)
+    game.deal_small_and_big_blind()
+    return game
+
+def _hero_utility(game: PokerGameExpresso, hero_role: int) -> float:
+    return float(game.net_stack_changes.get(f"Player_{hero_role}", 0.0))
+
+def _best_legal_action(q_means: List[Optional[float]], legal_actions) -> Optional[str]:
+    best_action, best_value = None, -math.inf
+    for action_name in legal_actions:
+        value = q_means[ACTION_INDEX[action_name]]
+        if value is not None and value > best_value:
+            best_action, best_value = action_name, value
+    return best_action
+
+def _init_worker(policy_entries: Dict[int, Dict[str, float]], stacks, br_table=None) -> None:
+    global _WORKER_POLICY, _WORKER_STACKS, _WORKER_BR_TABLE
+    _WORKER_POLICY = AveragePolicy(policy_entries)
+    _WORKER_STACKS = tuple(stacks)
+    _WORKER_BR_TABLE = br_table or {}
+
+# -------------------------
+# Phase 1 : estimation de Q
+# -------------------------
+def _fit_traverse(game: PokerGameExpresso, hero_role: int, policy: AveragePolicy,
+                  q_sum: Dict[int, List[float]], q_count: Dict[int, List[int]]) -> float:
+    while game.current_phase != "SHOWDOWN":
+        player = game.players[game.current_role]
+        if game.current_role != hero_role:
+            game.process_action(player, policy.act(game))
+            continue
+
+        infoset_key = build_infoset_key_fast(game, player)
+        legal_actions = policy.legal_actions(game)
+
+        utilities = {}
+        snapshot = game.snapshot()
+        for action_name in legal_actions:
+            game.process_action(player, action_name)
+            utilities[action_name] = _fit_traverse(game, hero_role, policy, q_sum, q_count)
+            game.restore(snapshot)
+
+        sums, counts = q_sum[infoset_key], q_count[infoset_key]
+        for action_name, utility in utilities.items():
+            index = ACTION_INDEX[action_name]
+            sums[index] += utility
+            counts[index] += 1
+
+        q_means = [sums[i] / counts[i] if counts[i] else None for i in range(N_ACTIONS)]
+        return utilities[_best_legal_action(q_means, legal_actions)]
+
+    return _hero_utility(game, hero_role)
+
+def _fit_chunk(args) -> Tuple[int, Dict[int, List[float]], Dict[int, List[int]]]:
+    hero_role, deal_seeds = args
+    policy = _WORKER_POLICY
+    q_sum = defaultdict(lambda: [0.0] * N_ACTIONS)
+    q_count = defaultdict(lambda: [0] * N_ACTIONS)
+
+    for deal_seed in deal_seeds:
+        random.seed(deal_seed)  # deck de PokerGameExpresso (module random global)
+        policy.rng.seed(deal_seed)
+        _fit_traverse(new_game(_WORKER_STACKS), hero_role, policy, q_sum, q_count)
+
+    return hero_role, dict(q_sum), dict(q_count)
+
+# -------------------------
+# Phase 2 : évaluation (CRN)
+# -------------------------
+def _play(game: PokerGameExpresso, hero_role: int, policy: AveragePolicy, br_table) -> float:
+    while game.current_phase != "SHOWDOWN":
+        player = game.players[game.current_role]
+        action_name = None
+        if br_table is not None and game.current_role == hero_role:
+            q_means = br_table.get(build_infoset_key_fast(game, player))
+            if q_means is not None:
+                action_name = _best_legal_action(q_means, policy.legal_actions(game))
+        if action_name is None:
+            action_name = policy.act(game)
+        game.process_action(player, action_name)
+    return _hero_utility(game, hero_role)
+
+def _eval_chunk(args) -> Tuple[int, List[float]]:
+    hero_role, deal_seeds = args
+    policy = _WORKER_POLICY
+    # [n, somme BR, somme² BR, somme policy, somme² policy, somme gain, somme² gain]
+    stats = [0.0] * 7
+
+    for deal_seed in deal_seeds:
+        random.seed(deal_seed)
+        policy.rng.seed(deal_seed)
+        br_value = _play(new_game(_WORKER_STACKS), hero_role, policy, _WORKER_BR_TABLE)
+
+        random.seed(deal_seed)
+        policy.rng.seed(deal_seed)
+        policy_value = _play(new_game(_WORKER_STACKS), hero_role, policy, None)
+
+        gain = br_value - policy_value
+        stats[0] += 1
+        stats[1] += br_value
+        stats[2] += br_value * br_value
+        stats[3] += policy_value
+        stats[4] += policy_value * policy_value
+        stats[5] += gain
+        stats[6] += gain * gain
+
+    return hero_role, stats
+
+# -------------------------
+# API
+# -------------------------
+def _mean_ci(n: float, total: float, total_sq: float, scale: float) -> Tuple[float, float]:
+    if n <= 0:
+        return 0.0, 0.0
+    mean = total / n
+    variance = max(0.0, total_sq / n - mean * mean) * n / max(1.0, n - 1)
+    return mean * scale, Z_95 * math.sqrt(variance / n) * scale
+
+def _split(seeds: List[int], chunks: int) -> List[List[int]]:
+    return [seeds[i::chunks] for i in range(chunks) if seeds[i::chunks]]
+
+def _run(pool: Optional[Pool], func, tasks):
+    return pool.map(func, tasks) if pool is not None else [func(task) for task in tasks]
+
+def estimate_exploitability(policy, stacks=(100, 100, 100), fit_deals: int = 20_000,
+                            eval_deals: int = 20_000, workers: Optional[int] = None,
+                            seed: int = 0, big_blind: float = 2.0) -> Dict:
+    """
+    Estime la valeur best-response de chaque siège contre `policy` (AveragePolicy,
+    dict {infoset_key: dist} ou chemin vers avg_policy.json.gz).
+    Retourne un dict par rôle (mbb/main, IC 95%) + l'exploitabilité moyenne.
+    """
+    if isinstance(policy, str):
+        policy = AveragePolicy.load(policy)
+    policy_entries = policy.policy if isinstance(policy, AveragePolicy) else policy
+
+    workers = workers or os.cpu_count() or 1
+    random_state = random.getstate()  # le mode mono-process re-seed le module random global
+    scale = 1000.0 / big_blind  # jetons -> mbb
+    rng = random.Random(seed)
+    roles = (0, 1, 2)
+
+    # Phase 1 : une table Q par siège, fusionnée depuis les workers
+    fit_tasks = []
+    for hero_role in roles:
+        deal_seeds = [rng.getrandbits(63) for _ in range(fit_deals)]
+        fit_tasks += [(hero_role, chunk) for chunk in _split(deal_seeds, workers)]
+
+    q_sum = {role: defaultdict(lambda: [0.0] * N_ACTIONS) for role in roles}
+    q_count = {role: defaultdict(lambda: [0] * N_ACTIONS) for role in roles}
+
+    if workers > 1:
+        with Pool(workers, initializer=_init_worker, initargs=(policy_entries, stacks)) as pool:
+            fit_results = _run(pool, _fit_chunk, fit_tasks)
+    else:
+        _init_worker(policy_entries, stacks)
+        fit_results = _run(None, _fit_chunk, fit_tasks)
+
+    for hero_role, chunk_sum, chunk_count in fit_results:
+        for infoset_key, sums in chunk_sum.items():
+            total_sums, total_counts = q_sum[hero_role][infoset_key], q_count[hero_role][infoset_key]
+            counts = chunk_count[infoset_key]
+            for index in range(N_ACTIONS):
+                total_sums[index] += sums[index]
+                total_counts[index] += counts[index]
+
+    # Les infosets d'un siège portent le rôle dans la clé : une seule table suffit
+    br_table: Dict[int, List[Optional[float]]] = {}
+    for hero_role in roles:
+        for infoset_key, sums in q_sum[hero_role].items():
+            counts = q_count[hero_role][infoset_key]
+            br_table[infoset_key] = [sums[i] / counts[i] if counts[i] else None for i in range(N_ACTIONS)]
+
+    # Phase 2 : BR vs policy sur des donnes neuves
+    eval_tasks = []
+    for hero_role in roles:
+        deal_seeds = [rng.getrandbits(63) for _ in range(eval_deals)]
+        eval_tasks += [(hero_role, chunk) for chunk in _split(deal_seeds, workers)]
+
+    if workers > 1:
+        with Pool(workers, initializer=_init_worker, initargs=(policy_entries, stacks, br_table)) as pool:
+            eval_results = _run(pool, _eval_chunk, eval_tasks)
+    else:
+        _init_worker(policy_entries, stacks, br_table)
+        eval_results = _run(None, _eval_chunk, eval_tasks)
+
+    totals = {role: [0.0] * 7 for role in roles}
+    for hero_role, stats in eval_results:
+        for index, value in enumerate(stats):
+            totals[hero_role][index] += value
+
+    random.setstate(random_state)
+
+    report = {"seats": {}, "fit_deals": fit_deals, "eval_deals": eval_deals}
+    gains = []
+    for hero_role in roles:
+        n, br_sum, br_sq, pol_sum, pol_sq, gain_sum, gain_sq = totals[hero_role]
+        br_mbb, br_ci = _mean_ci(n, br_sum, br_sq, scale)
+        pol_mbb, pol_ci = _mean_ci(n, pol_sum, pol_sq, scale)
+        gain_mbb, gain_ci = _mean_ci(n, gain_sum, gain_sq, scale)
+        report["seats"][ROLE_LABELS[hero_role]] = {
+            "br_mbb": br_mbb, "br_ci95": br_ci,
+            "policy_mbb": pol_mbb, "policy_ci95": pol_ci,
+            "gain_mbb": gain_mbb, "gain_ci95": gain_ci,
+            "br_infosets": len(q_sum[hero_role]),
+        }
+        gains.append((gain_mbb, gain_ci))
+
+    # Moyenne des gains BR par siège (NashConv / nb joueurs) ; IC combiné (sièges indépendants)
+    report["exploitability_mbb"] = sum(g for g, _ in gains) / len(gains)
+    report["exploitability_ci95"] = math.sqrt(sum(ci * ci for _, ci in gains)) / len(gains)
+    return report
+
+def print_report(report: Dict) -> None:
+    print(f"\n{'='*80}")
+    print(f"BEST RESPONSE (fit={report['fit_deals']} / eval={report['eval_deals']} donnes par siège)")
+    print(f"{'='*80}")
+    for role, seat in report["seats"].items():
+        print(f"{role:>4} | BR {seat['br_mbb']:9.1f} ± {seat['br_ci95']:7.1f} mbb/h"
+              f" | policy {seat['policy_mbb']:9.1f} ± {seat['policy_ci95']:7.1f}"
+              f" | gain {seat['gain_mbb']:9.1f} ± {seat['gain_ci95']:7.1f}")
+    print(f"Exploitabilité moyenne: {report['exploitability_mbb']:.1f} ± {report['exploitability_ci95']:.1f} mbb/main")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Évaluateur best-response Monte-Carlo (mbb/main)")
+    parser.add_argument("--policy", default="policy/avg_policy.json.gz")
+    parser.add_argument("--stacks", type=int, nargs=3, default=(100, 100, 100))
+    parser.add_argument("--fit-deals", type=int, default=20_000)
+    parser.add_argument("--eval-deals", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", default=None, help="Chemin JSON optionnel pour le rapport")
+    args = parser.parse_args()
+
+    result = estimate_exploitability(args.policy, tuple(args.stacks), args.fit_deals,
+                                     args.eval_deals, args.workers, args.seed)
+    print_report(result)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"[SAVE] {args.out}")
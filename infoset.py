@@ -2,8 +2,10 @@
 from __future__ import annotations
 from typing import List, Tuple
 from classes import Card, Player
+from card_isomorphism import IsoCache, hero_board_key, register_cache
 import math
 import bisect
+import numpy as np
 
 # ============================================================
 # --- 169 map (lisible <-> index)
@@ -150,6 +152,19 @@ def hero_vs_board_bucket(hero: Player, board: List[Card]) -> int:
         return 4  # some draw
     return 0
 
+# Mémoïsé sur hero_board_key (invariant par permutation des couleurs) : ~15 µs par appel évités
+HERO_BOARD_CACHE = register_cache(IsoCache("hero_vs_board"))
+
+def hero_vs_board_bucket_cached(hero: Player, board: List[Card]) -> int:
+    if not board:
+        return 0
+    key = hero_board_key([card.id for card in hero.cards], [card.id for card in board])
+    bucket = HERO_BOARD_CACHE.table.get(key)
+    if bucket is None:
+        return HERO_BOARD_CACHE.store(key, hero_vs_board_bucket(hero, board))
+    HERO_BOARD_CACHE.hits += 1
+    return bucket
+
 # ============================================================
 # --- Bitfield layout (≤64 bits)
 # ============================================================
@@ -178,6 +193,28 @@ def pack_u64(**fields) -> int:
 def unpack_infoset_key_dense(k: int) -> dict:
     return {field: (k >> _POS[field]) & _MASK[field] for field in _POS}
 
+# Versions numpy : tous les champs d'un tableau de clés en une passe (consommateurs en masse)
+KEY_DTYPE = np.dtype([(field, np.uint8) for field in _POS])
+
+def pack_u64_array(**fields) -> np.ndarray:
+    """Champs (scalaires ou tableaux, broadcast) -> uint64[n]. Même layout que pack_u64."""
+    columns = np.broadcast_arrays(*(np.asarray(v, dtype=np.uint64) for v in fields.values()))
+    keys = np.zeros(columns[0].shape, dtype=np.uint64)
+    for field, values in zip(fields, columns):
+        keys |= (values & np.uint64(_MASK[field])) << np.uint64(_POS[field])
+    return keys
+
+def unpack_infoset_keys(keys, structured: bool = False):
+    """uint64[n] -> {champ: uint8[n]} (ou tableau structuré KEY_DTYPE si structured=True)."""
+    keys = np.asarray(keys, dtype=np.uint64)
+    if structured:
+        out = np.empty(keys.shape, dtype=KEY_DTYPE)
+        for field in _POS:
+            out[field] = (keys >> np.uint64(_POS[field])) & np.uint64(_MASK[field])
+        return out
+    return {field: ((keys >> np.uint64(_POS[field])) & np.uint64(_MASK[field])).astype(np.uint8)
+            for field in _POS}
+
 # ============================================================
 # --- Bucketing fonctions
 # ============================================================
@@ -240,7 +277,7 @@ def build_infoset_key_fast(game, hero) -> int:
     pot_q   = qlog_bb(pot_bb)
     ratio_q = ratio_bucket(tocall_bb, pot_bb)
     spr_q   = spr_bucket(eff, pot_bb)
-    hb      = hero_vs_board_bucket(hero, game.community_cards)
+    hb      = hero_vs_board_bucket_cached(hero, game.community_cards)
 
     return pack_u64(PHASE=phase_id, ROLE=role_id,
                     HAND=hand_index, BOARD=bidx,
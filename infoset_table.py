@@ -0,0 +1,276 @@
+# infoset_table.py
+# ============================================================
+# Table d'infosets bornée pour CFRPlusSolver (alternative aux trois defaultdict) :
+#   - hachage à adressage ouvert (sondage linéaire, suppression par décalage arrière) sur la
+#     clé uint64 -> indice de ligne ; regrets et strategy_sum en float64 (précision complète)
+#     et visites dans des tableaux numpy préalloués : ~100 octets par infoset, contre ~600
+#     pour trois dict de listes de floats Python ;
+#   - admission : une clé absente n'obtient une ligne qu'à sa `admit_after`-ième mise à jour,
+#     comptée dans un count-min sketch de taille fixe ; avant, ses mises à jour sont ignorées
+#     (stratégie uniforme), ce qui écarte les infosets vus une ou deux fois ;
+#   - capacité atteinte : éviction par lots des lignes froides (moins de visites, puis mise à
+#     jour la plus ancienne). À l'inférence, une clé évincée est servie par policy_backoff.
+#
+# Le solveur y accède par trois vues au protocole des dict qu'il utilisait :
+#   regret_sum[key]     -> ligne modifiable (mise à jour : compte la clé, l'admet au seuil)
+#   regret_sum.get(key) -> copie en liste (lecture : ne compte pas), None si absente
+#   strategy_sum[key] = v / visit_count[key] = n  (warm start : insertion forcée)
+# ============================================================
+
+from __future__ import annotations
+import math
+import random
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_M64 = (1 << 64) - 1
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15   # hachage de Fibonacci (multiplication puis bits de poids fort)
+_SKETCH_MAX = np.iinfo(np.uint16).max
+
+
+class CountMinSketch:
+    """
+    Compteurs approchés (jamais sous-estimés) en mémoire fixe : depth x 2^width_bits uint16.
+    Mise à jour conservatrice ; tous les compteurs sont divisés par 2 après `10 x largeur`
+    ajouts, pour que les clés chaudes d'hier ne saturent pas la table.
+    """
+
+    def __init__(self, width_bits: int = 20, depth: int = 4, seed: int = 0):
+        self.shift = 64 - width_bits
+        self.counts = np.zeros((depth, 1 << width_bits), dtype=np.uint16)
+        rng = random.Random(seed)
+        self.multipliers = [rng.getrandbits(64) | 1 for _ in range(depth)]
+        self.additions = 0
+        self.halve_every = 10 << width_bits
+
+    def add(self, key: int) -> int:
+        """Compte une occurrence de `key` et retourne l'estimation après ajout."""
+        counts = self.counts
+        cells = [(row, ((key * multiplier) & _M64) >> self.shift) for row, multiplier in enumerate(self.multipliers)]
+        estimate = min(counts.item(row, cell) for row, cell in cells)
+        if estimate < _SKETCH_MAX:
+            for row, cell in cells:
+                if counts.item(row, cell) == estimate:
+                    counts[row, cell] = estimate + 1
+        self.additions += 1
+        if self.additions >= self.halve_every:
+            counts >>= 1
+            self.additions = 0
+        return estimate + 1
+
+    @property
+    def nbytes(self) -> int:
+        return self.counts.nbytes
+
+
+class InfosetTable:
+    """Regrets, strategy_sum et visites de `capacity` infosets au plus."""
+
+    def __init__(self, capacity: int, n_actions: int, admit_after: int = 2, evict_fraction: float = 1 / 16,
+                 load_factor: float = 0.5, sketch_width_bits: Optional[int] = None, seed: int = 0):
+        if capacity <= 0:
+            raise ValueError(f"[TABLE] Capacité invalide: {capacity}")
+        self.capacity = capacity
+        self.n_actions = n_actions
+        self.admit_after = admit_after
+        self.evict_batch = max(1, int(capacity * evict_fraction))
+
+        slot_bits = max(4, math.ceil(math.log2(capacity / load_factor)))
+        self.slot_shift = 64 - slot_bits
+        self.slot_mask = (1 << slot_bits) - 1
+        self.slots = np.full(1 << slot_bits, -1, dtype=np.int32)   # case de hachage -> ligne (-1 : vide)
+
+        self.keys = np.zeros(capacity, dtype=np.uint64)
+        self.regret = np.zeros((capacity, n_actions), dtype=np.float64)
+        self.strategy = np.zeros((capacity, n_actions), dtype=np.float64)
+        self.visits = np.zeros(capacity, dtype=np.uint32)
+        self.touched = np.zeros(capacity, dtype=np.uint64)          # horloge de la dernière mise à jour
+        self.live = np.zeros(capacity, dtype=bool)
+        self.free_rows: List[int] = list(range(capacity - 1, -1, -1))
+        self.size = 0
+        self.clock = 0
+
+        # sketch ~4 compteurs par ligne et par rangée : assez large pour les clés candidates en attente
+        width_bits = sketch_width_bits or max(12, math.ceil(math.log2(capacity)) + 2)
+        self.sketch = CountMinSketch(width_bits, seed=seed) if admit_after > 1 else None
+        self.admitted = 0
+        self.rejected = 0
+        self.evicted = 0
+
+    # -------------------------
+    # Hachage (sondage linéaire)
+    # -------------------------
+    def _home(self, key: int) -> int:
+        return ((key * _HASH_MULTIPLIER) & _M64) >> self.slot_shift
+
+    def _find_slot(self, key: int) -> Tuple[int, int]:
+        """(case, ligne) de `key`, ou (première case vide, -1) si absente."""
+        slots, keys, mask = self.slots, self.keys, self.slot_mask
+        slot = self._home(key)
+        while True:
+            row = slots.item(slot)
+            if row < 0 or keys.item(row) == key:
+                return slot, row
+            slot = (slot + 1) & mask
+
+    def find(self, key: int) -> int:
+        return self._find_slot(key)[1]
+
+    def insert(self, key: int) -> int:
+        """Ligne neuve (à zéro) pour `key`, en évinçant un lot de lignes froides si la table est pleine."""
+        if not self.free_rows:
+            self.evict_cold()
+        row = self.free_rows.pop()
+        slot, _ = self._find_slot(key)
+        self.slots[slot] = row
+        self.keys[row] = key
+        self.regret[row] = 0.0
+        self.strategy[row] = 0.0
+        self.visits[row] = 0
+        self.touched[row] = self.clock
+        self.live[row] = True
+        self.size += 1
+        self.admitted += 1
+        return row
+
+    def _delete_slot(self, hole: int) -> None:
+        """Vide la case `hole` et recolle les entrées suivantes (pas de pierre tombale)."""
+        slots, keys, mask = self.slots, self.keys, self.slot_mask
+        slot = hole
+        while True:
+            slot = (slot + 1) & mask
+            row = slots.item(slot)
+            if row < 0:
+                break
+            home = self._home(keys.item(row))
+            # l'entrée reste si sa case d'origine est dans l'intervalle cyclique ]hole, slot]
+            stays = (hole < home <= slot) if hole <= slot else (home > hole or home <= slot)
+            if not stays:
+                slots[hole] = row
+                hole = slot
+        slots[hole] = -1
+
+    def evict_cold(self) -> int:
+        """Évince les `evict_batch` lignes les plus froides (visites, puis ancienneté) ; retourne leur nombre."""
+        rows = np.flatnonzero(self.live)
+        victims = rows[np.lexsort((self.touched[rows], self.visits[rows]))[:self.evict_batch]]
+        for row in victims.tolist():
+            slot, found = self._find_slot(self.keys.item(row))
+            if found == row:
+                self._delete_slot(slot)
+            self.live[row] = False
+            self.free_rows.append(row)
+        self.size -= len(victims)
+        self.evicted += len(victims)
+        return len(victims)
+
+    # -------------------------
+    # Accès du solveur
+    # -------------------------
+    def row_for_update(self, key: int) -> int:
+        """Ligne de `key` pour une mise à jour (admission au seuil du sketch), -1 si non admise."""
+        self.clock += 1
+        row = self.find(key)
+        if row < 0:
+            if self.sketch is not None and self.sketch.add(key) < self.admit_after:
+                self.rejected += 1
+                return -1
+            row = self.insert(key)
+        self.touched[row] = self.clock
+        return row
+
+    def discount_regrets(self, positive_scale: float, negative_scale: float) -> None:
+        """Actualisation DCFR vectorisée (les lignes libres sont à zéro, inchangées)."""
+        regret = self.regret
+        regret *= np.where(regret > 0.0, positive_scale, negative_scale)
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": self.size,
+            "capacity": self.capacity,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "evicted": self.evicted,
+            "mbytes": round(self.nbytes / 1e6, 1),
+        }
+
+    @property
+    def nbytes(self) -> int:
+        arrays = (self.slots, self.keys, self.regret, self.strategy, self.visits, self.touched, self.live)
+        return sum(a.nbytes for a in arrays) + (self.sketch.nbytes if self.sketch else 0)
+
+    def views(self) -> Tuple["RegretView", "StrategyView", "VisitView"]:
+        return RegretView(self), StrategyView(self), VisitView(self)
+
+
+# -------------------------
+# Vues au protocole dict (regret_sum, strategy_sum, visit_count)
+# -------------------------
+class _RowView:
+    def __init__(self, table: InfosetTable, array: np.ndarray):
+        self.table = table
+        self.array = array
+
+    def __len__(self) -> int:
+        return self.table.size
+
+    def __contains__(self, key: int) -> bool:
+        return self.table.find(key) >= 0
+
+    def get(self, key: int, default=None) -> Optional[List[float]]:
+        row = self.table.find(key)
+        return self.array[row].tolist() if row >= 0 else default
+
+
+class RegretView(_RowView):
+    def __init__(self, table: InfosetTable):
+        super().__init__(table, table.regret)
+
+    def __getitem__(self, key: int) -> np.ndarray:
+        row = self.table.row_for_update(key)
+        # clé non admise : tampon jetable, la mise à jour est perdue
+        return self.array[row] if row >= 0 else np.zeros(self.table.n_actions)
+
+    def values(self) -> Iterator[np.ndarray]:
+        return (self.array[row] for row in np.flatnonzero(self.table.live))
+
+
+class StrategyView(_RowView):
+    def __init__(self, table: InfosetTable):
+        super().__init__(table, table.strategy)
+
+    def __getitem__(self, key: int) -> np.ndarray:
+        # appelé juste après regret_sum[key] : pas de nouveau décompte ni d'admission
+        row = self.table.find(key)
+        return self.array[row] if row >= 0 else np.zeros(self.table.n_actions)
+
+    def __setitem__(self, key: int, vector) -> None:
+        row = self.table.find(key)
+        self.array[row if row >= 0 else self.table.insert(key)] = vector
+
+    def items(self) -> Iterator[Tuple[int, List[float]]]:
+        """Infosets ayant reçu au moins une contribution (comme les entrées du defaultdict)."""
+        table = self.table
+        rows = np.flatnonzero(table.live & (table.visits > 0))
+        return zip(table.keys[rows].tolist(), self.array[rows].tolist())
+
+
+class VisitView:
+    def __init__(self, table: InfosetTable):
+        self.table = table
+
+    def __len__(self) -> int:
+        return self.table.size
+
+    def get(self, key: int, default: int = 0) -> int:
+        row = self.table.find(key)
+        return self.table.visits.item(row) if row >= 0 else default
+
+    def __getitem__(self, key: int) -> int:
+        return self.get(key, 0)
+
+    def __setitem__(self, key: int, value: int) -> None:
+        row = self.table.find(key)
+        if row >= 0:                       # clé non admise : visite ignorée
+            self.table.visits[row] = value
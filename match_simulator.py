@@ -0,0 +1,207 @@
+# match_simulator.py
+# ============================================================
+# Matchs 3-handed entre policies (checkpoints CFR, policy artificielle, modèle ML).
+#
+# Réduction de variance :
+#   - donnes dupliquées : chaque donne (deck identique) est jouée pour les 6 permutations
+#     entrants -> sièges ; le résultat d'un entrant sur la donne est la moyenne des 6 ;
+#   - common random numbers : le tirage des actions utilise un RNG par siège, re-seedé à
+#     l'identique pour chaque permutation.
+# Le résultat est donné en bb/100 avec un intervalle de confiance à 95% sur les donnes.
+#
+# Usage :
+#   python match_simulator.py policy/avg_policy_iter_100000.json.gz policy/avg_policy.json.gz uniform
+# ============================================================
+
+from __future__ import annotations
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import time
+from itertools import permutations
+from multiprocessing import Pool
+from typing import Dict, List, Sequence
+
+from infoset import build_infoset_key_fast
+from poker_game_expresso import PokerGameExpresso, GameInit
+from policy import AveragePolicy, ACTIONS
+
+Z_95 = 1.96
+SEAT_PERMUTATIONS = list(permutations(range(3)))  # perm[seat] = index de l'entrant
+
+_WORKER_ENTRANTS: List = []
+_WORKER_STACKS = (100, 100, 100)
+
+
+class ModelPolicy:
+    """Réseau de ml/ (.pth eager, .pt TorchScript, .npz numpy sans torch) -> même interface que AveragePolicy."""
+    def __init__(self, weights_path: str):
+        root_dir = os.path.dirname(os.path.abspath(__file__))
+        sys.path.extend([root_dir, os.path.join(root_dir, "ml")])
+        if weights_path.endswith(".npz"):
+            from ml.numpy_model import NumpyPolicyModel  # n'importe pas torch
+            self.predictor = NumpyPolicyModel.load(weights_path)
+        else:
+            from ml.inference import load_predictor
+            self.predictor = load_predictor(weights_path)
+
+    legal_actions = staticmethod(AveragePolicy.legal_actions)
+
+    def distribution(self, game: PokerGameExpresso) -> Dict[str, float]:
+        player = game.players[game.current_role]
+        legal = self.legal_actions(game)
+        probs = self.predictor.predict([build_infoset_key_fast(game, player)])[0].tolist()
+        dist = {a: probs[ACTIONS.index(a)] for a in legal}
+        s = sum(dist.values())
+        if s <= 1e-12:
+            return {a: 1.0 / len(legal) for a in legal}
+        return {a: v / s for a, v in dist.items()}
+
+
+def load_entrant(spec: str, backoff: bool = False):
+    """'uniform' | chemin .json.gz / .gtop (AveragePolicy) | chemin .pth / .pt / .npz (modèle ML)."""
+    if spec == "uniform":
+        return AveragePolicy({})
+    if spec.endswith((".pth", ".pt", ".npz")):
+        return ModelPolicy(spec)
+    if spec.endswith(".gtop"):
+        return AveragePolicy.open_mapped(spec, backoff=backoff)  # pages partagées entre workers
+    return AveragePolicy.load(spec, backoff=backoff)
+
+def new_game(stacks) -> PokerGameExpresso:
+    init = GameInit()
+    init.stacks_init = list(stacks)
+    init.total_bets_init = [0, 0, 0]
+    init.current_bets_init = [0, 0, 0]
+    init.active_init = [True, True, True]
+    init.has_acted_init = [False, False, False]
+    init.main_pot = 0
+    init.phase = "PREFLOP"
+    init.community_cards = []
+
+    game = PokerGameExpresso(init)
+    game.deal_small_and_big_blind()
+    return game
+
+def _sample(dist: Dict[str, float], rng: random.Random) -> str:
+    x = rng.random()
+    c = 0.0
+    last = None
+    for a, p in dist.items():
+        c += p
+        last = a
+        if x <= c:
+            return a
+    return last
+
+def play_hand(entrants: Sequence, seating: Sequence[int], deal_seed: int, stacks) -> List[float]:
+    """Joue une main ; seating[seat] = index de l'entrant. Retourne le gain (jetons) par siège."""
+    random.seed(deal_seed)  # deck de PokerGameExpresso (module random global)
+    seat_rngs = [random.Random(deal_seed * 3 + seat) for seat in range(3)]
+    game = new_game(stacks)
+
+    while game.current_phase != "SHOWDOWN":
+        seat = game.current_role
+        dist = entrants[seating[seat]].distribution(game)
+        game.process_action(game.players[seat], _sample(dist, seat_rngs[seat]))
+
+    return [float(game.net_stack_changes.get(f"Player_{seat}", 0.0)) for seat in range(3)]
+
+def _init_worker(specs: Sequence[str], stacks, backoff: bool = False) -> None:
+    global _WORKER_ENTRANTS, _WORKER_STACKS
+    cache = {}
+    for spec in specs:
+        if spec not in cache:
+            cache[spec] = load_entrant(spec, backoff)
+    _WORKER_ENTRANTS = [cache[spec] for spec in specs]
+    _WORKER_STACKS = tuple(stacks)
+
+def _play_chunk(deal_seeds: List[int]) -> List[List[float]]:
+    # Par entrant : [n donnes, somme, somme²] du gain moyen sur les 6 permutations
+    stats = [[0.0, 0.0, 0.0] for _ in _WORKER_ENTRANTS]
+    for deal_seed in deal_seeds:
+        per_entrant = [0.0] * len(_WORKER_ENTRANTS)
+        for seating in SEAT_PERMUTATIONS:
+            results = play_hand(_WORKER_ENTRANTS, seating, deal_seed, _WORKER_STACKS)
+            for seat, entrant_index in enumerate(seating):
+                per_entrant[entrant_index] += results[seat]
+        for entrant_index, total in enumerate(per_entrant):
+            value = total / len(SEAT_PERMUTATIONS)
+            stats[entrant_index][0] += 1
+            stats[entrant_index][1] += value
+            stats[entrant_index][2] += value * value
+    return stats
+
+def run_match(specs: Sequence[str], deals: int, stacks=(100, 100, 100), workers=None,
+              seed: int = 0, chunk_size: int = 500, big_blind: float = 2.0,
+              backoff: bool = False) -> Dict:
+    if len(specs) != 3:
+        raise ValueError(f"[MATCH] 3 entrants requis (répéter un chemin si besoin): {specs}")
+
+    workers = workers or os.cpu_count() or 1
+    rng = random.Random(seed)
+    deal_seeds = [rng.getrandbits(62) for _ in range(deals)]
+    chunks = [deal_seeds[i:i + chunk_size] for i in range(0, deals, chunk_size)]
+
+    start = time.perf_counter()
+    if workers > 1:
+        with Pool(workers, initializer=_init_worker, initargs=(list(specs), stacks, backoff)) as pool:
+            chunk_stats = pool.map(_play_chunk, chunks)
+    else:
+        random_state = random.getstate()
+        _init_worker(list(specs), stacks, backoff)
+        chunk_stats = [_play_chunk(chunk) for chunk in chunks]
+        random.setstate(random_state)
+    elapsed = time.perf_counter() - start
+
+    hands = deals * len(SEAT_PERMUTATIONS)
+    scale = 100.0 / big_blind  # jetons/main -> bb/100
+    report = {"deals": deals, "hands": hands, "seconds": elapsed,
+              "hands_per_second": hands / max(elapsed, 1e-9), "entrants": []}
+
+    for entrant_index, spec in enumerate(specs):
+        n = sum(stats[entrant_index][0] for stats in chunk_stats)
+        total = sum(stats[entrant_index][1] for stats in chunk_stats)
+        total_sq = sum(stats[entrant_index][2] for stats in chunk_stats)
+        mean = total / n
+        variance = max(0.0, total_sq / n - mean * mean) * n / max(1.0, n - 1)
+        report["entrants"].append({
+            "spec": spec,
+            "bb_per_100": mean * scale,
+            "ci95": Z_95 * math.sqrt(variance / n) * scale,
+        })
+    return report
+
+def print_report(report: Dict) -> None:
+    print(f"\n{'='*80}")
+    print(f"MATCH : {report['deals']} donnes x {len(SEAT_PERMUTATIONS)} permutations = {report['hands']} mains")
+    print(f"{'='*80}")
+    for index, entrant in enumerate(report["entrants"]):
+        print(f"[{index}] {entrant['bb_per_100']:9.2f} ± {entrant['ci95']:7.2f} bb/100  {entrant['spec']}")
+    print(f"Durée: {report['seconds']:.1f}s ({report['hands_per_second']:.0f} mains/s)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Match 3-handed entre policies (donnes dupliquées, CRN)")
+    parser.add_argument("entrants", nargs=3,
+                        help="3 entrants : 'uniform', avg_policy*.json.gz ou trained_policy_model.pth")
+    parser.add_argument("--deals", type=int, default=100_000, help="Donnes (x6 permutations de sièges)")
+    parser.add_argument("--stacks", type=int, nargs=3, default=(100, 100, 100))
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--backoff", action="store_true",
+                        help="Repli sur abstraction plus grossière pour les clés absentes (policy_backoff.py)")
+    parser.add_argument("--out", default=None, help="Chemin JSON optionnel pour le rapport")
+    args = parser.parse_args()
+
+    result = run_match(args.entrants, args.deals, tuple(args.stacks), args.workers, args.seed, args.chunk_size,
+                       backoff=args.backoff)
+    print_report(result)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"[SAVE] {args.out}")
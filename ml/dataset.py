@@ -0,0 +1,140 @@
+# ml/dataset.py
+# Dataset pré-tensorisé : la policy est convertie UNE fois en tableaux contigus
+# (indices catégoriels uint8, scalaires float32, cibles float32, visites), mis en cache
+# en .npy et relus en memmap. Les mini-batches sont des index numpy sur ces tableaux :
+# aucun objet Python par échantillon.
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from features import CATEGORICAL_FIELDS, SCALAR_FIELDS, ONEHOT_SIZES, N_FEATURES, fields_from_keys, onehot_array
+from policy_backoff import probs_from_columns
+from policy_binary import columns_from_compact
+from stats_policy import iter_policy_chunks
+
+_ARRAYS = ["keys", "categorical", "scalars", "targets", "visits"]
+
+
+def onehot_features(categorical: np.ndarray, scalars: np.ndarray) -> torch.Tensor:
+    """Vecteur dense 224 (entrée de ml/model.Model) depuis les colonnes, par lot."""
+    return torch.from_numpy(onehot_array(categorical, scalars))
+
+
+def model_inputs(categorical: np.ndarray, scalars: np.ndarray, kind: str = "onehot") -> Tuple[torch.Tensor, ...]:
+    """Arguments du forward : (features 224,) pour Model, (indices, scalaires) pour EmbeddingModel."""
+    if kind == "onehot":
+        return (onehot_features(categorical, scalars),)
+    if kind == "fields":
+        return (torch.from_numpy(categorical.astype(np.int64)), torch.from_numpy(np.ascontiguousarray(scalars)))
+    raise ValueError(f"[DATASET] Type d'entrée inconnu: {kind}")
+
+
+def key_inputs(keys, kind: str = "onehot") -> Tuple[torch.Tensor, ...]:
+    """Clés uint64 -> arguments du forward (inférence directe depuis les clés packées)."""
+    categorical, scalars = fields_from_keys(np.asarray(keys, dtype=np.uint64))
+    return model_inputs(categorical, scalars, kind)
+
+
+class PolicyArrays:
+    """Tableaux contigus (éventuellement memmap) d'une policy, indexables par lots."""
+
+    def __init__(self, keys, categorical, scalars, targets, visits):
+        self.keys = keys                # uint64[n]
+        self.categorical = categorical  # uint8[n, 5]
+        self.scalars = scalars          # float32[n, 3]
+        self.targets = targets          # float32[n, 5]
+        self.visits = visits            # uint16[n]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @staticmethod
+    def _from_chunks(chunks) -> "PolicyArrays":
+        parts = {name: [] for name in _ARRAYS}
+        for columns in chunks:
+            targets = probs_from_columns(columns)
+            valid = targets.sum(axis=1) > 0
+            keys = np.asarray(columns.keys, dtype=np.uint64)[valid]
+            categorical, scalars = fields_from_keys(keys)
+            parts["keys"].append(keys)
+            parts["categorical"].append(categorical)
+            parts["scalars"].append(scalars)
+            parts["targets"].append(targets[valid])
+            parts["visits"].append(np.asarray(columns.visits)[valid].astype(np.uint16))
+        return PolicyArrays(*(np.concatenate(parts[name]) for name in _ARRAYS))
+
+    @staticmethod
+    def from_policy_dict(policy_data: Dict) -> "PolicyArrays":
+        """Depuis le dict JSON déjà chargé ({key: {"policy": [...], "visits": n}})."""
+        return PolicyArrays._from_chunks([columns_from_compact(policy_data)])
+
+    @staticmethod
+    def build(policy_path: str, cache_dir: str) -> "PolicyArrays":
+        """Conversion en flux de la policy (.json.gz ou .gtop) vers cache_dir/*.npy."""
+        start = time.perf_counter()
+        arrays = PolicyArrays._from_chunks(iter_policy_chunks(policy_path))
+        os.makedirs(cache_dir, exist_ok=True)
+        for name in _ARRAYS:
+            np.save(os.path.join(cache_dir, f"{name}.npy"), getattr(arrays, name))
+        with open(os.path.join(cache_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(_source_meta(policy_path) | {"count": len(arrays)}, f, indent=2)
+        print(f"[DATASET] {len(arrays)} infosets -> {cache_dir} ({time.perf_counter() - start:.1f}s)")
+        return arrays
+
+    @staticmethod
+    def load(cache_dir: str, mmap: bool = True) -> "PolicyArrays":
+        mode = "r" if mmap else None
+        return PolicyArrays(*(np.load(os.path.join(cache_dir, f"{name}.npy"), mmap_mode=mode)
+                              for name in _ARRAYS))
+
+    @staticmethod
+    def load_or_build(policy_path: str, cache_dir: Optional[str] = None) -> "PolicyArrays":
+        """Réutilise le cache si la policy source n'a pas changé (chemin, taille, mtime)."""
+        cache_dir = cache_dir or policy_path + ".dataset"
+        meta_path = os.path.join(cache_dir, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if all(meta.get(k) == v for k, v in _source_meta(policy_path).items()):
+                return PolicyArrays.load(cache_dir)
+        return PolicyArrays.build(policy_path, cache_dir)
+
+    # -------------------------
+    # Accès par lots
+    # -------------------------
+    def subset(self, indices: np.ndarray) -> "PolicyArrays":
+        return PolicyArrays(*(np.asarray(getattr(self, name))[indices] for name in _ARRAYS))
+
+    def split(self, holdout: float, seed: int = 0) -> Tuple["PolicyArrays", "PolicyArrays"]:
+        order = np.random.default_rng(seed).permutation(len(self))
+        n_holdout = int(len(self) * holdout)
+        return self.subset(np.sort(order[n_holdout:])), self.subset(np.sort(order[:n_holdout]))
+
+    def batch(self, indices: np.ndarray, kind: str = "onehot") -> Dict:
+        categorical = np.asarray(self.categorical[indices])
+        scalars = np.asarray(self.scalars[indices])
+        return {
+            "inputs": model_inputs(categorical, scalars, kind),
+            "targets": torch.from_numpy(np.asarray(self.targets[indices], dtype=np.float32)),
+            "visits": torch.from_numpy(np.asarray(self.visits[indices], dtype=np.float32)),
+        }
+
+    def batches(self, batch_size: int, shuffle: bool = True, rng: Optional[np.random.Generator] = None,
+                kind: str = "onehot") -> Iterator[Dict]:
+        n = len(self)
+        order = (rng or np.random.default_rng()).permutation(n) if shuffle else np.arange(n)
+        for start in range(0, n, batch_size):
+            indices = order[start:start + batch_size]
+            # lecture memmap plus rapide sur des index triés
+            yield self.batch(np.sort(indices) if shuffle else indices, kind)
+
+
+def _source_meta(policy_path: str) -> Dict:
+    stat = os.stat(policy_path)
+    return {"source": os.path.abspath(policy_path), "size": stat.st_size, "mtime": stat.st_mtime}
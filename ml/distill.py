@@ -0,0 +1,253 @@
+# ml/distill.py
+# ============================================================
+# Distillation exhaustive modèle -> table : le réseau est évalué une fois sur TOUTES les clés
+# d'infoset atteignables, et le résultat est écrit en table quantifiée au format compact
+# (.gtop ou .json.gz). Servir la généralisation du modèle coûte alors une recherche dans la
+# table (AveragePolicy.load / open_mapped) au lieu d'un forward PyTorch.
+#
+# Espace énuméré (buckets de infoset.py) :
+#   PREFLOP   : 3 rôles x 169 mains x BOARD 0 x HEROBOARD 0 x tailles
+#   FLOP..RIVER : 3 rôles x 169 mains x 18 boards x 10 HEROBOARD (0..9) x tailles
+#   tailles   : triplets (POT, RATIO, SPR)
+#     --sizing grid     : grille complète 24 x 7 x 7 = 1176 triplets par phase
+#     --sizing observed : triplets présents dans la policy de référence, par phase (défaut avec --reference)
+#
+# --reference : policy CFR (.json.gz / .gtop). Ses entrées sont recopiées telles quelles et le
+# modèle ne comble que les infosets absents (visits = 0 pour les lignes distillées).
+#
+# Écriture par blocs de clés triées : .gtop pré-alloué en memmap, .json.gz en flux.
+#
+# Usage (depuis ml/) :
+#   python distill.py --weights trained_policy_model.pth --reference ../policy/avg_policy.json.gz \
+#                     --out ../policy/distilled_policy.gtop
+# ============================================================
+
+import argparse
+import gzip
+import itertools
+import os
+import sys
+import time
+from typing import Dict, Iterator, Optional
+
+import numpy as np
+import torch
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from artificial_policy import quantize_rows
+from infoset import _POS, _MASK, _POT_EDGES_BB, _RATIO_EDGES, _SPR_EDGES, pack_u64_array, unpack_infoset_keys
+from policy_binary import (ACTIONS, DEFAULT_TOP_K, VISITS_CAP, PolicyColumns, create_policy_binary,
+                           is_policy_binary, read_policy_binary)
+from stats_policy import iter_policy_chunks
+from dataset import key_inputs
+from train import input_kind, load_trained_model
+
+N_PHASES = 4            # PREFLOP..RIVER (SHOWDOWN n'a pas de décision)
+N_ROLES = 3
+N_HANDS = 169
+N_BOARDS = 18           # infoset.board_bucket postflop : suit_tex*6 + paired*3 + high_card
+N_HEROBOARD = 10        # infoset.hero_vs_board_bucket : 0..9
+SIZING_BUCKETS = {"POT": len(_POT_EDGES_BB) - 1, "RATIO": len(_RATIO_EDGES) - 1, "SPR": len(_SPR_EDGES) - 1}
+SIZING_MASK = sum(_MASK[field] << _POS[field] for field in SIZING_BUCKETS)
+
+DISTILL_CHUNK = 1 << 20
+_CHECK = ACTIONS.index("CHECK")
+
+
+# -------------------------
+# Espace des clés
+# -------------------------
+def sizing_grid() -> np.ndarray:
+    """Tous les triplets (POT, RATIO, SPR) packés à leur position dans la clé (uint64 triés)."""
+    pot, ratio, spr = np.meshgrid(*(np.arange(n) for n in SIZING_BUCKETS.values()), indexing="ij")
+    return np.sort(pack_u64_array(POT=pot.ravel(), RATIO=ratio.ravel(), SPR=spr.ravel()))
+
+def observed_sizings(reference: PolicyColumns) -> Dict[int, np.ndarray]:
+    """Triplets de tailles présents dans la policy de référence, par phase."""
+    keys = np.asarray(reference.keys, dtype=np.uint64)
+    phases = unpack_infoset_keys(keys)["PHASE"]
+    sizing = keys & np.uint64(SIZING_MASK)
+    return {phase: np.unique(sizing[phases == phase]) for phase in range(N_PHASES)}
+
+def _categorical_axes(phase: int):
+    if phase == 0:
+        return np.zeros(1, dtype=np.uint64), np.zeros(1, dtype=np.uint64)
+    return (pack_u64_array(BOARD=np.arange(N_BOARDS)), pack_u64_array(HEROBOARD=np.arange(N_HEROBOARD)))
+
+def count_keys(sizings: Dict[int, np.ndarray]) -> int:
+    total = 0
+    for phase, sizing in sizings.items():
+        boards, heroboards = _categorical_axes(phase)
+        total += N_ROLES * N_HANDS * len(boards) * len(sizing) * len(heroboards)
+    return total
+
+def iter_key_chunks(sizings: Dict[int, np.ndarray], chunk_size: int = DISTILL_CHUNK) -> Iterator[np.ndarray]:
+    """Clés énumérées par blocs, en ordre croissant (PHASE > ROLE > HAND > BOARD > tailles > HEROBOARD)."""
+    for phase in sorted(sizings):
+        sizing = sizings[phase]
+        boards, heroboards = _categorical_axes(phase)
+        per_hand = len(boards) * len(sizing) * len(heroboards)
+        if per_hand == 0:
+            continue
+        hands_per_chunk = max(1, chunk_size // per_hand)
+        for role in range(N_ROLES):
+            for start in range(0, N_HANDS, hands_per_chunk):
+                hands = np.arange(start, min(N_HANDS, start + hands_per_chunk))
+                base = pack_u64_array(PHASE=phase, ROLE=role, HAND=hands)
+                yield (base[:, None, None, None] | boards[None, :, None, None] |
+                       sizing[None, None, :, None] | heroboards[None, None, None, :]).ravel()
+
+def is_enumerated(keys: np.ndarray, sizings: Dict[int, np.ndarray]) -> np.ndarray:
+    """bool[n] : la clé fait partie de l'espace énuméré par iter_key_chunks."""
+    keys = np.asarray(keys, dtype=np.uint64)
+    fields = unpack_infoset_keys(keys)
+    phase = fields["PHASE"]
+    preflop = phase == 0
+    inside = (phase < N_PHASES) & (fields["ROLE"] < N_ROLES) & (fields["HAND"] < N_HANDS)
+    inside &= np.where(preflop, fields["BOARD"] == 0, fields["BOARD"] < N_BOARDS)
+    inside &= np.where(preflop, fields["HEROBOARD"] == 0, fields["HEROBOARD"] < N_HEROBOARD)
+    sizing = keys & np.uint64(SIZING_MASK)
+    for p, allowed in sizings.items():
+        rows = phase == p
+        inside[rows] &= np.isin(sizing[rows], allowed)
+    return inside
+
+# -------------------------
+# Référence et modèle
+# -------------------------
+def load_reference(path: str) -> PolicyColumns:
+    """Policy CFR en colonnes triées (.gtop en memmap, .json.gz lu par blocs)."""
+    if is_policy_binary(path):
+        return read_policy_binary(path, mmap=True)
+    chunks = list(iter_policy_chunks(path))
+    columns = PolicyColumns(*(np.concatenate(parts) for parts in zip(*chunks)))
+    order = np.argsort(columns.keys, kind="stable")
+    return PolicyColumns(*(column[order] for column in columns))
+
+def model_distributions(model, keys: np.ndarray, batch_size: int = 65536) -> np.ndarray:
+    """Sorties du réseau float32[n, 5] ; CHECK retiré quand RATIO > 0 (mise à suivre non nulle)."""
+    kind = input_kind(model)
+    probs = np.empty((len(keys), len(ACTIONS)), dtype=np.float32)
+    with torch.no_grad():
+        for start in range(0, len(keys), batch_size):
+            probs[start:start + batch_size] = model(*key_inputs(keys[start:start + batch_size], kind)).numpy()
+    facing_bet = unpack_infoset_keys(keys)["RATIO"] > 0
+    probs[facing_bet, _CHECK] = 0.0
+    return probs
+
+# -------------------------
+# Distillation
+# -------------------------
+def _write_json_rows(f, keys, masks, q, visits, first: bool) -> None:
+    popcounts = [min(bin(m).count("1"), DEFAULT_TOP_K) for m in range(256)]
+    parts = [f'"{key}":{{"policy":[{",".join(map(str, [mask] + qs[:popcounts[mask]]))}],"visits":{v}}}'
+             for key, mask, qs, v in zip(keys.tolist(), masks.tolist(), q.tolist(), visits.tolist())]
+    if parts:
+        f.write(("" if first else ",") + ",".join(parts))
+
+def distill_policy(weights_path: str, out_path: str, reference_path: Optional[str] = None,
+                   sizing: str = "observed", chunk_size: int = DISTILL_CHUNK,
+                   batch_size: int = 65536) -> Dict[str, float]:
+    """Table dense (clés triées) : entrées de la référence si présentes, sinon sortie quantifiée du modèle."""
+    if sizing == "observed" and reference_path is None:
+        raise ValueError("[DISTILL] --sizing observed nécessite --reference (ou utiliser --sizing grid)")
+    model = load_trained_model(weights_path)
+    reference = load_reference(reference_path) if reference_path else None
+    if sizing == "observed":
+        sizings = observed_sizings(reference)
+    else:
+        sizings = {phase: sizing_grid() for phase in range(N_PHASES)}
+
+    # Clés de la référence hors de l'espace énuméré : conservées (fusionnées par plage de clés)
+    extras = np.zeros(0, dtype=np.uint64)
+    if reference is not None:
+        extras = np.asarray(reference.keys, dtype=np.uint64)[~is_enumerated(reference.keys, sizings)]
+    total = count_keys(sizings) + len(extras)
+    print(f"[DISTILL] {total:,} infosets ({count_keys(sizings):,} énumérés + {len(extras):,} hors grille), "
+          f"tailles: {sizing} ({', '.join(f'{p}:{len(s)}' for p, s in sizings.items())})")
+
+    binary = out_path.endswith(".gtop")
+    tmp_path = out_path + ".tmp"
+    stats = {"infosets": total, "model": 0, "reference": 0}
+    start_time = time.perf_counter()
+    written = 0
+    low = 0
+
+    if binary:
+        out = create_policy_binary(tmp_path, total)
+    else:
+        out = gzip.open(tmp_path, "wt", encoding="utf-8", compresslevel=6)
+        out.write("{")
+
+    for enumerated in itertools.chain(iter_key_chunks(sizings, chunk_size), [None]):
+        # clés hors grille jusqu'à la dernière clé du bloc (toutes les restantes au dernier tour)
+        high = len(extras) if enumerated is None else int(np.searchsorted(extras, enumerated[-1], side="right"))
+        keys = extras[low:high] if enumerated is None else np.sort(np.concatenate([enumerated, extras[low:high]]))
+        low = high
+        if not len(keys):
+            continue
+
+        n = len(keys)
+        masks = np.zeros(n, dtype=np.uint8)
+        q = np.zeros((n, DEFAULT_TOP_K), dtype=np.uint8)
+        visits = np.zeros(n, dtype=np.int64)
+        found = np.zeros(n, dtype=bool)
+        if reference is not None:
+            rows = np.minimum(np.searchsorted(reference.keys, keys), len(reference) - 1)
+            found = np.asarray(reference.keys[rows]) == keys
+            masks[found] = reference.masks[rows[found]]
+            q[found] = reference.q[rows[found]]
+            visits[found] = reference.visits[rows[found]]
+
+        missing = ~found
+        if missing.any():
+            model_masks, model_q, _ = quantize_rows(model_distributions(model, keys[missing], batch_size),
+                                                    DEFAULT_TOP_K, bit_order=True)
+            masks[missing] = model_masks
+            q[missing] = model_q
+
+        if binary:
+            out.keys[written:written + n] = keys
+            out.masks[written:written + n] = masks
+            out.q[written:written + n] = q
+            out.visits[written:written + n] = np.minimum(visits, VISITS_CAP)
+        else:
+            _write_json_rows(out, keys, masks, q, visits, first=written == 0)
+        written += n
+        stats["model"] += int(missing.sum())
+        stats["reference"] += int(found.sum())
+        elapsed = time.perf_counter() - start_time
+        print(f"\r[DISTILL] {written:,}/{total:,} ({written / max(elapsed, 1e-9):,.0f} infosets/s)", end="", flush=True)
+    print()
+
+    if binary:
+        del out
+    else:
+        out.write("}")
+        out.close()
+    os.replace(tmp_path, out_path)
+    stats["seconds"] = time.perf_counter() - start_time
+    stats["bytes"] = os.path.getsize(out_path)
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Distillation exhaustive du modèle en table de policy compacte")
+    parser.add_argument("--weights", default="trained_policy_model.pth")
+    parser.add_argument("--out", default="../policy/distilled_policy.gtop", help=".gtop (memmap) ou .json.gz")
+    parser.add_argument("--reference", default=None, help="Policy CFR : entrées recopiées, le modèle comble les trous")
+    parser.add_argument("--sizing", choices=["observed", "grid"], default=None,
+                        help="Triplets POT/RATIO/SPR énumérés (défaut: observed avec --reference, sinon grid)")
+    parser.add_argument("--chunk-size", type=int, default=DISTILL_CHUNK)
+    parser.add_argument("--batch-size", type=int, default=65536)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    result = distill_policy(args.weights, args.out, args.reference,
+                            args.sizing or ("observed" if args.reference else "grid"),
+                            args.chunk_size, args.batch_size)
+    print(f"[SAVE] {args.out} : {result['infosets']:,} infosets "
+          f"({result['reference']:,} référence, {result['model']:,} modèle) "
+          f"en {result['seconds']:.1f}s, {result['bytes'] / 1e6:.1f} MB")
@@ -0,0 +1,49 @@
+# ml/features.py
+# Encodage des clés d'infoset en entrées du réseau, en numpy seul (pas de torch) :
+# partagé par ml/dataset.py (entraînement) et ml/numpy_model.py (inférence sans torch).
+import os
+import sys
+from typing import Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from infoset import unpack_infoset_keys
+
+# Colonnes catégorielles / numériques (ordre des colonnes des tableaux)
+CATEGORICAL_FIELDS = ["PHASE", "ROLE", "HAND", "BOARD", "HEROBOARD"]
+SCALAR_FIELDS = ["POT", "RATIO", "SPR"]
+# Taille des blocs one-hot du vecteur dense 224 (même ordre que train.infoset_to_features)
+ONEHOT_SIZES = {"PHASE": 7, "ROLE": 3, "HAND": 169, "BOARD": 31, "HEROBOARD": 11}
+N_FEATURES = 224
+
+
+def fields_from_keys(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """uint64[n] -> (uint8[n, 5] indices catégoriels, float32[n, 3] scalaires / 255)."""
+    fields = unpack_infoset_keys(keys)
+    categorical = np.stack([fields[f] for f in CATEGORICAL_FIELDS], axis=1)
+    scalars = np.stack([fields[f] for f in SCALAR_FIELDS], axis=1).astype(np.float32) / 255
+    return categorical, scalars
+
+
+def onehot_columns(categorical: np.ndarray) -> np.ndarray:
+    """Colonne du 1 de chaque bloc one-hot dans le vecteur 224 : int64[n, 5] (ordre CATEGORICAL_FIELDS)."""
+    offsets = []
+    offset = 0
+    for field in CATEGORICAL_FIELDS[:4]:                      # PHASE, ROLE, HAND, BOARD
+        offsets.append(offset)
+        offset += ONEHOT_SIZES[field]
+    offsets.append(offset + len(SCALAR_FIELDS))               # HEROBOARD après POT, RATIO, SPR
+    return categorical.astype(np.int64) + np.array(offsets, dtype=np.int64)
+
+
+SCALAR_COLUMNS = np.arange(len(SCALAR_FIELDS)) + sum(ONEHOT_SIZES[f] for f in CATEGORICAL_FIELDS[:4])
+
+
+def onehot_array(categorical: np.ndarray, scalars: np.ndarray) -> np.ndarray:
+    """Vecteur dense float32[n, 224] (entrée de ml/model.Model) depuis les colonnes, par lot."""
+    n = len(categorical)
+    features = np.zeros((n, N_FEATURES), dtype=np.float32)
+    features[np.arange(n)[:, None], onehot_columns(categorical)] = 1
+    features[:, SCALAR_COLUMNS] = scalars
+    return features
@@ -14,10 +14,60 @@ class Model(torch.nn.Module):
         self.softmax = torch.nn.Softmax(dim=1)
 
     def forward(self, x):
+        return self.softmax(self.logits(x))
+
+    def logits(self, x):
+        """Sorties avant softmax (pour une loss en log-espace)."""
         x = self.relu(self.fc1(x))
         x = self.relu(self.fc2(x))
         x = self.relu(self.fc3(x))
         x = self.relu(self.fc4(x))
         x = self.relu(self.fc5(x))
-        x = self.fc6(x)  # No ReLU before softmax
-        return self.softmax(x)
\ No newline at end of file
+        return self.fc6(x)  # No ReLU before softmax
+
+class EmbeddingModel(torch.nn.Module):
+    """
+    Variante sans one-hot : prend directement les champs de la clé d'infoset.
+      categorical : LongTensor [n, 5] (PHASE, ROLE, HAND, BOARD, HEROBOARD)
+      scalars     : FloatTensor [n, 3] (POT, RATIO, SPR / 255)
+    """
+    # (taille du vocabulaire = plage du champ dans la clé, dimension de l'embedding)
+    EMBEDDINGS = {"phase": (8, 4), "role": (4, 4), "hand": (256, 16), "board": (32, 8), "heroboard": (16, 4)}
+    N_SCALARS = 3
+
+    def __init__(self, output_size, hidden_size=256):
+        super(EmbeddingModel, self).__init__()
+        self.phase_embedding = torch.nn.Embedding(*self.EMBEDDINGS["phase"])
+        self.role_embedding = torch.nn.Embedding(*self.EMBEDDINGS["role"])
+        self.hand_embedding = torch.nn.Embedding(*self.EMBEDDINGS["hand"])
+        self.board_embedding = torch.nn.Embedding(*self.EMBEDDINGS["board"])
+        self.heroboard_embedding = torch.nn.Embedding(*self.EMBEDDINGS["heroboard"])
+
+        input_size = sum(dim for _, dim in self.EMBEDDINGS.values()) + self.N_SCALARS
+        self.fc1 = torch.nn.Linear(input_size, hidden_size)
+        self.fc2 = torch.nn.Linear(hidden_size, hidden_size)
+        self.fc3 = torch.nn.Linear(hidden_size, 128)
+        self.fc4 = torch.nn.Linear(128, 64)
+        self.fc5 = torch.nn.Linear(64, output_size)
+
+        self.relu = torch.nn.ReLU()
+        self.softmax = torch.nn.Softmax(dim=1)
+
+    def forward(self, categorical, scalars):
+        return self.softmax(self.logits(categorical, scalars))
+
+    def logits(self, categorical, scalars):
+        """Sorties avant softmax (pour une loss en log-espace)."""
+        x = torch.cat([
+            self.phase_embedding(categorical[:, 0]),
+            self.role_embedding(categorical[:, 1]),
+            self.hand_embedding(categorical[:, 2]),
+            self.board_embedding(categorical[:, 3]),
+            self.heroboard_embedding(categorical[:, 4]),
+            scalars,
+        ], dim=1)
+        x = self.relu(self.fc1(x))
+        x = self.relu(self.fc2(x))
+        x = self.relu(self.fc3(x))
+        x = self.relu(self.fc4(x))
+        return self.fc5(x)  # No ReLU before softmax
@@ -0,0 +1,139 @@
+# ml/numpy_model.py
+# ============================================================
+# Inférence du réseau de policy en numpy pur : aucun import de torch (démarrage en
+# millisecondes, quelques dizaines de MB de RSS) pour les processus qui ne font que prédire.
+#
+#   python numpy_model.py export trained_policy_model.pth trained_policy_model.npz   # torch requis ici seulement
+#   python numpy_model.py check  trained_policy_model.pth trained_policy_model.npz   # écart vs torch
+#
+#   model = NumpyPolicyModel.load("trained_policy_model.npz")
+#   probs = model.predict(keys)        # uint64[n] -> float32[n, 5]
+#
+# Model (one-hot 224) : la première couche est calculée comme somme des 5 colonnes de poids
+# actives + 3 colonnes scalaires (équivalent exact de fc1(one_hot), sans construire le vecteur 224).
+# ============================================================
+
+import argparse
+import os
+import sys
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from features import CATEGORICAL_FIELDS, N_FEATURES, SCALAR_COLUMNS, fields_from_keys, onehot_array, onehot_columns
+
+KIND_KEY = "__kind__"
+
+
+def export_npz(weights_path: str, out_path: str) -> Dict[str, np.ndarray]:
+    """state_dict PyTorch (.pth) -> .npz (float32, mêmes noms de paramètres). Seule fonction qui importe torch."""
+    import torch
+    state = torch.load(weights_path, map_location="cpu")
+    arrays = {name: tensor.detach().cpu().numpy().astype(np.float32) for name, tensor in state.items()}
+    kind = "fields" if "phase_embedding.weight" in arrays else "onehot"
+    tmp_path = out_path + ".tmp.npz"
+    np.savez(tmp_path, **{KIND_KEY: np.array(kind)}, **arrays)
+    os.replace(tmp_path, out_path)
+    return arrays
+
+
+class NumpyPolicyModel:
+    """MLP de ml/model.py (Model ou EmbeddingModel) : Linear + ReLU, softmax final, en float32."""
+
+    def __init__(self, kind: str, layers: List[Tuple[np.ndarray, np.ndarray]],
+                 embeddings: Dict[str, np.ndarray] = None):
+        self.kind = kind
+        self.layers = layers                # [(weight [out, in], bias [out])], fc1..fcN
+        self.embeddings = embeddings or {}  # champ catégoriel -> table [vocab, dim]
+        # poids transposés contigus [in, out] : x @ W^T sans vue strided à chaque appel ;
+        # fc1 sur un one-hot = somme de lignes de first_columns [224, hidden]
+        self.transposed = [(np.ascontiguousarray(weight.T), bias) for weight, bias in layers]
+        self.first_columns = self.transposed[0][0] if kind == "onehot" else None
+
+    @staticmethod
+    def load(path: str) -> "NumpyPolicyModel":
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        kind = str(arrays.pop(KIND_KEY))
+        n_layers = len([name for name in arrays if name.startswith("fc") and name.endswith(".weight")])
+        layers = [(arrays[f"fc{i}.weight"], arrays[f"fc{i}.bias"]) for i in range(1, n_layers + 1)]
+        embeddings = {field: arrays[f"{field.lower()}_embedding.weight"]
+                      for field in CATEGORICAL_FIELDS if f"{field.lower()}_embedding.weight" in arrays}
+        if kind == "onehot" and layers[0][0].shape[1] != N_FEATURES:
+            raise ValueError(f"[NUMPY] fc1 attend {layers[0][0].shape[1]} entrées, pas {N_FEATURES}")
+        return NumpyPolicyModel(kind, layers, embeddings)
+
+    def _first_layer(self, categorical: np.ndarray, scalars: np.ndarray) -> np.ndarray:
+        weight_t, bias = self.transposed[0]
+        if self.kind == "onehot":
+            hidden = self.first_columns[onehot_columns(categorical)].sum(axis=1)
+            hidden += scalars @ self.first_columns[SCALAR_COLUMNS]
+        else:
+            x = np.concatenate([self.embeddings[field][categorical[:, column]]
+                                for column, field in enumerate(CATEGORICAL_FIELDS)] + [scalars], axis=1)
+            hidden = x @ weight_t
+        return hidden + bias
+
+    def _hidden_to_probs(self, x: np.ndarray) -> np.ndarray:
+        """Sortie de fc1 -> ReLU/Linear des couches suivantes -> softmax (stable, float32)."""
+        for weight_t, bias in self.transposed[1:]:
+            np.maximum(x, 0, out=x)
+            x = x @ weight_t + bias
+        x -= x.max(axis=1, keepdims=True)
+        np.exp(x, out=x)
+        x /= x.sum(axis=1, keepdims=True)
+        return x
+
+    def forward_fields(self, categorical: np.ndarray, scalars: np.ndarray) -> np.ndarray:
+        """Indices catégoriels [n, 5] + scalaires [n, 3] -> probabilités float32[n, n_actions]."""
+        return self._hidden_to_probs(self._first_layer(categorical, scalars.astype(np.float32, copy=False)))
+
+    def forward(self, features: np.ndarray) -> np.ndarray:
+        """Entrée dense 224 (comme Model.forward) ; réservé au modèle one-hot."""
+        if self.kind != "onehot":
+            raise ValueError("[NUMPY] forward(features) n'existe que pour le modèle one-hot")
+        weight_t, bias = self.transposed[0]
+        return self._hidden_to_probs(features.astype(np.float32, copy=False) @ weight_t + bias)
+
+    def predict(self, keys) -> np.ndarray:
+        """Clés uint64 (liste ou tableau) -> float32[n, n_actions]."""
+        return self.forward_fields(*fields_from_keys(np.asarray(keys, dtype=np.uint64)))
+
+
+def check_against_torch(weights_path: str, npz_path: str, n: int = 20000, seed: int = 0) -> Dict[str, float]:
+    """Écart numpy vs torch sur des clés aléatoires valides (torch requis)."""
+    from inference import EagerPredictor, random_keys
+    keys = random_keys(n, seed)
+    expected = EagerPredictor(weights_path).predict(keys)
+    model = NumpyPolicyModel.load(npz_path)
+    probs = model.predict(keys)
+    report = {"max_abs_diff": float(np.abs(probs - expected).max()),
+              "top1_agreement": float((probs.argmax(axis=1) == expected.argmax(axis=1)).mean())}
+    if model.kind == "onehot":
+        dense = model.forward(onehot_array(*fields_from_keys(keys)))
+        report["max_abs_diff_dense"] = float(np.abs(dense - expected).max())
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export .npz et inférence numpy du réseau de policy")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_export = sub.add_parser("export", help=".pth -> .npz")
+    p_export.add_argument("weights")
+    p_export.add_argument("out")
+    p_check = sub.add_parser("check", help="Écart numpy vs torch et temps de chargement")
+    p_check.add_argument("weights")
+    p_check.add_argument("npz")
+    args = parser.parse_args()
+
+    if args.cmd == "export":
+        export_npz(args.weights, args.out)
+        print(f"[SAVE] {args.out} ({os.path.getsize(args.out) / 1e6:.2f} MB)")
+    else:
+        start = time.perf_counter()
+        NumpyPolicyModel.load(args.npz)
+        print(f"[NUMPY] chargement {1e3 * (time.perf_counter() - start):.1f} ms")
+        for name, value in check_against_torch(args.weights, args.npz).items():
+            print(f"  {name}: {value:.3g}")
@@ -3,12 +3,14 @@ import gzip
 import torch
 import torch.nn as nn
 import torch.optim as optim
-from torch.utils.data import Dataset, DataLoader
 import numpy as np
-from typing import Dict, List
-from model import Model
+from typing import Dict, List, Optional
+from model import Model, EmbeddingModel
+from dataset import PolicyArrays, fields_from_keys, onehot_features, key_inputs, N_FEATURES
 import sys
 import os
+import time
+import argparse
 from tqdm import tqdm
 
 # Add parent directory to path to import infoset
@@ -72,34 +74,29 @@ def infoset_to_features(infoset_key: int) -> torch.Tensor:
     
     return torch.tensor(feature_vector, dtype=torch.float32)
 
-class PolicyDataset(Dataset):
-    def __init__(self, policy_data: Dict):
-        self.data = []
-        
-        print("Loading policy data...")
-        for infoset_key_str, entry in tqdm(policy_data.items(), desc="Processing infosets"):
-            infoset_key = int(infoset_key_str)
-                
-            policy = entry["policy"]
-            bitmask = policy[0]
-            quantized_values = policy[1:]
-            
-            # Reconstruct probabilities
-            probabilities = reconstruct_probabilities(bitmask, quantized_values)
-            
-            # Convert to features
-            features = infoset_to_features(infoset_key)
-            targets = torch.tensor(probabilities, dtype=torch.float32)
-            
-            self.data.append((features, targets))
-        
-        print(f"Loaded {len(self.data)} training samples")
-    
-    def __len__(self):
-        return len(self.data)
-    
-    def __getitem__(self, idx):
-        return self.data[idx]
+def infoset_keys_to_features(infoset_keys) -> torch.Tensor:
+    """Version vectorisée de infoset_to_features : uint64[n] -> float32[n, 224]"""
+    return onehot_features(*fields_from_keys(np.asarray(infoset_keys, dtype=np.uint64)))
+
+def input_kind(model) -> str:
+    """"fields" (indices + scalaires) pour EmbeddingModel, "onehot" (224) pour Model."""
+    return "fields" if isinstance(model, EmbeddingModel) else "onehot"
+
+def build_model(kind: str = "onehot"):
+    if kind == "embedding":
+        return EmbeddingModel(N_ACTIONS)
+    return Model(N_FEATURES, N_ACTIONS)
+
+def load_trained_model(weights_path: str):
+    """Poids .pth -> Model ou EmbeddingModel (détecté d'après le state_dict), en mode eval."""
+    state = torch.load(weights_path, map_location="cpu")
+    if "phase_embedding.weight" in state:
+        model = EmbeddingModel(N_ACTIONS, hidden_size=state["fc1.weight"].shape[0])
+    else:
+        model = Model(state["fc1.weight"].shape[1], N_ACTIONS)
+    model.load_state_dict(state)
+    model.eval()
+    return model
 
 def load_policy(path: str) -> Dict:
     """Load policy data from gzipped JSON file"""
@@ -107,89 +104,166 @@ def load_policy(path: str) -> Dict:
         raw = json.load(f)
     return raw
 
-def train(model: Model, policy: dict, epochs: int = 100, batch_size: int = 32, lr: float = 0.001):
-    """Train the model on policy data"""
+def as_policy_arrays(policy) -> PolicyArrays:
+    """dict JSON (load_policy) ou PolicyArrays déjà construit."""
+    if isinstance(policy, PolicyArrays):
+        return policy
+    return PolicyArrays.from_policy_dict(policy)
+
+LOSSES = ["mse", "kl"]
+WEIGHTINGS = ["uniform", "visits", "sqrt"]
+LR_SCALINGS = ["none", "linear", "sqrt"]
+
+def scaled_lr(lr: float, batch_size: int, base_batch_size: int = 64, scaling: str = "none") -> float:
+    """LR pour `batch_size`, `lr` étant réglé pour `base_batch_size` (règle linéaire ou racine carrée)."""
+    ratio = batch_size / base_batch_size
+    if scaling == "linear":
+        return lr * ratio
+    if scaling == "sqrt":
+        return lr * ratio ** 0.5
+    return lr
+
+def sample_weights(visits: torch.Tensor, weighting: str = "uniform", mean_weight: float = 1.0) -> torch.Tensor:
+    """
+    Poids par échantillon depuis les visites, divisés par `mean_weight`, la moyenne des poids sur
+    tout le dataset (dataset_mean_weight) : un batch pèse selon sa masse de visites, et l'espérance
+    de la loss sur les batches est l'objectif pondéré par les visites du dataset entier.
+    """
+    if weighting == "visits":
+        weights = visits.clamp_min(1.0)
+    elif weighting == "sqrt":
+        weights = visits.clamp_min(1.0).sqrt()
+    else:
+        return torch.ones_like(visits)
+    return weights / mean_weight
+
+def dataset_mean_weight(visits: np.ndarray, weighting: str = "uniform") -> float:
+    """Moyenne des poids de sample_weights sur tout le dataset (calculée une fois par entraînement)."""
+    if weighting == "uniform" or len(visits) == 0:
+        return 1.0
+    weights = sample_weights(torch.from_numpy(np.asarray(visits, dtype=np.float32)), weighting)
+    return float(weights.double().mean())
+
+def batch_loss(model, batch: Dict, loss: str = "mse", weighting: str = "uniform",
+               mean_weight: float = 1.0) -> torch.Tensor:
+    """
+    "mse" : MSE sur les sorties softmax (comportement historique).
+    "kl"  : entropie croisée cible -> log_softmax(logits) ; même gradient que KL(cible || modèle).
+    """
+    weights = sample_weights(batch["visits"], weighting, mean_weight)
+    if loss == "kl":
+        log_probs = torch.log_softmax(model.logits(*batch["inputs"]), dim=1)
+        per_sample = -(batch["targets"] * log_probs).sum(dim=1)
+    else:
+        per_sample = ((model(*batch["inputs"]) - batch["targets"]) ** 2).mean(dim=1)
+    return (per_sample * weights).mean()
+
+def train(model: Model, policy, epochs: int = 100, batch_size: int = 32, lr: float = 0.001,
+          loss: str = "mse", weighting: str = "uniform", lr_scaling: str = "none",
+          base_batch_size: int = 64, warmup_steps: int = 0, threads: Optional[int] = None,
+          target_loss: Optional[float] = None) -> List[Dict[str, float]]:
+    """
+    Train the model on policy data (dict JSON ou PolicyArrays).
+    Retourne l'historique par epoch (loss moyenne, durée, échantillons/s).
+    Mode rapide : loss="kl", weighting="visits", gros batch (ex. 4096) + lr_scaling="sqrt".
+    """
+    if loss not in LOSSES or weighting not in WEIGHTINGS or lr_scaling not in LR_SCALINGS:
+        raise ValueError(f"[TRAIN] Option inconnue: loss={loss} weighting={weighting} lr_scaling={lr_scaling}")
+    if threads:
+        torch.set_num_threads(threads)
     
-    # Create dataset and dataloader
+    # Tableaux contigus, mini-batches par indexation (pas de DataLoader ni d'objets par échantillon)
     print("Preparing dataset...")
-    dataset = PolicyDataset(policy)
-    dataloader = DataLoader(dataset, batch_size=batch_size, shuffle=True)
+    dataset = as_policy_arrays(policy)
+    rng = np.random.default_rng(0)
+    batches_per_epoch = (len(dataset) + batch_size - 1) // batch_size
+    mean_weight = dataset_mean_weight(dataset.visits, weighting)
     
-    # Loss function and optimizer
-    criterion = nn.MSELoss()
-    optimizer = optim.Adam(model.parameters(), lr=lr)
+    # Optimizer (LR mis à l'échelle de la taille de batch, warmup linéaire optionnel)
+    effective_lr = scaled_lr(lr, batch_size, base_batch_size, lr_scaling)
+    optimizer = optim.Adam(model.parameters(), lr=effective_lr)
+    scheduler = optim.lr_scheduler.LambdaLR(
+        optimizer, lambda step: min(1.0, (step + 1) / warmup_steps) if warmup_steps else 1.0)
     
     print(f"Training on {len(dataset)} samples")
     print(f"Batch size: {batch_size}")
-    print(f"Learning rate: {lr}")
+    print(f"Learning rate: {effective_lr:g} (base {lr:g} @ {base_batch_size}, scaling {lr_scaling})")
+    print(f"Loss: {loss}, weighting: {weighting}, threads: {torch.get_num_threads()}")
     print(f"Epochs: {epochs}")
-    print(f"Total batches per epoch: {len(dataloader)}")
+    print(f"Total batches per epoch: {batches_per_epoch}")
     
     model.train()
+    history = []
+    train_start = time.perf_counter()
     
     for epoch in range(epochs):
         total_loss = 0.0
         num_batches = 0
+        epoch_start = time.perf_counter()
         
-        epoch_pbar = tqdm(dataloader, desc=f"Epoch {epoch+1}/{epochs}", leave=False)
-        for batch_features, batch_targets in epoch_pbar:
+        epoch_pbar = tqdm(dataset.batches(batch_size, shuffle=True, rng=rng, kind=input_kind(model)),
+                          total=batches_per_epoch,
+                          desc=f"Epoch {epoch+1}/{epochs}", leave=False)
+        for batch in epoch_pbar:
             optimizer.zero_grad()            
-            # Forward pass
-            outputs = model(batch_features)
-            
-            # Calculate loss (using KL divergence for probability distributions)
-            loss = criterion(outputs, batch_targets)
+            # Forward pass + loss
+            batch_value = batch_loss(model, batch, loss, weighting, mean_weight)
             
             # Backward pass
-            loss.backward()
+            batch_value.backward()
             optimizer.step()
+            scheduler.step()
             
-            total_loss += loss.item()
+            total_loss += batch_value.item()
             num_batches += 1
             
             # Update progress bar
             epoch_pbar.set_postfix({
-                'loss': f'{loss.item():.6f}',
+                'loss': f'{batch_value.item():.6f}',
                 'avg_loss': f'{total_loss/num_batches:.6f}'
             })
         
         avg_loss = total_loss / num_batches
-        print(f"Epoch {epoch+1}/{epochs}, Average Loss: {avg_loss:.6f}")
+        seconds = time.perf_counter() - epoch_start
+        history.append({"epoch": epoch + 1, "loss": avg_loss, "seconds": seconds,
+                        "samples_per_s": len(dataset) / seconds,
+                        "elapsed_s": time.perf_counter() - train_start})
+        print(f"Epoch {epoch+1}/{epochs}, Average Loss: {avg_loss:.6f}, "
+              f"{seconds:.1f}s ({len(dataset) / seconds:,.0f} samples/s)")
+        if target_loss is not None and avg_loss <= target_loss:
+            print(f"Target loss {target_loss:g} reached after {history[-1]['elapsed_s']:.1f}s")
+            break
     
     print("Training completed!")
+    return history
 
-def evaluate_model(model: Model, policy: dict, num_samples: int = 1000):
-    """Evaluate model performance on a subset of policy data"""
+def evaluate_model(model: Model, policy, num_samples: int = 1000, batch_size: int = 4096):
+    """Evaluate model performance on a subset of policy data (dict JSON ou PolicyArrays)"""
     model.eval()
-    criterion = nn.MSELoss()
     
-    print("Preparing evaluation dataset...")
-    dataset = PolicyDataset(policy)
+    dataset = as_policy_arrays(policy)
     if len(dataset) == 0:
         print("No data to evaluate")
         return
     
     # Sample random indices
-    indices = np.random.choice(len(dataset), min(num_samples, len(dataset)), replace=False)
+    indices = np.sort(np.random.choice(len(dataset), min(num_samples, len(dataset)), replace=False))
     
     total_kl_div = 0.0
     total_l1_error = 0.0
     
     print(f"Evaluating on {len(indices)} samples...")
     with torch.no_grad():
-        for idx in tqdm(indices, desc="Evaluating samples"):
-            features, targets = dataset[idx]
-            features = features.unsqueeze(0)
-            
-            outputs = model(features)
+        for start in range(0, len(indices), batch_size):
+            batch = dataset.batch(indices[start:start + batch_size], input_kind(model))
+            outputs = model(*batch["inputs"])
+            targets = batch["targets"]
             
-            # KL divergence
-            kl_div = criterion(outputs, targets)
-            total_kl_div += kl_div.item()
+            # KL divergence (MSE par échantillon, comme avant)
+            total_kl_div += ((outputs - targets) ** 2).mean(dim=1).sum().item()
             
             # L1 error
-            l1_error = torch.abs(outputs - targets).mean()
-            total_l1_error += l1_error.item()
+            total_l1_error += torch.abs(outputs - targets).mean(dim=1).sum().item()
     
     avg_kl_div = total_kl_div / len(indices)
     avg_l1_error = total_l1_error / len(indices)
@@ -198,36 +272,114 @@ def evaluate_model(model: Model, policy: dict, num_samples: int = 1000):
     print(f"  Average KL Divergence: {avg_kl_div:.6f}")
     print(f"  Average L1 Error: {avg_l1_error:.6f}")
 
+def holdout_metrics(model, dataset: PolicyArrays, batch_size: int = 8192) -> Dict[str, float]:
+    """MSE, KL(cible || modèle), L1 et accord sur l'action majoritaire, sur tout `dataset`."""
+    model.eval()
+    totals = {"mse": 0.0, "kl": 0.0, "l1": 0.0, "top1": 0.0}
+    with torch.no_grad():
+        for batch in dataset.batches(batch_size, shuffle=False, kind=input_kind(model)):
+            outputs = model(*batch["inputs"])
+            targets = batch["targets"]
+            totals["mse"] += ((outputs - targets) ** 2).mean(dim=1).sum().item()
+            totals["kl"] += (targets * (torch.log(targets.clamp_min(1e-8)) -
+                                        torch.log(outputs.clamp_min(1e-8)))).sum(dim=1).sum().item()
+            totals["l1"] += torch.abs(outputs - targets).sum(dim=1).sum().item()
+            totals["top1"] += (outputs.argmax(dim=1) == targets.argmax(dim=1)).float().sum().item()
+    return {name: value / max(1, len(dataset)) for name, value in totals.items()}
+
+def inference_us_per_sample(model, dataset: PolicyArrays, batch_size: int = 1, repeats: int = 200) -> float:
+    """Latence CPU d'inférence depuis les clés packées (construction des entrées incluse)."""
+    keys = np.asarray(dataset.keys[:batch_size * repeats])
+    kind = input_kind(model)
+    model.eval()
+    with torch.no_grad():
+        start = time.perf_counter()
+        for i in range(0, len(keys), batch_size):
+            model(*key_inputs(keys[i:i + batch_size], kind))
+    return 1e6 * (time.perf_counter() - start) / max(1, len(keys))
+
+def compare_models(policy, epochs: int = 5, batch_size: int = 64, lr: float = 0.001,
+                   holdout: float = 0.1, seed: int = 0, **train_options) -> Dict[str, Dict[str, float]]:
+    """Entraîne Model (one-hot 224) et EmbeddingModel sur le même split et compare la précision sur le holdout."""
+    train_set, holdout_set = as_policy_arrays(policy).split(holdout, seed)
+    results = {}
+    for kind in ("onehot", "embedding"):
+        torch.manual_seed(seed)
+        model = build_model(kind)
+        start = time.perf_counter()
+        train(model, train_set, epochs=epochs, batch_size=batch_size, lr=lr, **train_options)
+        results[kind] = {
+            "train_s": time.perf_counter() - start,
+            "params": sum(p.numel() for p in model.parameters()),
+            **holdout_metrics(model, holdout_set),
+            "infer_us_b1": inference_us_per_sample(model, holdout_set, batch_size=1),
+            "infer_us_b1024": inference_us_per_sample(model, holdout_set, batch_size=1024, repeats=5),
+        }
+
+    print(f"\n{'='*60}")
+    print(f"COMPARAISON ({len(train_set)} train / {len(holdout_set)} holdout, {epochs} epochs)")
+    print(f"{'='*60}")
+    names = list(next(iter(results.values())))
+    print(f"{'':>16}" + "".join(f"{kind:>14}" for kind in results))
+    for name in names:
+        print(f"{name:>16}" + "".join(f"{results[kind][name]:>14.6g}" for kind in results))
+    return results
+
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Entraînement du réseau de policy")
+    parser.add_argument("--policy", default="../policy/avg_policy.json.gz")
+    parser.add_argument("--cache", default="../policy/dataset_cache", help="Cache .npy du dataset")
+    parser.add_argument("--model", choices=["onehot", "embedding"], default="onehot")
+    parser.add_argument("--epochs", type=int, default=50)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--lr", type=float, default=0.001, help="LR de base (pour --base-batch-size)")
+    parser.add_argument("--loss", choices=LOSSES, default="mse")
+    parser.add_argument("--weighting", choices=WEIGHTINGS, default="uniform", help="Poids par échantillon (visites)")
+    parser.add_argument("--lr-scaling", choices=LR_SCALINGS, default="none")
+    parser.add_argument("--base-batch-size", type=int, default=64)
+    parser.add_argument("--warmup-steps", type=int, default=0)
+    parser.add_argument("--threads", type=int, default=None, help="torch.set_num_threads")
+    parser.add_argument("--target-loss", type=float, default=None, help="Arrêt dès que la loss moyenne d'epoch l'atteint")
+    parser.add_argument("--out", default=None, help="Poids .pth (défaut selon --model)")
+    parser.add_argument("--compare", action="store_true",
+                        help="Compare one-hot vs embedding sur un holdout (pas de sauvegarde)")
+    args = parser.parse_args()
+    train_options = {"loss": args.loss, "weighting": args.weighting, "lr_scaling": args.lr_scaling,
+                     "base_batch_size": args.base_batch_size, "warmup_steps": args.warmup_steps,
+                     "threads": args.threads, "target_loss": args.target_loss}
+
     print("=" * 60)
     print("POKER POLICY NEURAL NETWORK TRAINING")
     print("=" * 60)
     
-    # Load policy data
+    # Load policy data (converti une fois en tableaux .npy, relus en memmap ensuite)
     print("Loading policy data...")
-    policy_path = "../policy/avg_policy.json.gz"
-    policy_data = load_policy(policy_path)
+    policy_data = PolicyArrays.load_or_build(args.policy, args.cache)
     
     print(f"Loaded policy with {len(policy_data)} infosets")
+
+    if args.compare:
+        compare_models(policy_data, epochs=args.epochs, batch_size=args.batch_size, lr=args.lr, **train_options)
+        sys.exit(0)
     
     # Create model
     print("Creating neural network model...")
-    input_size = 224  # Total one-hot features: 7+3+169+31+3+11 = 224
-    output_size = N_ACTIONS  # Number of actions
-    model = Model(input_size, output_size)
-    print(f"Model created: {input_size} inputs -> {output_size} outputs")
+    model = build_model(args.model)
+    print(f"Model created: {type(model).__name__} -> {N_ACTIONS} outputs")
     
     # Train model
     print("\nStarting training...")
-    train(model, policy_data, epochs=50, batch_size=64, lr=0.001)
+    train(model, policy_data, epochs=args.epochs, batch_size=args.batch_size, lr=args.lr, **train_options)
     
     # Evaluate model
     print("\nEvaluating model...")
     evaluate_model(model, policy_data)
     
     # Save trained model
+    out_path = args.out or ("trained_policy_model.pth" if args.model == "onehot"
+                            else "trained_policy_model_embedding.pth")
     print("\nSaving model...")
-    torch.save(model.state_dict(), "trained_policy_model.pth")
-    print("Model saved to trained_policy_model.pth")
+    torch.save(model.state_dict(), out_path)
+    print(f"Model saved to {out_path}")
     
     print("\nTraining pipeline completed successfully!")
\ No newline at end of file
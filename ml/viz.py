@@ -1,24 +1,28 @@
+import argparse
 import os
 import sys
+import time
 import numpy as np
 import torch
 import seaborn as sns
 import matplotlib.pyplot as plt
-from tqdm import tqdm
 
 # Allow importing from project root
 ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.append(ROOT_DIR)
 
-from infoset import pack_u64, unpack_infoset_key_dense
-from ml.train import infoset_to_features, N_ACTIONS
-from ml.model import Model
+from infoset import pack_u64_array, ROLE_LABELS, _POT_EDGES_BB, _RATIO_EDGES, _SPR_EDGES
+from ml.train import input_kind, load_trained_model, N_ACTIONS
+from ml.dataset import key_inputs
 
 # Constants
 RANK_LABELS = ["A","K","Q","J","T","9","8","7","6","5","4","3","2"]
 PHASE_PREFLOP = 0
-BOARD_BUCKET_PF = 3
+BOARD_BUCKET_PF = 0     # infoset.board_bucket([]) -> 0
 HEROBOARD_PF = 0
+N_POT_BUCKETS = len(_POT_EDGES_BB) - 1
+N_RATIO_BUCKETS = len(_RATIO_EDGES) - 1
+N_SPR_BUCKETS = len(_SPR_EDGES) - 1
 
 # Indices must match ACTIONS order in training
 FOLD_IDX = 0
@@ -27,17 +31,16 @@ CALL_IDX = 2
 RAISE_IDX = 3
 ALLIN_IDX = 4
 
-def build_preflop_key(hand_index, role_id) -> int:
-    """Build an infoset key for a preflop state given the 0..168 hand index."""
-    # Preflop buckets set to minimal buckets
-    return pack_u64(
+def build_preflop_keys(role_id, pot_idx=0, ratio_idx=0, spr_idx=0) -> np.ndarray:
+    """All 169 preflop keys at once (uint64[169], indexed by hand index)."""
+    return pack_u64_array(
         PHASE=PHASE_PREFLOP,
         ROLE=role_id,
-        HAND=hand_index,
+        HAND=np.arange(169),
         BOARD=BOARD_BUCKET_PF,
-        POT=0,
-        RATIO=0,
-        SPR=0,
+        POT=pot_idx,
+        RATIO=ratio_idx,
+        SPR=spr_idx,
         HEROBOARD=HEROBOARD_PF,
     )
 
@@ -62,27 +65,46 @@ def reconstruct_probabilities(bitmask: int, quantized_values: list[int]) -> np.n
             q_idx += 1
     return probs
 
-def generate_preflop_heatmap(model, role_id, save_path) -> str:
-    """Generate and save a heatmap of (RAISE+ALL-IN)/FOLD for all 169 preflop hands.
-    Returns the path to the saved image.
-    """
+def model_probabilities(model, keys, batch_size: int = 1 << 16) -> np.ndarray:
+    """Batched forward over packed keys (any shape) -> float32[..., N_ACTIONS]."""
+    keys = np.asarray(keys, dtype=np.uint64)
+    flat = keys.ravel()
+    kind = input_kind(model)
+    probs = np.empty((len(flat), N_ACTIONS), dtype=np.float32)
     model.eval()
-    values = np.zeros((13, 13), dtype=np.float32)
-    eps = 1e-6
-
     with torch.no_grad():
-        for i in tqdm(range(13), desc="Rows (high card)"):
-            for j in range(13):
-                hidx = hand_index_from_grid(i, j)
-                key = build_preflop_key(hidx, role_id)
-                x = infoset_to_features(key).unsqueeze(0)
-                probs = model(x)[0].cpu().numpy()
-                p_fold = float(probs[FOLD_IDX])
-                p_raise = float(probs[RAISE_IDX])
-                p_allin = float(probs[ALLIN_IDX])
-                ratio = (p_raise + p_allin) / max(p_fold + p_raise + p_allin, eps)
-                values[i, j] = ratio
+        for start in range(0, len(flat), batch_size):
+            probs[start:start + batch_size] = model(*key_inputs(flat[start:start + batch_size], kind)).numpy()
+    return probs.reshape(keys.shape + (N_ACTIONS,))
+
+def raise_fold_ratio(probs: np.ndarray, eps: float = 1e-9) -> np.ndarray:
+    """(RAISE+ALL-IN) / (FOLD+RAISE+ALL-IN), elementwise over the leading axes."""
+    p_raiseallin = probs[..., RAISE_IDX] + probs[..., ALLIN_IDX]
+    return p_raiseallin / np.maximum(probs[..., FOLD_IDX] + p_raiseallin, eps)
+
+def build_preflop_enumeration(role_id) -> np.ndarray:
+    """All preflop keys of a role: uint64[169, POT x RATIO x SPR] (every sizing bucket)."""
+    pot, ratio, spr = np.meshgrid(np.arange(N_POT_BUCKETS), np.arange(N_RATIO_BUCKETS),
+                                  np.arange(N_SPR_BUCKETS), indexing="ij")
+    return pack_u64_array(
+        PHASE=PHASE_PREFLOP,
+        ROLE=role_id,
+        HAND=np.arange(169)[:, None],
+        BOARD=BOARD_BUCKET_PF,
+        POT=pot.ravel()[None, :],
+        RATIO=ratio.ravel()[None, :],
+        SPR=spr.ravel()[None, :],
+        HEROBOARD=HEROBOARD_PF,
+    )
 
+def preflop_ratio_grid(model, role_id, exhaustive: bool = True) -> np.ndarray:
+    """13x13 (RAISE+ALL-IN)/FOLD grid; exhaustive = uniform mean over every pot/ratio/SPR bucket."""
+    keys = build_preflop_enumeration(role_id) if exhaustive else build_preflop_keys(role_id)[:, None]
+    per_hand = raise_fold_ratio(model_probabilities(model, keys)).mean(axis=1)
+    # hand index = row * 13 + col (see hand_index_from_grid)
+    return per_hand.reshape(13, 13).astype(np.float32)
+
+def plot_grid(values, title, save_path) -> str:
     plt.figure(figsize=(10, 8))
     ax = sns.heatmap(values, annot=False, cmap="magma", cbar=True)
     ax.set_xticks(np.arange(13) + 0.5)
@@ -91,90 +113,55 @@ def generate_preflop_heatmap(model, role_id, save_path) -> str:
     ax.set_yticklabels(RANK_LABELS, rotation=0)
     ax.set_xlabel("Low card (cols) — suited above diagonal, offsuit below")
     ax.set_ylabel("High card (rows)")
-    ax.set_title("Preflop (RAISE+ALL-IN) / FOLD ratio")
+    ax.set_title(title)
     plt.tight_layout()
 
     plt.savefig(save_path, dpi=160)
     plt.close()
     return save_path
 
+def generate_preflop_heatmap(model, role_id, save_path) -> str:
+    """Generate and save a heatmap of (RAISE+ALL-IN)/FOLD for all 169 preflop hands
+    (minimal pot/ratio/SPR buckets, one batched forward pass).
+    Returns the path to the saved image.
+    """
+    values = preflop_ratio_grid(model, role_id, exhaustive=False)
+    return plot_grid(values, "Preflop (RAISE+ALL-IN) / FOLD ratio", save_path)
+
 def generate_preflop_heatmap_model_exhaustive(model, role_id, save_path) -> str:
-    """Enumerate ALL preflop BTN infosets (by bucket indices) and average the
+    """Enumerate ALL preflop infosets of `role_id` (by bucket indices) and average the
     (RAISE+ALL-IN)/FOLD ratio per HAND. No visit weighting; uniform over enumerated
     preflop buckets.
 
-    Buckets enumerated:
+    Buckets enumerated (169 x 24 x 7 x 7 = 198,744 keys, batched forward):
       - HAND: 0..168
       - PHASE: PREFLOP
-      - ROLE: provided role_id (e.g., BTN=2)
+      - ROLE: provided role_id
       - BOARD: 0 (no board)
-      - POT: 0..22  (derived from _POT_EDGES_BB length)
+      - POT: 0..23  (derived from _POT_EDGES_BB length)
       - RATIO: 0..6 (derived from _RATIO_EDGES length)
       - SPR: 0..6   (derived from _SPR_EDGES length)
       - HEROBOARD: 0 (preflop)
     """
-    model.eval()
-    eps = 1e-9
-    sums = np.zeros(169, dtype=np.float64)
-    counts = np.zeros(169, dtype=np.int64)
-
-    with torch.no_grad():
-        for hand_idx in tqdm(range(169), desc="Hands (0..168)"):
-            pot_idx = 3
-            ratio_idx = 4
-            spr_idx = 6
-            key = pack_u64(
-                PHASE=PHASE_PREFLOP,
-                ROLE=role_id,
-                HAND=hand_idx,
-                BOARD=BOARD_BUCKET_PF,
-                POT=pot_idx,
-                RATIO=ratio_idx,
-                SPR=spr_idx,
-                HEROBOARD=HEROBOARD_PF,
-            )
-            x = infoset_to_features(key).unsqueeze(0)
-            probs = model(x)[0].cpu().numpy()
-            p_fold = float(probs[FOLD_IDX])
-            p_raiseallin= float(probs[RAISE_IDX] + probs[ALLIN_IDX])
-            ratio = p_raiseallin / max(p_fold + p_raiseallin, eps)
-            sums[hand_idx] += ratio
-            counts[hand_idx] += 1
-
-    values = np.zeros((13, 13), dtype=np.float32)
-    for hand_idx in range(169):
-        i, j = grid_coords_from_hand_index(hand_idx)
-        values[i, j] = float(sums[hand_idx] / counts[hand_idx]) if counts[hand_idx] > 0 else 0.0
-
-    plt.figure(figsize=(10, 8))
-    ax = sns.heatmap(values, annot=False, cmap="magma", cbar=True)
-    ax.set_xticks(np.arange(13) + 0.5)
-    ax.set_yticks(np.arange(13) + 0.5)
-    ax.set_xticklabels(RANK_LABELS, rotation=0)
-    ax.set_yticklabels(RANK_LABELS, rotation=0)
-    ax.set_xlabel("Low card (cols) — suited above diagonal, offsuit below")
-    ax.set_ylabel("High card (rows)")
-    ax.set_title("Preflop mean (RAISE+ALL-IN)/FOLD — exhaustive model avg (BTN)")
-    plt.tight_layout()
-
-    plt.savefig(save_path, dpi=160)
-    plt.close()
-    return save_path
-
-def load_model(weights_path, input_size, output_size) -> Model:
-    model = Model(input_size, output_size)
-    state = torch.load(weights_path, map_location="cpu")
-    model.load_state_dict(state)
-    model.eval()
-    return model
+    values = preflop_ratio_grid(model, role_id, exhaustive=True)
+    title = f"Preflop mean (RAISE+ALL-IN)/FOLD — exhaustive model avg ({ROLE_LABELS[role_id]})"
+    return plot_grid(values, title, save_path)
 
 if __name__ == "__main__":
-    role_id = 2 # BTN
-    
-    print("Loading model...")
-    model = load_model("trained_policy_model.pth", 224, N_ACTIONS)
+    parser = argparse.ArgumentParser(description="Preflop heatmaps of the trained model")
+    parser.add_argument("--weights", default="trained_policy_model.pth", help="Model or EmbeddingModel weights")
+    parser.add_argument("--roles", nargs="*", choices=ROLE_LABELS, default=ROLE_LABELS)
+    parser.add_argument("--single", action="store_true", help="Minimal buckets only (no pot/ratio/SPR enumeration)")
+    args = parser.parse_args()
 
-    print("Generating exhaustive preflop heatmap (BTN) -> preflop_heatmap.png")
-    out = generate_preflop_heatmap_model_exhaustive(model, role_id=role_id, save_path="preflop_heatmap.png")
-    
-    print(f"Saved: {out}")
+    print("Loading model...")
+    model = load_trained_model(args.weights)
+
+    for role in args.roles:
+        start = time.perf_counter()
+        save_path = f"preflop_heatmap_{role}.png"
+        if args.single:
+            out = generate_preflop_heatmap(model, role_id=ROLE_LABELS.index(role), save_path=save_path)
+        else:
+            out = generate_preflop_heatmap_model_exhaustive(model, role_id=ROLE_LABELS.index(role), save_path=save_path)
+        print(f"Saved: {out} ({time.perf_counter() - start:.1f}s)")
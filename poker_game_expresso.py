@@ -8,7 +8,7 @@ Dans le but d'effectuer des simulations de jeu pour l'algorithme MCCFR.
 import random as rd
 from typing import List, Optional
 from classes import Player, Card
-from utils import rank7
+from card_isomorphism import cached_rank7, canonical_suit_permutation
 
 FAST_TRAINING = True
 DEBUG_OPTI = False or not FAST_TRAINING
@@ -49,7 +49,7 @@ class PokerGameExpresso:
     Classe principale qui gère l'état et la logique du jeu de poker.
     """
     # poker_game_expresso.py (remplace __init__)
-    def __init__(self, init: GameInit):
+    def __init__(self, init: GameInit, canonical_suits: bool = False):
         self.num_players = 3
         self.small_blind = 1
         self.big_blind = 2
@@ -83,6 +83,8 @@ class PokerGameExpresso:
         self.final_stacks = {p.name: p.stack for p in self.players}
 
         self.deal_cards()
+        if canonical_suits:
+            self.canonicalize_suits()
         
         # Affichage des joueurs et leurs stacks
         for player in self.players:
@@ -197,6 +199,22 @@ class PokerGameExpresso:
                     print(f"[GAME_OPTI] {player.name} reçoit: {player.cards[0]} {player.cards[1]}")
 
 
+    def canonicalize_suits(self):
+        """
+        Renomme les couleurs de toute la donne (mains par rôle, board, deck restant) selon la
+        forme canonique des cartes visibles : les donnes isomorphes deviennent identiques.
+        La permutation est une bijection sur les donnes : appliquée à une donne uniforme, elle
+        tire chaque forme canonique avec le poids de son orbite.
+        """
+        groups = [[c.id for c in p.cards] for p in sorted(self.players, key=lambda p: p.role)]
+        perm = canonical_suit_permutation(*groups, [c.id for c in self.community_cards])
+        if perm == [0, 1, 2, 3]:
+            return
+        for player in self.players:
+            player.cards = [Card(c.rank, perm[c.suit]) for c in player.cards]
+        self.community_cards = [Card(c.rank, perm[c.suit]) for c in self.community_cards]
+        self.remaining_deck = [Card(c.rank, perm[c.suit]) for c in self.remaining_deck]
+
     def next_player(self):
         """
         Passe au prochain joueur actif et n'ayant pas fold dans le sens horaire.
@@ -686,12 +704,13 @@ class PokerGameExpresso:
             levels = sorted(set(contrib.values()))
             prev = 0
 
-            # Décode scores Treys (rank7 renvoie -score Treys, donc plus grand = meilleur)
+            # Décode scores Treys (rank7 renvoie -score Treys, donc plus grand = meilleur),
+            # mémoïsés par classe de force (card_isomorphism.rank7_key)
             b0, b1, b2, b3, b4 = [c.id for c in self.community_cards[:5]]
             scores = {}
             for p in active_players:
                 h0, h1 = p.cards[0].id, p.cards[1].id
-                scores[p] = rank7((h0, h1, b0, b1, b2, b3, b4))
+                scores[p] = cached_rank7((h0, h1, b0, b1, b2, b3, b4))
 
             # Itère chaque "couche" de mise
             for L in levels:
@@ -3,9 +3,11 @@ from __future__ import annotations
 import json
 import random
 import gzip
-from typing import Dict, List
+from typing import Dict, List, Optional
 from infoset import build_infoset_key_fast
 from poker_game_expresso import PokerGameExpresso
+from policy_binary import is_policy_binary, read_policy_binary, columns_from_compact, MappedPolicyTable
+from policy_backoff import BackoffIndex
 
 ACTIONS = ["FOLD","CHECK","CALL","RAISE","ALL-IN"]
 
@@ -25,18 +27,50 @@ def _decode_compact_entry(entry: list[int]) -> Dict[str, float]:
     return dist
 
 class AveragePolicy:
-    def __init__(self, policy: Dict[int, Dict[str, float]], seed: int = 123):
+    def __init__(self, policy: Dict[int, Dict[str, float]], seed: int = 123,
+                 backoff: Optional[BackoffIndex] = None):
         self.policy = policy
         self.rng = random.Random(seed)
+        self.backoff = backoff  # repli sur abstraction plus grossière si la clé exacte manque
 
     @staticmethod
-    def load(path: str, seed: int = 123) -> "AveragePolicy":
-        # GZIP + format compact OBLIGATOIRES
+    def load(path: str, seed: int = 123, mmap: bool = False, backoff: bool = False) -> "AveragePolicy":
+        # Format binaire .gtop (voir policy_binary.py) ou GZIP + format compact
+        # backoff=True : construit l'index de repli (policy_backoff.py) une fois au chargement
+        if mmap:
+            return AveragePolicy.open_mapped(path, seed=seed, backoff=backoff)
+        if is_policy_binary(path):
+            columns = read_policy_binary(path, mmap=False)
+            pol = {}
+            for i, key in enumerate(columns.keys.tolist()):
+                dist = columns.decode(i)
+                if dist:
+                    pol[key] = dist
+            index = BackoffIndex.from_columns(columns) if backoff else None
+            return AveragePolicy(pol, seed=seed, backoff=index)
+
         with gzip.open(path, "rt", encoding="utf-8") as f:
             raw = json.load(f)
+        policy = AveragePolicy.from_compact(raw, seed=seed)
+        if backoff:
+            policy.backoff = BackoffIndex.from_columns(columns_from_compact(raw))
+        return policy
+
+    @staticmethod
+    def open_mapped(path: str, seed: int = 123, backoff: bool = False) -> "AveragePolicy":
+        # .gtop non compressé : mmap + recherche dichotomique, décodage paresseux
+        table = MappedPolicyTable(path)
+        index = BackoffIndex.from_columns(table.columns) if backoff else None
+        return AveragePolicy(table, seed=seed, backoff=index)
+
+    @staticmethod
+    def from_compact(entries: Dict, seed: int = 123) -> "AveragePolicy":
+        # Accepte [mask, q...] ou {"policy": [mask, q...], "visits": n} (sortie de cfr_solver)
         pol: Dict[int, Dict[str, float]] = {}
-        for k, v in raw.items():
+        for k, v in entries.items():
             key = int(k)
+            if isinstance(v, dict):
+                v = v.get("policy")
             if not isinstance(v, list) or not v or not isinstance(v[0], int):
                 continue
             dist = _decode_compact_entry(v)
@@ -67,6 +101,9 @@ class AveragePolicy:
         return last
 
     def act(self, game: PokerGameExpresso) -> str:
+        return self.sample(self.distribution(game))
+
+    def distribution(self, game: PokerGameExpresso) -> Dict[str, float]:
         player = game.players[game.current_role]
         key = build_infoset_key_fast(game, player)
         legal = self.legal_actions(game)
@@ -74,6 +111,13 @@ class AveragePolicy:
             raise ValueError(f"[POLICY] legal actions : {legal}")
 
         dist = self.policy.get(key)
+        if self.backoff is not None:
+            level = 0
+            # clé absente ou sans masse sur les actions légales : repli (comme BatchPolicy.distributions)
+            if not dist or sum(dist.get(a, 0.0) for a in legal) <= 1e-12:
+                dist, level = self.backoff.lookup(key, legal)
+            self.backoff.record(key, level)
+
         if not dist:
             p = 1.0 / len(legal)
             dist = {a: p for a in legal}
@@ -86,4 +130,4 @@ class AveragePolicy:
             else:
                 dist = {a: v / s for a, v in dist.items()}
 
-        return self.sample(dist)
\ No newline at end of file
+        return dist
\ No newline at end of file
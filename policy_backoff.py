@@ -0,0 +1,184 @@
+# policy_backoff.py
+# ============================================================
+# Index de repli (backoff) pour AveragePolicy : quand la clé exacte d'un infoset est absente,
+# on cherche la distribution marginalisée sur une abstraction plus grossière au lieu de jouer uniforme.
+#
+# Niveaux (champs remis à 0 dans la clé, cumulés) :
+#   0 : clé exacte (table d'origine, pas stockée ici)
+#   1 : - HEROBOARD
+#   2 : - SPR
+#   3 : - RATIO
+#   4 : - POT
+#   5 : - BOARD
+#   6 : - HAND          (il ne reste que PHASE + ROLE)
+#
+# Chaque niveau = moyenne des distributions pondérée par les visites, construite une seule fois
+# (numpy) en tableaux compacts : clés uint64 triées + probas float32[n, 5], sans dict Python
+# (~60 octets par cellule). Un miss se résout en au plus 6 recherches dichotomiques
+# (np.searchsorted, comme BatchPolicy).
+#
+# Usage :
+#   python policy_backoff.py policy/avg_policy.json.gz [--hands 2000]
+# ============================================================
+
+from __future__ import annotations
+import argparse
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from infoset import _POS, _MASK, PHASE_TO_ID
+from policy_binary import ACTIONS, PolicyColumns
+
+BACKOFF_FIELDS = ["HEROBOARD", "SPR", "RATIO", "POT", "BOARD", "HAND"]
+LEVEL_NAMES = ["EXACT"] + [f"-{field}" for field in BACKOFF_FIELDS] + ["UNIFORM"]
+PHASES = [phase for phase in PHASE_TO_ID if phase != "SHOWDOWN"]
+
+_ALL_BITS = (1 << 64) - 1
+
+
+def _level_masks() -> List[int]:
+    """Masque AND de chaque niveau de repli (1..len(BACKOFF_FIELDS))."""
+    masks = []
+    dropped = 0
+    for field in BACKOFF_FIELDS:
+        dropped |= _MASK[field] << _POS[field]
+        masks.append(_ALL_BITS & ~dropped)
+    return masks
+
+LEVEL_MASKS = _level_masks()
+
+
+def probs_from_columns(columns: PolicyColumns) -> np.ndarray:
+    """Décodage vectorisé (mask, q top-k) -> float32[n, len(ACTIONS)], lignes normalisées (ou nulles)."""
+    n = len(columns)
+    masks = columns.masks.astype(np.int64)
+    q = np.asarray(columns.q, dtype=np.float32)
+    probs = np.zeros((n, len(ACTIONS)), dtype=np.float32)
+    slot = np.zeros(n, dtype=np.int64)  # position dans q du prochain bit présent
+    rows = np.arange(n)
+    top_k = q.shape[1]
+    for action_index in range(len(ACTIONS)):
+        present = ((masks >> action_index) & 1).astype(bool) & (slot < top_k)
+        probs[present, action_index] = q[rows[present], slot[present]]
+        slot += present
+    totals = probs.sum(axis=1, keepdims=True)
+    np.divide(probs, totals, out=probs, where=totals > 0)
+    return probs
+
+
+class BackoffIndex:
+    """Distributions marginalisées par niveau d'abstraction + compteurs de couverture par phase."""
+
+    def __init__(self, keys: np.ndarray, probs: np.ndarray, weights: np.ndarray):
+        keys = np.asarray(keys, dtype=np.uint64)
+        weights = np.asarray(weights, dtype=np.float64)
+        valid = probs.sum(axis=1) > 0
+        keys, probs, weights = keys[valid], probs[valid], weights[valid]
+        weighted = probs.astype(np.float64) * weights[:, None]
+
+        self.exact_phases = ((keys >> np.uint64(_POS["PHASE"])) & np.uint64(_MASK["PHASE"])).astype(np.int64)
+        self.level_keys: List[np.ndarray] = []
+        self.level_probs: List[np.ndarray] = []
+
+        for level_mask in LEVEL_MASKS:
+            coarse = keys & np.uint64(level_mask)
+            unique_keys, inverse = np.unique(coarse, return_inverse=True)
+            sums = np.zeros((len(unique_keys), len(ACTIONS)), dtype=np.float64)
+            np.add.at(sums, inverse, weighted)
+            totals = sums.sum(axis=1, keepdims=True)
+            np.divide(sums, totals, out=sums, where=totals > 0)
+            self.level_keys.append(unique_keys)
+            self.level_probs.append(sums.astype(np.float32))
+
+        # hits[phase_id][niveau] : 0 = exact, 1..6 = repli, 7 = uniforme
+        self.hits = np.zeros((len(PHASES), len(LEVEL_NAMES)), dtype=np.int64)
+
+    @staticmethod
+    def from_columns(columns: PolicyColumns) -> "BackoffIndex":
+        """Colonnes .gtop / JSON compact : pondération par les visites (plafonnées à 255)."""
+        weights = np.maximum(np.asarray(columns.visits, dtype=np.float64), 1.0)
+        return BackoffIndex(np.asarray(columns.keys), probs_from_columns(columns), weights)
+
+    @staticmethod
+    def from_policy(policy: Dict[int, Dict[str, float]]) -> "BackoffIndex":
+        """Table {key: {action: p}} sans visites : pondération uniforme."""
+        keys = np.fromiter((int(k) for k in policy), dtype=np.uint64, count=len(policy))
+        probs = np.zeros((len(policy), len(ACTIONS)), dtype=np.float32)
+        for row, dist in enumerate(policy.values()):
+            for action_index, action_name in enumerate(ACTIONS):
+                probs[row, action_index] = dist.get(action_name, 0.0)
+        return BackoffIndex(keys, probs, np.ones(len(policy)))
+
+    def record(self, key: int, level: int) -> None:
+        phase_id = (key >> _POS["PHASE"]) & _MASK["PHASE"]
+        if phase_id < len(PHASES):
+            self.hits[phase_id, level] += 1
+
+    def lookup(self, key: int, legal: Sequence[str]) -> Tuple[Optional[Dict[str, float]], int]:
+        """
+        Première abstraction peuplée qui donne une masse > 0 aux actions légales.
+        Retourne (distribution sur `legal` non normalisée, niveau) ou (None, niveau uniforme).
+        """
+        for level, (level_mask, keys) in enumerate(zip(LEVEL_MASKS, self.level_keys), start=1):
+            coarse = np.uint64(key & level_mask)
+            row = int(np.searchsorted(keys, coarse))
+            if row == len(keys) or keys[row] != coarse:
+                continue
+            probs = self.level_probs[level - 1][row]
+            dist = {a: float(probs[ACTIONS.index(a)]) for a in legal}
+            if sum(dist.values()) > 1e-12:
+                return dist, level
+        return None, len(LEVEL_NAMES) - 1
+
+    def coverage(self) -> Dict[str, Dict]:
+        """Par phase : infosets exacts, cellules peuplées par niveau, et répartition des requêtes servies."""
+        report = {}
+        for phase_id, phase in enumerate(PHASES):
+            cells = {"EXACT": int((self.exact_phases == phase_id).sum())}
+            for level, keys in enumerate(self.level_keys, start=1):
+                phases = (keys >> np.uint64(_POS["PHASE"])) & np.uint64(_MASK["PHASE"])
+                cells[LEVEL_NAMES[level]] = int((phases == phase_id).sum())
+            hits = self.hits[phase_id]
+            total = int(hits.sum())
+            report[phase] = {
+                "cells": cells,
+                "queries": total,
+                "served": {name: (int(hits[level]) / total if total else 0.0)
+                           for level, name in enumerate(LEVEL_NAMES)},
+            }
+        return report
+
+    def reset_hits(self) -> None:
+        self.hits[:] = 0
+
+
+def print_coverage(report: Dict[str, Dict]) -> None:
+    print(f"\n{'='*80}")
+    print("COUVERTURE POLICY PAR PHASE (cellules peuplées | part des requêtes servies)")
+    print(f"{'='*80}")
+    header = " ".join(f"{name:>10}" for name in LEVEL_NAMES)
+    print(f"{'':8} {header}")
+    for phase, stats in report.items():
+        cells = " ".join(f"{stats['cells'].get(name, 0):>10}" for name in LEVEL_NAMES[:-1])
+        print(f"{phase:8} {cells} {'':>10}")
+        if stats["queries"]:
+            served = " ".join(f"{100 * stats['served'][name]:>9.1f}%" for name in LEVEL_NAMES)
+            print(f"{'':8} {served}  ({stats['queries']} requêtes)")
+
+
+if __name__ == "__main__":
+    from match_simulator import play_hand
+    from policy import AveragePolicy
+
+    parser = argparse.ArgumentParser(description="Index de repli de la policy et couverture par phase")
+    parser.add_argument("policy", help="avg_policy.json.gz ou .gtop")
+    parser.add_argument("--hands", type=int, default=2000, help="Mains en self-play pour mesurer les requêtes")
+    parser.add_argument("--stacks", type=int, nargs=3, default=(100, 100, 100))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    policy = AveragePolicy.load(args.policy, backoff=True)
+    for hand in range(args.hands):
+        play_hand([policy] * 3, (0, 1, 2), args.seed + hand, tuple(args.stacks))
+    print_coverage(policy.backoff.coverage())
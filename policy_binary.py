@@ -0,0 +1,327 @@
+# policy_binary.py
+# ============================================================
+# Format binaire compact de la policy moyenne (.gtop), équivalent à avg_policy.json.gz.
+#
+# Layout (little-endian) :
+#   header  32 octets : magic "GTOP" | version u16 | top_k u8 | flags u8 | count u64 | 16 octets réservés
+#   keys    uint64[count]          clés d'infoset triées (recherche dichotomique)
+#   masks   uint8[count]           bitmask des actions présentes (ordre ACTIONS)
+#   q       uint8[count, top_k]    valeurs quantifiées (ordre des bits, complétées par 0)
+#   visits  uint8[count]           visites plafonnées (si flags & FLAG_VISITS)
+#
+# Le fichier brut est mappable en mémoire (np.memmap) et lisible en un seul ArrayBuffer
+# côté UI (ui/src/lib/policyBinary.ts). Il peut être encapsulé en gzip ou zstd (optionnel).
+#
+# Usage :
+#   python policy_binary.py to-bin  policy/avg_policy.json.gz policy/avg_policy.gtop [--compression gzip|zstd]
+#   python policy_binary.py to-json policy/avg_policy.gtop policy/avg_policy.json.gz
+#   python policy_binary.py bench   policy/avg_policy.json.gz
+# ============================================================
+
+from __future__ import annotations
+import argparse
+import gzip
+import json
+import os
+import struct
+import time
+from collections.abc import Mapping
+from typing import Dict, Iterator, NamedTuple, Optional
+
+import numpy as np
+
+ACTIONS = ["FOLD", "CHECK", "CALL", "RAISE", "ALL-IN"]
+
+MAGIC = b"GTOP"
+VERSION = 1
+HEADER = struct.Struct("<4sHBBQ16x")
+FLAG_VISITS = 1
+DEFAULT_TOP_K = 3
+VISITS_CAP = 255
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class PolicyColumns(NamedTuple):
+    keys: np.ndarray    # uint64[n], triées
+    masks: np.ndarray   # uint8[n]
+    q: np.ndarray       # uint8[n, top_k]
+    visits: np.ndarray  # uint8[n]
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def find(self, key: int) -> int:
+        """Index de `key` (recherche dichotomique) ou -1."""
+        i = int(np.searchsorted(self.keys, np.uint64(key)))
+        if i < len(self.keys) and int(self.keys[i]) == key:
+            return i
+        return -1
+
+    def decode(self, i: int) -> Dict[str, float]:
+        mask = int(self.masks[i])
+        qs = self.q[i]
+        total = int(qs.sum())
+        if not mask or total <= 0:
+            return {}
+        dist = {}
+        qi = 0
+        for action_index, action_name in enumerate(ACTIONS):
+            if (mask >> action_index) & 1:
+                dist[action_name] = int(qs[qi]) / total
+                qi += 1
+        return dist
+
+# -------------------------
+# Encodage / décodage colonnes
+# -------------------------
+def columns_from_compact(entries: Dict, top_k: int = DEFAULT_TOP_K) -> PolicyColumns:
+    """Entrées JSON {key: {"policy": [mask, q...], "visits": n}} (ou [mask, q...]) -> colonnes triées."""
+    n = len(entries)
+    keys = np.empty(n, dtype=np.uint64)
+    masks = np.zeros(n, dtype=np.uint8)
+    q = np.zeros((n, top_k), dtype=np.uint8)
+    visits = np.zeros(n, dtype=np.uint8)
+
+    for i, (key, entry) in enumerate(entries.items()):
+        if isinstance(entry, dict):
+            encoded, visit_count = entry["policy"], entry.get("visits", 1)
+        else:
+            encoded, visit_count = entry, 1
+        values = encoded[1:1 + top_k]
+        keys[i] = int(key)
+        masks[i] = encoded[0]
+        q[i, :len(values)] = values
+        visits[i] = min(int(visit_count), VISITS_CAP)
+
+    order = np.argsort(keys, kind="stable")
+    return PolicyColumns(keys[order], masks[order], q[order], visits[order])
+
+def columns_to_compact(columns: PolicyColumns) -> Dict[str, Dict]:
+    """Colonnes -> dict JSON compact identique à celui écrit par cfr_solver."""
+    entries = {}
+    popcounts = [bin(m).count("1") for m in range(256)]
+    for key, mask, qs, visit_count in zip(columns.keys.tolist(), columns.masks.tolist(),
+                                          columns.q.tolist(), columns.visits.tolist()):
+        entries[str(key)] = {"policy": [mask] + qs[:popcounts[mask]], "visits": visit_count}
+    return entries
+
+# -------------------------
+# Fichier
+# -------------------------
+def _compress(payload: bytes, compression: Optional[str]) -> bytes:
+    if compression is None:
+        return payload
+    if compression == "gzip":
+        return gzip.compress(payload, compresslevel=6)
+    if compression == "zstd":
+        import zstandard  # dépendance optionnelle
+        return zstandard.ZstdCompressor(level=10).compress(payload)
+    raise ValueError(f"[GTOP] Compression inconnue: {compression}")
+
+def _decompress(payload: bytes) -> bytes:
+    if payload[:2] == _GZIP_MAGIC:
+        return gzip.decompress(payload)
+    if payload[:4] == _ZSTD_MAGIC:
+        import zstandard  # dépendance optionnelle
+        return zstandard.ZstdDecompressor().decompress(payload)
+    return payload
+
+def write_policy_binary(path: str, columns: PolicyColumns, compression: Optional[str] = None) -> None:
+    n, top_k = columns.q.shape
+    header = HEADER.pack(MAGIC, VERSION, top_k, FLAG_VISITS, n)
+    payload = b"".join([
+        header,
+        np.ascontiguousarray(columns.keys, dtype="<u8").tobytes(),
+        np.ascontiguousarray(columns.masks, dtype=np.uint8).tobytes(),
+        np.ascontiguousarray(columns.q, dtype=np.uint8).tobytes(),
+        np.ascontiguousarray(columns.visits, dtype=np.uint8).tobytes(),
+    ])
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_compress(payload, compression))
+    os.replace(tmp_path, path)
+
+def create_policy_binary(path: str, n: int, top_k: int = DEFAULT_TOP_K) -> PolicyColumns:
+    """
+    .gtop non compressé pré-alloué pour `n` infosets : colonnes memmap inscriptibles,
+    à remplir par tranches (clés triées) pour écrire une table plus grande que la RAM.
+    """
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, top_k, FLAG_VISITS, n))
+        f.truncate(HEADER.size + n * (8 + 1 + top_k + 1))
+    buffer = np.memmap(path, dtype=np.uint8, mode="r+")
+    return _columns_from_buffer(buffer, n, top_k)
+
+def _columns_from_buffer(buffer, n: int, top_k: int) -> PolicyColumns:
+    offset = HEADER.size
+    keys = np.frombuffer(buffer, dtype="<u8", count=n, offset=offset)
+    offset += 8 * n
+    masks = np.frombuffer(buffer, dtype=np.uint8, count=n, offset=offset)
+    offset += n
+    q = np.frombuffer(buffer, dtype=np.uint8, count=n * top_k, offset=offset).reshape(n, top_k)
+    offset += n * top_k
+    visits = np.frombuffer(buffer, dtype=np.uint8, count=n, offset=offset)
+    return PolicyColumns(keys, masks, q, visits)
+
+def parse_header(buffer) -> tuple[int, int, int]:
+    magic, version, top_k, flags, n = HEADER.unpack_from(buffer, 0)
+    if magic != MAGIC:
+        raise ValueError(f"[GTOP] Magic invalide: {magic!r}")
+    if version != VERSION:
+        raise ValueError(f"[GTOP] Version non supportée: {version}")
+    return n, top_k, flags
+
+def read_policy_binary(path: str, mmap: bool = True) -> PolicyColumns:
+    """Lit un .gtop. Si le fichier n'est pas compressé et mmap=True, les colonnes sont des vues memmap."""
+    with open(path, "rb") as f:
+        head = f.read(HEADER.size)
+
+    if mmap and head[:4] == MAGIC:
+        buffer = np.memmap(path, dtype=np.uint8, mode="r")
+    else:
+        with open(path, "rb") as f:
+            buffer = _decompress(f.read())
+
+    n, top_k, _ = parse_header(buffer)
+    return _columns_from_buffer(buffer, n, top_k)
+
+class MappedPolicyTable(Mapping):
+    """
+    Vue {infoset_key: {action: proba}} adossée à un .gtop mappé en mémoire.
+    Recherche dichotomique sur les clés triées, distributions décodées à la demande :
+    l'ouverture coûte quelques ms et les pages sont partagées entre process (page cache).
+    Pickle = chemin du fichier (les workers re-mappent au lieu de copier la table).
+    """
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            if f.read(4) != MAGIC:
+                raise ValueError(f"[GTOP] Fichier compressé ou invalide, non mappable: {path}")
+        self.path = path
+        self.columns = read_policy_binary(path, mmap=True)
+
+    def __reduce__(self):
+        return (MappedPolicyTable, (self.path,))
+
+    def __len__(self) -> int:
+        return len(self.columns)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.columns.keys.tolist())
+
+    def __contains__(self, key) -> bool:
+        return self.columns.find(int(key)) >= 0
+
+    def __getitem__(self, key) -> Dict[str, float]:
+        i = self.columns.find(int(key))
+        if i < 0:
+            raise KeyError(key)
+        return self.columns.decode(i)
+
+    def get(self, key, default=None):
+        i = self.columns.find(int(key))
+        return self.columns.decode(i) if i >= 0 else default
+
+def is_policy_binary(path: str) -> bool:
+    with open(path, "rb") as f:
+        head = f.read(4)
+    if head == MAGIC:
+        return True
+    if head[:2] == _GZIP_MAGIC:
+        with gzip.open(path, "rb") as f:
+            return f.read(4) == MAGIC
+    return head == _ZSTD_MAGIC
+
+# -------------------------
+# Conversion JSON <-> binaire
+# -------------------------
+def json_to_binary(src_path: str, dst_path: str, compression: Optional[str] = None) -> PolicyColumns:
+    with gzip.open(src_path, "rt", encoding="utf-8") as f:
+        raw = json.load(f)
+    columns = columns_from_compact(raw)
+    write_policy_binary(dst_path, columns, compression)
+    return columns
+
+def binary_to_json(src_path: str, dst_path: str) -> None:
+    entries = columns_to_compact(read_policy_binary(src_path, mmap=False))
+    data = json.dumps(entries, separators=(",", ":"), ensure_ascii=False)
+    with gzip.open(dst_path, "wt", encoding="utf-8") as f:
+        f.write(data)
+
+# -------------------------
+# Benchmark
+# -------------------------
+def _timed(func, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def benchmark(json_path: str, out_dir: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    out_dir = out_dir or os.path.dirname(json_path) or "."
+    base = os.path.join(out_dir, os.path.basename(json_path).replace(".json.gz", ""))
+
+    def load_json():
+        with gzip.open(json_path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    variants = {"raw": (None, base + ".gtop"), "gzip": ("gzip", base + ".gtop.gz")}
+    try:
+        import zstandard  # noqa: F401
+        variants["zstd"] = ("zstd", base + ".gtop.zst")
+    except ImportError:
+        print("[BENCH] zstandard non installé : variante zstd ignorée")
+
+    columns = columns_from_compact(load_json())
+    results = {"json.gz": {"bytes": os.path.getsize(json_path), "load_s": _timed(load_json)}}
+    for name, (compression, path) in variants.items():
+        write_policy_binary(path, columns, compression)
+        results[name] = {
+            "bytes": os.path.getsize(path),
+            "load_s": _timed(lambda: read_policy_binary(path, mmap=False)),
+        }
+    results["raw"]["mmap_load_s"] = _timed(lambda: read_policy_binary(variants["raw"][1], mmap=True))
+
+    # Une recherche de clé (dichotomie sur keys)
+    sample_keys = columns.keys[:: max(1, len(columns) // 1000)].tolist()
+    mapped = read_policy_binary(variants["raw"][1], mmap=True)
+    lookup_s = _timed(lambda: [mapped.find(k) for k in sample_keys])
+    results["raw"]["lookup_us"] = 1e6 * lookup_s / max(1, len(sample_keys))
+
+    print(f"\n{'='*80}")
+    print(f"BENCH FORMAT POLICY ({len(columns)} infosets)")
+    print(f"{'='*80}")
+    for name, stats in results.items():
+        extra = f" | mmap {stats['mmap_load_s']*1e3:8.2f} ms | lookup {stats['lookup_us']:.2f} µs" if "mmap_load_s" in stats else ""
+        print(f"{name:>8} | {stats['bytes']/1e6:9.2f} MB | load {stats['load_s']*1e3:9.1f} ms{extra}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Conversion JSON <-> binaire (.gtop) de la policy moyenne")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    to_bin = sub.add_parser("to-bin", help="avg_policy.json.gz -> .gtop")
+    to_bin.add_argument("src")
+    to_bin.add_argument("dst")
+    to_bin.add_argument("--compression", choices=["gzip", "zstd"], default=None)
+
+    to_json = sub.add_parser("to-json", help=".gtop -> avg_policy.json.gz")
+    to_json.add_argument("src")
+    to_json.add_argument("dst")
+
+    bench = sub.add_parser("bench", help="Tailles et temps de chargement JSON vs binaire")
+    bench.add_argument("src")
+    bench.add_argument("--out-dir", default=None)
+
+    args = parser.parse_args()
+    if args.command == "to-bin":
+        converted = json_to_binary(args.src, args.dst, args.compression)
+        print(f"[SAVE] {args.dst} ({len(converted)} infosets)")
+    elif args.command == "to-json":
+        binary_to_json(args.src, args.dst)
+        print(f"[SAVE] {args.dst}")
+    else:
+        benchmark(args.src, args.out_dir)
@@ -0,0 +1,194 @@
+# policy_cube.py
+# ============================================================
+# Cube analytique de la policy : marginales d'actions pré-calculées hors-ligne.
+#
+# Cellule = combinaison PHASE x ROLE x HAND x BOARD (+ POT / RATIO / SPR en option).
+# Chaque cellule stocke des SOMMES (additives, donc re-marginalisables exactement) :
+#   counts          nombre d'infosets
+#   visits          somme des visites
+#   weighted_sum    float[5]  somme des probas x visites   -> moyenne pondérée = weighted_sum / visits
+#   unweighted_sum  float[5]  somme des probas             -> moyenne simple   = unweighted_sum / counts
+#
+# Construction en flux (stats_policy.iter_policy_chunks) : mémoire bornée par le nombre de cellules.
+# Artefacts : .npz (scripts Python) et JSON colonne par colonne (UI, ui/src/lib/policyCube.ts).
+#
+# Usage :
+#   python policy_cube.py policy/avg_policy.json.gz --out policy/policy_cube.npz --json ui/public/policy_cube.json
+#   python policy_cube.py policy/avg_policy.gtop --extra-dims POT SPR --out policy/policy_cube_pot_spr.npz
+# ============================================================
+
+from __future__ import annotations
+import argparse
+import json
+import os
+import time
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from infoset import pack_u64_array, unpack_infoset_keys
+from policy_backoff import probs_from_columns
+from policy_binary import ACTIONS
+from stats_policy import ID_TO_PHASE, ROLE_LABELS, EXPORT_CHUNK, iter_policy_chunks
+
+BASE_DIMS = ["PHASE", "ROLE", "HAND", "BOARD"]
+EXTRA_DIMS = ["POT", "RATIO", "SPR"]
+
+
+class PolicyCube:
+    def __init__(self, dims: Sequence[str], cells: np.ndarray, counts: np.ndarray, visits: np.ndarray,
+                 weighted_sum: np.ndarray, unweighted_sum: np.ndarray):
+        self.dims = list(dims)
+        self.cells = cells                    # uint64[m] : clé d'infoset réduite aux champs `dims` (triées)
+        self.counts = counts                  # int64[m]
+        self.visits = visits                  # float64[m]
+        self.weighted_sum = weighted_sum      # float64[m, 5]
+        self.unweighted_sum = unweighted_sum  # float64[m, 5]
+
+    def __len__(self) -> int:
+        return len(self.cells)
+
+    # -------------------------
+    # Construction
+    # -------------------------
+    @staticmethod
+    def _aggregate(dims, cells, counts, visits, weighted, unweighted) -> "PolicyCube":
+        unique_cells, inverse = np.unique(cells, return_inverse=True)
+        m = len(unique_cells)
+        weighted_sum = np.stack([np.bincount(inverse, weighted[:, a], minlength=m)
+                                 for a in range(len(ACTIONS))], axis=1)
+        unweighted_sum = np.stack([np.bincount(inverse, unweighted[:, a], minlength=m)
+                                   for a in range(len(ACTIONS))], axis=1)
+        return PolicyCube(dims, unique_cells,
+                          np.bincount(inverse, counts, minlength=m).astype(np.int64),
+                          np.bincount(inverse, visits, minlength=m),
+                          weighted_sum, unweighted_sum)
+
+    @staticmethod
+    def build(src_path: str, extra_dims: Sequence[str] = (), chunk_size: int = EXPORT_CHUNK) -> "PolicyCube":
+        """Agrège la policy (.json.gz ou .gtop) par blocs ; seules les cellules peuplées sont gardées."""
+        unknown = [d for d in extra_dims if d not in EXTRA_DIMS]
+        if unknown:
+            raise ValueError(f"[CUBE] Dimensions inconnues: {unknown} (choix: {EXTRA_DIMS})")
+        dims = BASE_DIMS + [d for d in EXTRA_DIMS if d in extra_dims]
+
+        cube: Optional[PolicyCube] = None
+        for columns in iter_policy_chunks(src_path, chunk_size):
+            probs = probs_from_columns(columns).astype(np.float64)
+            valid = probs.sum(axis=1) > 0
+            fields = unpack_infoset_keys(np.asarray(columns.keys)[valid])
+            cells = pack_u64_array(**{d: fields[d] for d in dims})
+            visits = np.maximum(np.asarray(columns.visits, dtype=np.float64)[valid], 1.0)
+            probs = probs[valid]
+
+            parts = [(cells, np.ones(len(cells)), visits, probs * visits[:, None], probs)]
+            if cube is not None:
+                parts.append((cube.cells, cube.counts, cube.visits, cube.weighted_sum, cube.unweighted_sum))
+            cube = PolicyCube._aggregate(dims, *(np.concatenate(arrays) for arrays in zip(*parts)))
+
+        if cube is None:
+            raise ValueError(f"[CUBE] Aucun infoset lu dans {src_path}")
+        return cube
+
+    # -------------------------
+    # Requêtes
+    # -------------------------
+    def coords(self) -> Dict[str, np.ndarray]:
+        fields = unpack_infoset_keys(self.cells)
+        return {d: fields[d] for d in self.dims}
+
+    def marginal(self, by: Sequence[str], **where: int) -> Dict[str, np.ndarray]:
+        """
+        Marginales groupées par `by`, filtrées par `where` (ex. PHASE=0, ROLE=2).
+        Retourne les coordonnées des groupes, counts, visits, et les moyennes pondérée / simple [g, 5].
+        """
+        for d in list(by) + list(where):
+            if d not in self.dims:
+                raise ValueError(f"[CUBE] Dimension absente du cube: {d} (cube: {self.dims})")
+        coords = self.coords()
+        keep = np.ones(len(self), dtype=bool)
+        for d, value in where.items():
+            keep &= coords[d] == value
+
+        groups = pack_u64_array(**{d: coords[d][keep] for d in by}) if by else np.zeros(int(keep.sum()), np.uint64)
+        sub = PolicyCube._aggregate(list(by), groups, self.counts[keep], self.visits[keep],
+                                    self.weighted_sum[keep], self.unweighted_sum[keep])
+        result = sub.coords() if by else {}
+        result["counts"] = sub.counts
+        result["visits"] = sub.visits
+        result["weighted"] = sub.weighted_sum / np.maximum(sub.visits, 1e-12)[:, None]
+        result["unweighted"] = sub.unweighted_sum / np.maximum(sub.counts, 1)[:, None]
+        return result
+
+    def grid169(self, phase: int, role: int, weighted: bool = True) -> np.ndarray:
+        """Mix par main (169 x 5) pour une phase/position, toutes autres dimensions marginalisées."""
+        m = self.marginal(["HAND"], PHASE=phase, ROLE=role)
+        grid = np.zeros((169, len(ACTIONS)))
+        grid[m["HAND"]] = m["weighted" if weighted else "unweighted"]
+        return grid
+
+    # -------------------------
+    # Artefacts
+    # -------------------------
+    def save(self, path: str) -> None:
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, dims=np.array(self.dims), cells=self.cells, counts=self.counts,
+                            visits=self.visits, weighted_sum=self.weighted_sum,
+                            unweighted_sum=self.unweighted_sum, actions=np.array(ACTIONS))
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def load(path: str) -> "PolicyCube":
+        with np.load(path) as data:
+            return PolicyCube(data["dims"].tolist(), data["cells"], data["counts"], data["visits"],
+                              data["weighted_sum"], data["unweighted_sum"])
+
+    def save_json(self, path: str) -> None:
+        """JSON colonne par colonne pour l'UI (sommes arrondies, re-marginalisables côté navigateur)."""
+        coords = self.coords()
+        payload = {
+            "dims": self.dims,
+            "actions": ACTIONS,
+            "count": len(self),
+            **{d.lower(): coords[d].tolist() for d in self.dims},
+            "counts": self.counts.tolist(),
+            "visits": self.visits.round(3).tolist(),
+            "weighted_sum": self.weighted_sum.round(5).ravel().tolist(),
+            "unweighted_sum": self.unweighted_sum.round(5).ravel().tolist(),
+        }
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+
+def print_mix_by_phase(cube: PolicyCube, weighted: bool = False) -> None:
+    """Équivalent de stats_policy.mix_actions_by_phase (moyenne macro par défaut), lu depuis le cube."""
+    m = cube.marginal(["PHASE"])
+    for phase_id, mix, counts in zip(m["PHASE"].tolist(), m["weighted" if weighted else "unweighted"], m["counts"]):
+        print(f"\n== {ID_TO_PHASE.get(phase_id, phase_id)} == ({counts} infosets)")
+        for action, p in zip(ACTIONS, mix):
+            print(f"{action}: {100 * p:.2f}%")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cube de marginales d'actions (phase x rôle x main x board)")
+    parser.add_argument("src", help="avg_policy.json.gz ou .gtop")
+    parser.add_argument("--extra-dims", nargs="*", default=[], choices=EXTRA_DIMS)
+    parser.add_argument("--out", default="policy/policy_cube.npz")
+    parser.add_argument("--json", default=None, help="Export JSON pour l'UI (ex. ui/public/policy_cube.json)")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    policy_cube = PolicyCube.build(args.src, args.extra_dims, args.chunk_size)
+    policy_cube.save(args.out)
+    print(f"[CUBE] {len(policy_cube)} cellules {policy_cube.dims} en {time.perf_counter() - start:.1f}s -> {args.out}")
+    if args.json:
+        policy_cube.save_json(args.json)
+        print(f"[SAVE] {args.json} ({os.path.getsize(args.json) / 1e6:.2f} MB)")
+    print_mix_by_phase(policy_cube)
+    for role_id, role in enumerate(ROLE_LABELS):
+        m = policy_cube.marginal(["ROLE"], PHASE=0, ROLE=role_id)
+        if len(m["counts"]):
+            print(f"PREFLOP {role}: " + " ".join(f"{a}={100 * p:.1f}%" for a, p in zip(ACTIONS, m["weighted"][0])))
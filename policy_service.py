@@ -0,0 +1,362 @@
+# policy_service.py
+# ============================================================
+# Requêtes de policy par lots.
+#
+#   - BatchPolicy : API vectorisée. Entrées = états de jeu, tuples de features (champs de la clé)
+#     ou clés uint64 déjà packées. Sorties = matrice de probas [n, 5] (ordre ACTIONS) ou actions tirées.
+#     Packing des clés, recherche (np.searchsorted sur les clés triées), repli (policy_backoff) et
+#     normalisation sur les actions légales sont faits en numpy sur tout le lot.
+#   - Serveur local HTTP (TCP ou socket Unix) : les requêtes concurrentes sont regroupées
+#     (micro-batching) avant un seul appel BatchPolicy ; GET /stats donne les percentiles de latence.
+#
+# Protocole :
+#   POST /query  {"states": [{"key": u64} | {"features": [PHASE, ROLE, HAND, BOARD, POT, RATIO, SPR, HEROBOARD]},
+#                           + "legal": ["FOLD", ...] (optionnel)], "sample": false, "seed": 0}
+#             -> {"distributions": [{action: p}, ...]} ou {"actions": [...]}
+#   GET  /stats  -> requêtes, taille moyenne des lots, latences p50/p90/p99 (ms)
+#
+# Usage :
+#   python policy_service.py policy/avg_policy.gtop --port 8765 [--backoff]
+#   python policy_service.py policy/avg_policy.gtop --unix /tmp/gto_policy.sock
+# ============================================================
+
+from __future__ import annotations
+import argparse
+import gzip
+import json
+import os
+import socketserver
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from infoset import build_infoset_key_fast, pack_u64_array
+from policy import AveragePolicy
+from policy_backoff import BackoffIndex, LEVEL_MASKS, probs_from_columns
+from policy_binary import ACTIONS, PolicyColumns, columns_from_compact, is_policy_binary, read_policy_binary
+
+# Ordre des champs d'un tuple de features
+FEATURE_FIELDS = ["PHASE", "ROLE", "HAND", "BOARD", "POT", "RATIO", "SPR", "HEROBOARD"]
+_ACTION_INDEX = {action: i for i, action in enumerate(ACTIONS)}
+
+
+def pack_features(features) -> np.ndarray:
+    """int[n, 8] (ordre FEATURE_FIELDS) -> uint64[n] (même layout que infoset.pack_u64)."""
+    features = np.asarray(features, dtype=np.uint64).reshape(-1, len(FEATURE_FIELDS))
+    return pack_u64_array(**{field: features[:, column] for column, field in enumerate(FEATURE_FIELDS)})
+
+def legal_mask(legal_lists: Sequence[Optional[Sequence[str]]]) -> np.ndarray:
+    """Listes d'actions légales -> bool[n, 5]. None = toutes les actions."""
+    mask = np.zeros((len(legal_lists), len(ACTIONS)), dtype=bool)
+    for row, legal in enumerate(legal_lists):
+        if legal is None:
+            mask[row] = True
+        else:
+            mask[row, [_ACTION_INDEX[a] for a in legal]] = True
+    return mask
+
+
+class BatchPolicy:
+    """Table de policy en colonnes (clés triées + probas float32) interrogée par lots."""
+
+    def __init__(self, keys: np.ndarray, probs: np.ndarray,
+                 backoff: Optional[BackoffIndex] = None, seed: int = 123):
+        self.keys = np.asarray(keys, dtype=np.uint64)
+        self.probs = np.asarray(probs, dtype=np.float32)
+        self.backoff = backoff
+        self.rng = np.random.default_rng(seed)
+
+    @staticmethod
+    def from_columns(columns: PolicyColumns, backoff: bool = False, seed: int = 123) -> "BatchPolicy":
+        index = BackoffIndex.from_columns(columns) if backoff else None
+        return BatchPolicy(columns.keys, probs_from_columns(columns), index, seed)
+
+    @staticmethod
+    def from_policy(policy: AveragePolicy, seed: int = 123) -> "BatchPolicy":
+        """Depuis un AveragePolicy déjà chargé (réutilise son index de repli s'il existe)."""
+        table = policy.policy
+        columns = getattr(table, "columns", None)  # MappedPolicyTable
+        if columns is not None:
+            return BatchPolicy(columns.keys, probs_from_columns(columns), policy.backoff, seed)
+        keys = np.fromiter((int(k) for k in table), dtype=np.uint64, count=len(table))
+        probs = np.zeros((len(table), len(ACTIONS)), dtype=np.float32)
+        for row, dist in enumerate(table.values()):
+            for action, p in dist.items():
+                probs[row, _ACTION_INDEX[action]] = p
+        order = np.argsort(keys, kind="stable")
+        return BatchPolicy(keys[order], probs[order], policy.backoff, seed)
+
+    @staticmethod
+    def load(path: str, backoff: bool = False, seed: int = 123) -> "BatchPolicy":
+        if is_policy_binary(path):
+            return BatchPolicy.from_columns(read_policy_binary(path, mmap=True), backoff, seed)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            raw = json.load(f)
+        return BatchPolicy.from_columns(columns_from_compact(raw), backoff, seed)
+
+    # -------------------------
+    # Recherche
+    # -------------------------
+    @staticmethod
+    def _search(sorted_keys: np.ndarray, keys: np.ndarray) -> np.ndarray:
+        """Index de chaque clé dans `sorted_keys`, -1 si absente."""
+        if len(sorted_keys) == 0:
+            return np.full(len(keys), -1, dtype=np.int64)
+        idx = np.searchsorted(sorted_keys, keys)
+        clipped = np.minimum(idx, len(sorted_keys) - 1)
+        return np.where(sorted_keys[clipped] == keys, clipped, -1)
+
+    def distributions(self, keys, legal: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        uint64[n] (+ bool[n, 5] actions légales) -> float32[n, 5] normalisé sur les actions légales.
+        Clé absente : repli (si index) puis uniforme sur les actions légales.
+        """
+        keys = np.asarray(keys, dtype=np.uint64)
+        legal = np.ones((len(keys), len(ACTIONS)), dtype=bool) if legal is None else legal
+        rows = self._search(self.keys, keys)
+        found = rows >= 0
+        probs = np.zeros((len(keys), len(ACTIONS)), dtype=np.float32)
+        probs[found] = self.probs[rows[found]]
+        probs *= legal
+        pending = probs.sum(axis=1) <= 1e-12
+
+        if self.backoff is not None:
+            for level_mask, level_keys, level_probs in zip(
+                    LEVEL_MASKS, self.backoff.level_keys, self.backoff.level_probs):
+                if not pending.any():
+                    break
+                todo = np.flatnonzero(pending)
+                level_rows = self._search(level_keys, keys[todo] & np.uint64(level_mask))
+                hit = level_rows >= 0
+                candidate = level_probs[level_rows[hit]] * legal[todo[hit]]
+                ok = candidate.sum(axis=1) > 1e-12
+                probs[todo[hit][ok]] = candidate[ok]
+                pending[todo[hit][ok]] = False
+
+        probs[pending] = legal[pending]  # uniforme sur les actions légales
+        totals = probs.sum(axis=1, keepdims=True)
+        np.divide(probs, totals, out=probs, where=totals > 0)
+        return probs
+
+    def sample(self, probs: np.ndarray, rng: Optional[np.random.Generator] = None) -> List[str]:
+        """Un tirage par ligne (cumsum + comparaison vectorisée)."""
+        rng = rng or self.rng
+        cumulative = np.cumsum(probs, axis=1)
+        draws = rng.random(len(probs))[:, None] * cumulative[:, -1:]
+        picks = (cumulative <= draws).sum(axis=1)
+        picks = np.minimum(picks, len(ACTIONS) - 1)
+        return [ACTIONS[i] for i in picks.tolist()]
+
+    # -------------------------
+    # Entrées haut niveau
+    # -------------------------
+    def distributions_for_features(self, features, legal_lists=None) -> np.ndarray:
+        keys = pack_features(features)
+        legal = None if legal_lists is None else legal_mask(legal_lists)
+        return self.distributions(keys, legal)
+
+    def distributions_for_games(self, games) -> np.ndarray:
+        keys = np.fromiter((build_infoset_key_fast(g, g.players[g.current_role]) for g in games),
+                           dtype=np.uint64, count=len(games))
+        legal = legal_mask([AveragePolicy.legal_actions(g) for g in games])
+        return self.distributions(keys, legal)
+
+    def act_batch(self, games) -> List[str]:
+        return self.sample(self.distributions_for_games(games))
+
+
+# -------------------------
+# Micro-batching + statistiques
+# -------------------------
+class _Pending:
+    __slots__ = ("keys", "legal", "event", "result")
+
+    def __init__(self, keys: np.ndarray, legal: np.ndarray):
+        self.keys = keys
+        self.legal = legal
+        self.event = threading.Event()
+        self.result: Optional[np.ndarray] = None
+
+
+class MicroBatcher:
+    """Regroupe les requêtes arrivées pendant `max_wait_ms` (ou jusqu'à `max_batch` états) en un seul lot."""
+
+    def __init__(self, policy: BatchPolicy, max_batch: int = 4096, max_wait_ms: float = 1.0,
+                 history: int = 10_000):
+        self.policy = policy
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1e3
+        self.queue: deque = deque()
+        self.cond = threading.Condition()
+        self.latencies_ms: deque = deque(maxlen=history)
+        self.batch_sizes: deque = deque(maxlen=history)
+        self.requests = 0
+        self.states = 0
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, keys: np.ndarray, legal: np.ndarray) -> np.ndarray:
+        start = time.perf_counter()
+        item = _Pending(keys, legal)
+        with self.cond:
+            self.queue.append(item)
+            self.cond.notify()
+        item.event.wait()
+        self.latencies_ms.append(1e3 * (time.perf_counter() - start))
+        return item.result
+
+    def _loop(self) -> None:
+        while True:
+            with self.cond:
+                while not self.queue:
+                    self.cond.wait()
+            deadline = time.perf_counter() + self.max_wait
+            batch, size = [], 0
+            while size < self.max_batch:
+                with self.cond:
+                    if self.queue:
+                        item = self.queue.popleft()
+                        batch.append(item)
+                        size += len(item.keys)
+                        continue
+                    remaining = deadline - time.perf_counter()
+                    if remaining <= 0:
+                        break
+                    self.cond.wait(remaining)
+
+            keys = np.concatenate([item.keys for item in batch])
+            legal = np.concatenate([item.legal for item in batch])
+            try:
+                probs = self.policy.distributions(keys, legal)
+            except Exception:
+                probs = None  # le handler répond 500
+            offset = 0
+            for item in batch:
+                n = len(item.keys)
+                item.result = None if probs is None else probs[offset:offset + n]
+                offset += n
+                item.event.set()
+            self.batch_sizes.append(size)
+            self.requests += len(batch)
+            self.states += size
+
+    def stats(self) -> Dict[str, float]:
+        latencies = np.asarray(self.latencies_ms, dtype=np.float64)
+        sizes = np.asarray(self.batch_sizes, dtype=np.float64)
+        report = {"requests": self.requests, "states": self.states,
+                  "mean_batch_states": float(sizes.mean()) if len(sizes) else 0.0}
+        for q in (50, 90, 99):
+            report[f"p{q}_ms"] = float(np.percentile(latencies, q)) if len(latencies) else 0.0
+        return report
+
+
+# -------------------------
+# Serveur HTTP
+# -------------------------
+def parse_states(states: List[Dict]) -> tuple[np.ndarray, np.ndarray]:
+    keys = np.empty(len(states), dtype=np.uint64)
+    features_rows, features_at = [], []
+    for row, state in enumerate(states):
+        if "key" in state:
+            key = int(state["key"])
+            if not 0 <= key < 1 << 64:
+                raise ValueError(f"key hors de [0, 2**64): {key}")
+            keys[row] = key
+        else:
+            features_rows.append(state["features"])
+            features_at.append(row)
+    if features_rows:
+        keys[features_at] = pack_features(features_rows)
+    return keys, legal_mask([state.get("legal") for state in states])
+
+class PolicyRequestHandler(BaseHTTPRequestHandler):
+    batcher: MicroBatcher  # injecté par make_server
+
+    def _reply(self, code: int, payload: Dict) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/stats":
+            self._reply(200, self.batcher.stats())
+        else:
+            self._reply(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        if self.path != "/query":
+            self._reply(404, {"error": f"unknown path {self.path}"})
+            return
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+            keys, legal = parse_states(request["states"])
+        except (ValueError, KeyError, TypeError, OverflowError) as e:
+            self._reply(400, {"error": f"bad request: {e}"})
+            return
+
+        probs = self.batcher.submit(keys, legal)
+        if probs is None:
+            self._reply(500, {"error": "policy lookup failed"})
+        elif request.get("sample"):
+            rng = np.random.default_rng(request.get("seed"))
+            self._reply(200, {"actions": self.batcher.policy.sample(probs, rng)})
+        else:
+            self._reply(200, {"distributions": [
+                {ACTIONS[i]: p for i, p in enumerate(row) if legal_row[i]}
+                for row, legal_row in zip(probs.tolist(), legal.tolist())]})
+
+    def log_message(self, format, *args):
+        pass  # pas de log par requête
+
+
+class PolicyHTTPServer(ThreadingHTTPServer):
+    request_queue_size = 256  # beaucoup de clients concurrents (défaut socketserver : 5)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+    def get_request(self):
+        request, _ = super().get_request()
+        return request, ("unix", 0)  # BaseHTTPRequestHandler attend (host, port)
+
+
+def make_server(policy: BatchPolicy, host: str = "127.0.0.1", port: int = 8765,
+                unix_path: Optional[str] = None, max_batch: int = 4096, max_wait_ms: float = 1.0):
+    handler = type("Handler", (PolicyRequestHandler,),
+                   {"batcher": MicroBatcher(policy, max_batch, max_wait_ms)})
+    if unix_path:
+        if os.path.exists(unix_path):
+            os.remove(unix_path)
+        return ThreadingUnixHTTPServer(unix_path, handler)
+    return PolicyHTTPServer((host, port), handler)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serveur local de requêtes policy par lots")
+    parser.add_argument("policy", help="avg_policy.json.gz ou .gtop")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--unix", default=None, help="Chemin de socket Unix (remplace host/port)")
+    parser.add_argument("--backoff", action="store_true", help="Repli sur abstraction plus grossière")
+    parser.add_argument("--max-batch", type=int, default=4096, help="États max par lot")
+    parser.add_argument("--max-wait-ms", type=float, default=1.0, help="Fenêtre de regroupement")
+    args = parser.parse_args()
+
+    batch_policy = BatchPolicy.load(args.policy, backoff=args.backoff)
+    server = make_server(batch_policy, args.host, args.port, args.unix, args.max_batch, args.max_wait_ms)
+    where = args.unix or f"http://{args.host}:{args.port}"
+    print(f"[SERVE] {len(batch_policy.keys)} infosets sur {where} (POST /query, GET /stats)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
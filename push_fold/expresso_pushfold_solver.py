@@ -29,17 +29,19 @@ from classes import (
 
 from utils import rank7, save_ranges_json, load_ranges_json
 
-from push_fold.visualisation_push_fold import visualise_ranges
-
 # ==== Précompute pour filtrage et comptage rapide ====
 ALL_COMBOS_SET: Set[Tuple[int,int]] = set(ALL_COMBOS)  # Ensemble de tous les combos possibles
-COMBOS_BY_CARD: Dict[int, frozenset[Tuple[int,int]]] = {}  # Dictionnaire carte -> combos contenant cette carte
-for card in range(52):  # Pour chaque carte du deck
-    list_of_combos_with_card = []  # Liste des combos contenant la carte
-    for card_1,card_2 in ALL_COMBOS:  # Pour chaque combo possible
-        if card_1 == card or card_2 == card:  # Si la carte est dans le combo
-            list_of_combos_with_card.append((card_1,card_2))  # Ajouter le combo à la liste
-    COMBOS_BY_CARD[card] = frozenset((min(card_1,card_2), max(card_1,card_2)) for card_1,card_2 in list_of_combos_with_card)  # Ensemble des combos contenant la carte
+
+def _combos_by_card() -> Dict[int, frozenset[Tuple[int,int]]]:  # Dictionnaire carte -> combos contenant cette carte
+    # un seul passage sur les 1326 combos (chaque combo est rangé sous ses 2 cartes) au lieu de 52 x 1326
+    buckets: Dict[int, List[Tuple[int,int]]] = {card: [] for card in range(52)}
+    for card_1, card_2 in ALL_COMBOS:
+        combo = (min(card_1, card_2), max(card_1, card_2))
+        buckets[card_1].append(combo)
+        buckets[card_2].append(combo)
+    return {card: frozenset(combos) for card, combos in buckets.items()}
+
+COMBOS_BY_CARD: Dict[int, frozenset[Tuple[int,int]]] = _combos_by_card()
 
 TOTAL_COMBOS_NO_BLOCKERS = 1225  # C(50,2) = 1225 combos sans blockers
 
@@ -503,7 +505,8 @@ class SpinGoPushFoldSolver:
             "BB_call_vs_SB": self.BB_call_vs_SB
         }
 
-        # Visualisations
+        # Visualisations (seaborn / matplotlib importés seulement ici)
+        from push_fold.visualisation_push_fold import visualise_ranges
         visualise_ranges(ranges_data, self.coverage_pct, iter_num, self.evolution_data)
 
         # Sauvegarde des ranges
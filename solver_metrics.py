@@ -0,0 +1,180 @@
+# solver_metrics.py
+# ============================================================
+# Instrumentation à faible coût de CFRPlusSolver.train :
+#   - SolverCounters : compteurs entiers incrémentés dans les traversées (noeuds, noeuds hero,
+#     rollouts, showdowns) ; les nouveaux infosets sont lus sur la taille de regret_sum.
+#   - StackSampler   : thread qui échantillonne la pile du thread d'entraînement toutes les
+#     `interval` secondes (aucun coût dans la boucle chaude) et range chaque échantillon dans
+#     une catégorie (construction de clé, pas de jeu, mise à jour des regrets, autre).
+#     Avec `collect_stacks`, il garde aussi les piles complètes au format "collapsed"
+#     (une ligne `f1;f2;f3 n`, comme py-spy --format raw) lisible par flamegraph.pl / speedscope.
+#   - MetricsLogger  : fenêtre périodique -> postfix tqdm + une ligne JSON par période (fichier
+#     réécrit à chaque run ; chaque ligne porte la graine et l'heure de début du run).
+# ============================================================
+
+from __future__ import annotations
+import json
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, Optional
+
+# Fonction (co_name) -> catégorie ; le cadre le plus interne reconnu l'emporte
+SAMPLE_CATEGORIES = {
+    "build_infoset_key_fast": "key",
+    "strategy_from_regret": "regret",
+    "update_hero_node": "regret",
+    "discount_regrets": "regret",
+    "process_action": "step",
+    "update_available_actions": "step",
+    "handle_showdown": "step",
+    "snapshot": "step",
+    "restore": "step",
+    "new_game": "step",
+}
+CATEGORIES = ("key", "step", "regret", "other")
+
+
+class SolverCounters:
+    """Compteurs cumulés depuis la création du solveur (attributs à slots : += sans dict)."""
+    __slots__ = ("nodes", "hero_nodes", "rollouts", "showdowns")
+
+    def __init__(self):
+        self.nodes = 0        # décisions traversées (hero, adversaires, rollouts)
+        self.hero_nodes = 0   # mises à jour de regrets (update_hero_node)
+        self.rollouts = 0     # rollouts jusqu'au terminal (es-rollout)
+        self.showdowns = 0    # états terminaux atteints (phase SHOWDOWN, fold compris)
+
+    def as_dict(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class StackSampler:
+    """Échantillonneur de pile du thread `thread_id` (défaut : thread appelant), dans un thread démon."""
+
+    def __init__(self, interval: float = 0.01, collect_stacks: bool = False, thread_id: Optional[int] = None):
+        self.interval = interval
+        self.collect_stacks = collect_stacks
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.categories: Counter = Counter()
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self) -> "StackSampler":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            category = None
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                if category is None:
+                    category = SAMPLE_CATEGORIES.get(code.co_name)
+                if self.collect_stacks:
+                    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                elif category is not None:
+                    break
+                frame = frame.f_back
+            self.categories[category or "other"] += 1
+            if self.collect_stacks:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def write_collapsed(self, path: str) -> None:
+        """Piles au format collapsed (flamegraph.pl, speedscope, inferno)."""
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class MetricsLogger:
+    """
+    Agrège compteurs, taille de table et échantillons par fenêtre de `every` secondes :
+    `update(iteration)` est appelé à chaque itération mais ne fait qu'une comparaison d'horloge
+    hors fin de fenêtre. Retourne le postfix tqdm de la fenêtre close (sinon None).
+    """
+
+    def __init__(self, solver, sampler: Optional[StackSampler], path: Optional[str] = None, every: float = 30.0):
+        self.solver = solver
+        self.sampler = sampler
+        self.path = path
+        self.every = every
+        self.start = time.perf_counter()
+        self.run = {"seed": getattr(solver, "seed", None), "started": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        self._file = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._file = open(path, "w", encoding="utf-8")
+        self._reset_window(self.start, solver.iteration)
+
+    def _reset_window(self, now: float, iteration: int) -> None:
+        self.window_start = now
+        self.next_flush = now + self.every
+        self.window_iteration = iteration
+        self.window_counters = self.solver.counters.as_dict()
+        self.window_infosets = len(self.solver.regret_sum)
+        self.window_samples = Counter(self.sampler.categories) if self.sampler else Counter()
+
+    def update(self, iteration: int) -> Optional[Dict[str, str]]:
+        now = time.perf_counter()
+        if now < self.next_flush:
+            return None
+        return self.flush(iteration, now)
+
+    def flush(self, iteration: int, now: Optional[float] = None) -> Dict[str, str]:
+        now = now or time.perf_counter()
+        seconds = max(now - self.window_start, 1e-9)
+        counters = self.solver.counters.as_dict()
+        delta = {name: value - self.window_counters[name] for name, value in counters.items()}
+        infosets = len(self.solver.regret_sum)
+        new_infosets = infosets - self.window_infosets
+        samples = (Counter(self.sampler.categories) - self.window_samples) if self.sampler else Counter()
+        total_samples = sum(samples.values())
+
+        record = {
+            **self.run,
+            "elapsed_s": round(now - self.start, 3),
+            "iteration": iteration,
+            "window_s": round(seconds, 3),
+            "it_per_s": (iteration - self.window_iteration) / seconds,
+            "nodes_per_s": delta["nodes"] / seconds,
+            "window": dict(delta, new_infosets=new_infosets),
+            "totals": counters,
+            "infosets": infosets,
+            "infosets_per_s": new_infosets / seconds,
+            "time_share": {c: samples[c] / total_samples for c in CATEGORIES} if total_samples else {},
+            "samples": total_samples,
+        }
+        if getattr(self.solver, "table", None) is not None:
+            record["table"] = self.solver.table.stats()
+        if self._file:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+        self._reset_window(now, iteration)
+
+        postfix = {
+            "nodes/s": f"{record['nodes_per_s']:.0f}",
+            "infosets": f"{infosets}",
+            "+inf/s": f"{record['infosets_per_s']:.0f}",
+        }
+        if total_samples:
+            postfix["key/step/regret"] = "/".join(f"{100 * record['time_share'][c]:.0f}"
+                                                  for c in ("key", "step", "regret")) + "%"
+        return postfix
+
+    def close(self) -> None:
+        if self._file:
+            self._file.close()
+            self._file = None
@@ -1,12 +1,19 @@
 # stats_policy.py
 from __future__ import annotations
-import json
 import gzip
-from typing import Dict
-from infoset import unpack_infoset_key_dense
+import os
+import re
+import time
+from typing import TYPE_CHECKING, Dict, Iterator, Optional
+import numpy as np
+from infoset import unpack_infoset_keys
 from infoset import _LABELS_169
-import pandas as pd 
-from tqdm import tqdm
+from policy_binary import PolicyColumns, DEFAULT_TOP_K, is_policy_binary, read_policy_binary
+from policy_backoff import probs_from_columns
+
+# pandas / tqdm (~300 ms) importés à l'usage : cfr_solver et ml/dataset n'en ont pas besoin
+if TYPE_CHECKING:
+    import pandas as pd
 
 def _decode_compact_entry(entry) -> Dict[str, float]:
     # si c'est l'ancien format (liste brute)
@@ -59,9 +66,10 @@ def mix_actions_by_phase(policy_json):
     mix = {ph:{a:0.0 for a in ACTIONS} for ph in phases}
     count = {ph:0 for ph in phases}
 
-    for k, dist in policy_json.items():
-        f = unpack_infoset_key_dense(int(k))
-        ph = ID_TO_PHASE.get(f["PHASE"], str(f["PHASE"]))
+    phase_ids = unpack_infoset_keys(np.fromiter((int(k) for k in policy_json), dtype=np.uint64,
+                                                count=len(policy_json)))["PHASE"].tolist()
+    for phase_id, dist in zip(phase_ids, policy_json.values()):
+        ph = ID_TO_PHASE.get(phase_id, str(phase_id))
         if ph not in mix: 
             raise ValueError(f"[MIX] Phase not in mix: {ph}")
 
@@ -87,32 +95,155 @@ def mix_actions_by_phase(policy_json):
 
 
 def build_dataframe(policy_json):
+    import pandas as pd
+    from tqdm import tqdm
     # Collect all data in a list first for much better performance
     data_rows = []
-    
-    for k in tqdm(policy_json.keys()):
-        unpacked_key = unpack_infoset_key_dense(int(k))
-        decoded = _decode_fields(int(k), unpacked_key, policy_json[k][0], policy_json[k][1]) # Pass policy_dist here
+    keys = [int(k) for k in policy_json]
+    unpacked = unpack_infoset_keys(np.array(keys, dtype=np.uint64))
+    columns = {field: values.tolist() for field, values in unpacked.items()}
+
+    for row, k in enumerate(tqdm(policy_json.keys())):
+        unpacked_key = {field: values[row] for field, values in columns.items()}
+        decoded = _decode_fields(keys[row], unpacked_key, policy_json[k][0], policy_json[k][1]) # Pass policy_dist here
         data_rows.append(decoded)
     
     # Create DataFrame from all collected data at once
     df = pd.DataFrame(data_rows)
     return df
 
-def extraction_policy_data(src_path="policy/avg_policy.json.gz"):
-    with gzip.open(src_path, "rt", encoding="utf-8") as f:
-        raw = json.load(f)
-
-    policy_json = {}
-    for idx, (k, v) in enumerate(raw.items()):
-        distribution, visits = _decode_compact_entry(v)
-        policy_json[k] = [distribution, visits]
-        
-        if idx < 10:
-            print(f"{k}: [{distribution} / {visits}]")
+# ============================================================
+# --- Export en flux (CSV / Parquet), mémoire constante
+# ============================================================
+
+EXPORT_CHUNK = 1_000_000
+_KEY_FIELDS = ["PHASE", "ROLE", "HAND", "BOARD", "POT", "RATIO", "SPR", "HEROBOARD"]
+_LABELLED = {"PHASE": [ID_TO_PHASE[i] for i in range(len(ID_TO_PHASE))],
+             "ROLE": ROLE_LABELS,
+             "HAND": _LABELS_169}
+
+# Entrée du JSON compact : "key":{"policy":[mask,q...],"visits":n} ou "key":[mask,q...]
+_ENTRY_RE = re.compile(
+    r'"(\d+)"\s*:\s*(?:\{\s*"policy"\s*:\s*)?\[([\d,\s]*)\](?:\s*,\s*"visits"\s*:\s*(\d+)\s*\})?')
+_ENTRY_MAX_LEN = 128  # une entrée tronquée en fin de bloc est relue avec le bloc suivant
+
+def iter_policy_chunks(src_path: str, chunk_size: int = EXPORT_CHUNK,
+                       block_size: int = 1 << 22) -> Iterator[PolicyColumns]:
+    """
+    Colonnes (keys, masks, q, visits) par blocs de `chunk_size` infosets, sans charger la policy entière.
+    .gtop : tranches du memmap ; .json.gz : lecture gzip par blocs + regex (aucun dict intermédiaire).
+    """
+    if is_policy_binary(src_path):
+        columns = read_policy_binary(src_path, mmap=True)
+        for start in range(0, len(columns), chunk_size):
+            yield PolicyColumns(*(column[start:start + chunk_size] for column in columns))
+        return
+
+    keys, encoded, visits = [], [], []
+
+    def flush() -> PolicyColumns:
+        n = len(keys)
+        q = np.zeros((n, DEFAULT_TOP_K), dtype=np.uint8)
+        masks = np.empty(n, dtype=np.uint8)
+        for row, values in enumerate(encoded):
+            ints = [int(v) for v in values.split(",")]
+            masks[row] = ints[0]
+            q[row, :len(ints) - 1] = ints[1:1 + DEFAULT_TOP_K]
+        return PolicyColumns(np.array(keys, dtype=np.uint64), masks, q,
+                             np.minimum(np.array(visits, dtype=np.int64), 65535).astype(np.uint16))
 
-    df = build_dataframe(policy_json)
-    df.to_csv("policy/avg_policy.csv", index=False)
+    with gzip.open(src_path, "rt", encoding="utf-8") as f:
+        tail = ""
+        while True:
+            block = f.read(block_size)
+            buffer = tail + block
+            limit = len(buffer) if not block else len(buffer) - _ENTRY_MAX_LEN
+            consumed = 0
+            for match in _ENTRY_RE.finditer(buffer):
+                if match.end() > limit:
+                    break
+                keys.append(int(match.group(1)))
+                encoded.append(match.group(2))
+                visits.append(int(match.group(3) or 1))
+                consumed = match.end()
+                if len(keys) >= chunk_size:
+                    yield flush()
+                    keys, encoded, visits = [], [], []
+            tail = buffer[consumed:]
+            if not block:
+                break
+    if keys:
+        yield flush()
+
+def decode_policy_chunk(columns: PolicyColumns) -> pd.DataFrame:
+    """Décodage vectorisé des clés (opérations bit à bit) en colonnes typées."""
+    import pandas as pd
+    keys = np.asarray(columns.keys, dtype=np.uint64)
+    data = {"KEY": keys}
+    unpacked = unpack_infoset_keys(keys)
+    for field in _KEY_FIELDS:
+        values = unpacked[field]
+        if field in _LABELLED:
+            # catégoriel : codes uint8 + libellés (PREFLOP, BTN, AKs...) comme l'ancien CSV
+            data[field] = pd.Categorical.from_codes(values, categories=_LABELLED[field])
+        else:
+            data[field] = values
+    data["VISITS"] = np.asarray(columns.visits).astype(np.uint16)
+    probs = probs_from_columns(columns)
+    for action_index, action in enumerate(ACTIONS):
+        data[f"PROB_{action}"] = probs[:, action_index]
+    return pd.DataFrame(data)
+
+def export_policy_table(src_path: str = "policy/avg_policy.json.gz", dst_path: str = "policy/avg_policy.csv",
+                        chunk_size: int = EXPORT_CHUNK, fmt: Optional[str] = None) -> int:
+    """
+    Export en flux vers CSV ou Parquet (selon l'extension ou `fmt`), un bloc de `chunk_size` infosets
+    à la fois. Parquet nécessite pyarrow. Retourne le nombre de lignes écrites.
+    """
+    fmt = fmt or ("parquet" if dst_path.endswith(".parquet") else "csv")
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"[EXPORT] Format inconnu: {fmt}")
+    from tqdm import tqdm
+
+    tmp_path = dst_path + ".tmp"
+    writer = None
+    rows = 0
+    start = time.perf_counter()
+    try:
+        for columns in tqdm(iter_policy_chunks(src_path, chunk_size), desc="Export", unit="chunk"):
+            df = decode_policy_chunk(columns)
+            if fmt == "csv":
+                # arrondi en float64 : bien plus rapide à formater que float_format
+                for action in ACTIONS:
+                    df[f"PROB_{action}"] = np.round(df[f"PROB_{action}"].to_numpy(np.float64), 6)
+                df.to_csv(tmp_path, mode="a" if rows else "w", header=not rows, index=False)
+            else:
+                import pyarrow as pa  # dépendance optionnelle
+                import pyarrow.parquet as pq
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp_path, table.schema, compression="zstd")
+                writer.write_table(table)
+            rows += len(df)
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if rows == 0:
+        raise ValueError(f"[EXPORT] Aucun infoset lu dans {src_path}")
+    os.replace(tmp_path, dst_path)
+    elapsed = time.perf_counter() - start
+    print(f"[EXPORT] {dst_path} : {rows} infosets en {elapsed:.1f}s ({rows / max(elapsed, 1e-9):.0f}/s)")
+    return rows
+
+def extraction_policy_data(src_path="policy/avg_policy.json.gz", dst_path="policy/avg_policy.csv"):
+    export_policy_table(src_path, dst_path)
 
 if __name__ == "__main__":
-    extraction_policy_data()
\ No newline at end of file
+    import argparse
+    parser = argparse.ArgumentParser(description="Export de la policy (CSV / Parquet) en flux")
+    parser.add_argument("src", nargs="?", default="policy/avg_policy.json.gz", help="avg_policy.json.gz ou .gtop")
+    parser.add_argument("dst", nargs="?", default="policy/avg_policy.csv", help=".csv ou .parquet")
+    parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK)
+    args = parser.parse_args()
+    export_policy_table(args.src, args.dst, args.chunk_size)
\ No newline at end of file
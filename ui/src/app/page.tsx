@@ -7,6 +7,8 @@ import { Tabs, TabsList, TabsTrigger } from "@/components/ui/tabs";
 import { Card, CardContent, CardHeader, CardTitle, CardDescription } from "@/components/ui/card";
 import { ROLES, PHASES, ACTIONS, normalize, type GridMix, calculateWeightedStats, calculatePhaseStats } from "@/lib/policy";
 import { unpackInfosetKeyDense } from "@/lib/infoset";
+import { parsePolicyBinary, binaryToPolicy } from "@/lib/policyBinary";
+import { type PolicyCube, cubeGridMixes, cubePhaseStats } from "@/lib/policyCube";
 import { Label } from "@/components/ui/label";
 import { Select, SelectContent, SelectItem, SelectTrigger, SelectValue } from "@/components/ui/select";
 import Grid169 from "@/components/Grid169";
@@ -48,14 +50,29 @@ function decodeCompact(entry: {policy:number[], visits:number}): Record<string,
 
 export default function Page() {
   const [policy, setPolicy] = useState<Policy | null>(null);
+  const [cube, setCube] = useState<PolicyCube | null>(null);
   const [phaseIdx, setPhaseIdx] = useState<number>(0);
   const [roleIdx, setRoleIdx] = useState<number>(0);
   const [heatmapMode, setHeatmapMode] = useState<"action" | "visits" | false>(false);
   const [detailedMode, setDetailedMode] = useState(false);
   const [mainTab, setMainTab] = useState<"overview"|"case"|"test">("overview");
   
+  useEffect(() => {
+    // Cube de marginales pré-calculé (python policy_cube.py ... --json ui/public/policy_cube.json)
+    fetch("/policy_cube.json")
+      .then(res => res.ok ? res.json() : null)
+      .then(setCube)
+      .catch(() => setCube(null));
+  }, []);
+
   useEffect(() => {
     (async () => {
+      // Format binaire si disponible (python policy_binary.py to-bin ... ui/public/avg_policy.gtop)
+      const bin = await fetch("/avg_policy.gtop");
+      if (bin.ok) {
+        setPolicy(binaryToPolicy(parsePolicyBinary(await bin.arrayBuffer())));
+        return;
+      }
       const res = await fetch("/avg_policy.json.gz");
       const buf = await res.arrayBuffer();
       const jsonText = new TextDecoder("utf-8").decode(inflate(new Uint8Array(buf)));
@@ -73,6 +90,8 @@ export default function Page() {
   
 
   const { gridMixes, visitCounts }: { gridMixes: GridMix[]; visitCounts: number[] } = useMemo(() => {
+    if (cube) return cubeGridMixes(cube, phaseIdx, roleIdx);
+
     const sums: GridMix[] = Array.from({length:169}, () =>
       Object.fromEntries(ACTIONS.map(a=>[a,0])) as GridMix
     );
@@ -99,10 +118,10 @@ export default function Page() {
     });
 
     return { gridMixes, visitCounts: totalVisits };
-  }, [policy, phaseIdx, roleIdx]);
+  }, [cube, policy, phaseIdx, roleIdx]);
 
   const weightedStats = useMemo(() => calculateWeightedStats(visitCounts), [visitCounts]);
-  const phaseStats = useMemo(() => calculatePhaseStats(policy), [policy]);
+  const phaseStats = useMemo(() => cube ? cubePhaseStats(cube) : calculatePhaseStats(policy), [cube, policy]);
 
   return (
     <SidebarProvider>
@@ -199,7 +218,7 @@ export default function Page() {
                 </div>
               </CardHeader>
               <CardContent>
-                {!policy ? <div className="text-muted-foreground">Chargement de <code>avg_policy.json.gz</code>…</div> : (
+                {!policy && !cube ? <div className="text-muted-foreground">Chargement de <code>avg_policy.json.gz</code>…</div> : (
                   <>
                     <Legend heatmapMode={heatmapMode} detailed={detailedMode} />
                     <div className="mt-1">
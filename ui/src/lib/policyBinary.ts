@@ -0,0 +1,81 @@
+// ui/src/lib/policyBinary.ts
+// Lecture du format binaire .gtop (voir policy_binary.py) depuis un seul ArrayBuffer.
+// [ header 32o | keys u64[n] | masks u8[n] | q u8[n*topK] | visits u8[n] ]
+import { inflate } from "pako";
+import type { Policy } from "./policy";
+
+const MAGIC = "GTOP";
+const VERSION = 1;
+const HEADER_SIZE = 32;
+const ACTIONS = ["FOLD","CHECK","CALL","RAISE","ALL-IN"] as const;
+
+export type BinaryPolicy = {
+  count: number;
+  topK: number;
+  keys: BigUint64Array;   // triées
+  masks: Uint8Array;
+  q: Uint8Array;          // n * topK
+  visits: Uint8Array;
+};
+
+export function parsePolicyBinary(input: ArrayBuffer): BinaryPolicy {
+  let bytes = new Uint8Array(input);
+  // Encapsulation gzip optionnelle (zstd non supporté côté navigateur)
+  if (bytes[0] === 0x1f && bytes[1] === 0x8b) bytes = inflate(bytes);
+  // BigUint64Array exige un offset multiple de 8
+  if (bytes.byteOffset % 8 !== 0) bytes = bytes.slice();
+
+  const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+  const magic = String.fromCharCode(bytes[0], bytes[1], bytes[2], bytes[3]);
+  if (magic !== MAGIC) throw new Error(`[GTOP] Magic invalide: ${magic}`);
+  const version = view.getUint16(4, true);
+  if (version !== VERSION) throw new Error(`[GTOP] Version non supportée: ${version}`);
+  const topK = view.getUint8(6);
+  const count = Number(view.getBigUint64(8, true));
+
+  let offset = bytes.byteOffset + HEADER_SIZE;
+  const keys = new BigUint64Array(bytes.buffer, offset, count);
+  offset += 8 * count;
+  const masks = new Uint8Array(bytes.buffer, offset, count);
+  offset += count;
+  const q = new Uint8Array(bytes.buffer, offset, count * topK);
+  offset += count * topK;
+  const visits = new Uint8Array(bytes.buffer, offset, count);
+
+  return { count, topK, keys, masks, q, visits };
+}
+
+// Recherche dichotomique, -1 si absente
+export function lookupIndex(p: BinaryPolicy, key: bigint): number {
+  let lo = 0, hi = p.count - 1;
+  while (lo <= hi) {
+    const mid = (lo + hi) >>> 1;
+    const k = p.keys[mid];
+    if (k === key) return mid;
+    if (k < key) lo = mid + 1; else hi = mid - 1;
+  }
+  return -1;
+}
+
+export function decodeEntry(p: BinaryPolicy, i: number): Record<string, number> {
+  const mask = p.masks[i];
+  const base = i * p.topK;
+  let total = 0;
+  for (let j = 0; j < p.topK; j++) total += p.q[base + j];
+  if (!mask || total <= 0) return {};
+  const dist: Record<string, number> = {};
+  let qi = 0;
+  for (let a = 0; a < ACTIONS.length; a++) {
+    if ((mask >> a) & 1) dist[ACTIONS[a]] = p.q[base + qi++] / total;
+  }
+  return dist;
+}
+
+// Conversion vers la structure Policy utilisée par les composants existants
+export function binaryToPolicy(p: BinaryPolicy): Policy {
+  const policy: Policy = {};
+  for (let i = 0; i < p.count; i++) {
+    policy[p.keys[i].toString()] = { dist: decodeEntry(p, i), visits: p.visits[i] };
+  }
+  return policy;
+}
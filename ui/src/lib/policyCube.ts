@@ -0,0 +1,69 @@
+// ui/src/lib/policyCube.ts
+// Cube de marginales pré-calculé (python policy_cube.py ... --json ui/public/policy_cube.json).
+// Une cellule par (phase, rôle, main, board[, pot, ratio, spr]) avec des sommes additives :
+// la grille 13x13 d'une phase/position se lit sans parcourir la policy complète.
+import {
+  ACTIONS, PHASES, type GridMix, type VisitCounts, calculateWeightedStats,
+} from "./policy";
+
+export type PolicyCube = {
+  dims: string[];
+  actions: string[];        // ordre des colonnes de weighted_sum / unweighted_sum
+  count: number;
+  phase: number[];
+  role: number[];
+  hand: number[];
+  board: number[];
+  counts: number[];
+  visits: number[];
+  weighted_sum: number[];   // count * actions.length
+  unweighted_sum: number[];
+};
+
+const emptyMix = () => Object.fromEntries(ACTIONS.map(a => [a, 0])) as GridMix;
+
+// Mix par main (pondéré par visites) + visites par main, autres dimensions marginalisées
+export function cubeGridMixes(cube: PolicyCube, phaseIdx: number, roleIdx: number):
+  { gridMixes: GridMix[]; visitCounts: VisitCounts } {
+  const nA = cube.actions.length;
+  const sums = Array.from({ length: 169 }, () => new Array<number>(nA).fill(0));
+  const visitCounts = Array(169).fill(0);
+
+  for (let i = 0; i < cube.count; i++) {
+    if (cube.phase[i] !== phaseIdx || cube.role[i] !== roleIdx) continue;
+    const h = cube.hand[i];
+    if (h < 0 || h >= 169) continue;
+    for (let a = 0; a < nA; a++) sums[h][a] += cube.weighted_sum[i * nA + a];
+    visitCounts[h] += cube.visits[i];
+  }
+
+  const gridMixes = sums.map((tot, h) => {
+    const mix = emptyMix();
+    const total = tot.reduce((acc, v) => acc + v, 0);
+    if (visitCounts[h] <= 0 || total <= 0) return mix;
+    cube.actions.forEach((name, a) => {
+      if (name in mix) mix[name as keyof GridMix] = tot[a] / total;
+    });
+    return mix;
+  });
+
+  return { gridMixes, visitCounts };
+}
+
+// Même sortie que calculatePhaseStats(policy), depuis le cube
+export function cubePhaseStats(cube: PolicyCube):
+  Record<string, { totalVisits: number; avgVisitsPerHand: number; coverage: number }> {
+  const phaseVisits: Record<string, number[]> = {};
+  PHASES.forEach(phase => { phaseVisits[phase] = Array(169).fill(0); });
+
+  for (let i = 0; i < cube.count; i++) {
+    const phaseName = PHASES[cube.phase[i]];
+    const h = cube.hand[i];
+    if (!phaseVisits[phaseName] || h < 0 || h >= 169) continue;
+    phaseVisits[phaseName][h] += cube.visits[i];
+  }
+
+  const result: Record<string, { totalVisits: number; avgVisitsPerHand: number; coverage: number }> = {};
+  PHASES.forEach(phase => { result[phase] = calculateWeightedStats(phaseVisits[phase]); });
+  return result;
+}
@@ -7,13 +7,11 @@ import json
 from typing import Dict, Tuple
 
 # --- Treys (évaluateur poker ultra-rapide) ---
-from treys import Card as TCard, Evaluator as TEvaluator
-
-# Évaluateur global (objet Treys)
-_TREYS_EVAL = TEvaluator()
+# Import, évaluateur et LUT construits au premier rank7 (_load_treys) : les modules qui
+# importent utils sans évaluer de main (policy, ml/, UI) ne paient pas ~30 ms au démarrage.
+_TREYS_EVAL = None
 
 # LUT (Lookup Table) 52 -> int Treys
-# Construite une seule fois au chargement du module.
 _RANK_CHARS = "23456789TJQKA"   # 2..A
 _SUIT_CHARS = "shdc"            # ♠, ♥, ♦, ♣ (0..3)
 
@@ -22,6 +20,7 @@ _EVAL_HAND_BUFFER = [0, 0]          # buffer réutilisé pour 2 cartes
 _EVAL_BOARD_BUFFER = [0, 0, 0, 0, 0]  # buffer réutilisé pour 5 cartes
 
 def build_treys_lut() -> Tuple[int, ...]:
+    from treys import Card as TCard
     lut = [0] * 52
     for c in range(52):
         r = (c // 4) + 2      # 2..14
@@ -29,7 +28,15 @@ def build_treys_lut() -> Tuple[int, ...]:
         lut[c] = TCard.new(_RANK_CHARS[r-2] + _SUIT_CHARS[s])
     return tuple(lut)
 
-TREYS_INT_LUT: Tuple[int, ...] = build_treys_lut()
+TREYS_INT_LUT: Tuple[int, ...] = ()
+
+def _load_treys():
+    """Construit (une seule fois) l'évaluateur Treys global et la LUT 52 -> int Treys."""
+    global _TREYS_EVAL, TREYS_INT_LUT
+    from treys import Evaluator as TEvaluator
+    TREYS_INT_LUT = build_treys_lut()
+    _TREYS_EVAL = TEvaluator()
+    return _TREYS_EVAL
 
 # --------- API d'évaluation ----------
 
@@ -39,6 +46,7 @@ def rank7(cards7: tuple[int, ...]) -> int:
     Retourne un entier où *plus GRAND = meilleur* (on inverse le score Treys).
     """
     hero1, hero2, board0, board1, board2, board3, board4 = cards7
+    evaluator = _TREYS_EVAL or _load_treys()
 
     # Conversion via LUT dans buffers réutilisés
     _EVAL_HAND_BUFFER[0] = TREYS_INT_LUT[hero1]
@@ -51,7 +59,7 @@ def rank7(cards7: tuple[int, ...]) -> int:
     _EVAL_BOARD_BUFFER[4] = TREYS_INT_LUT[board4]
 
     # Treys: plus PETIT = meilleur → on renvoie l’opposé
-    return -_TREYS_EVAL.evaluate(_EVAL_BOARD_BUFFER, _EVAL_HAND_BUFFER)
+    return -evaluator.evaluate(_EVAL_BOARD_BUFFER, _EVAL_HAND_BUFFER)
 
 # --------- Sauvegarde / chargement des ranges ----------
 def save_ranges_json(path: str, ranges: Dict[str, list]):